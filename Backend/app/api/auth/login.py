@@ -32,7 +32,7 @@ def create_jwt_token(user_id: int, nombre: str):
     return token
 
 @router.post("/login")
-async def login_user(user: Login, db: Session = Depends(get_db)):
+def login_user(user: Login, db: Session = Depends(get_db)):
     try:
         # Verificar si existen usuarios en la base de datos
         user_count = db.query(Usuario).count()
@@ -103,7 +103,7 @@ async def login_user(user: Login, db: Session = Depends(get_db)):
         )
 
 @router.post("/registrar")
-async def registrar_usuario(user: UsuarioModel, db: Session = Depends(get_db)):
+def registrar_usuario(user: UsuarioModel, db: Session = Depends(get_db)):
     try:
         # Verificar si el usuario ya existe por CC o email
         existing_user = db.query(Usuario).filter(
@@ -181,7 +181,7 @@ async def verify_token(credentials: HTTPAuthorizationCredentials = Security(HTTP
         )
 
 @router.post("/refresh-token")
-async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(HTTPBearer()), db: Session = Depends(get_db)):
+def refresh_token(credentials: HTTPAuthorizationCredentials = Security(HTTPBearer()), db: Session = Depends(get_db)):
     try:
         token = credentials.credentials
         
@@ -0,0 +1,46 @@
+import csv
+import io
+import re
+from fastapi import APIRouter, Depends, Response
+from fastapi.responses import JSONResponse
+from app.api.auth.login import verify_jwt_token
+from .trabajos import obtener_trabajo
+
+router = APIRouter()
+
+_PATRON_ERROR_FILA = re.compile(r"^Fila (\d+): (.*)$", re.DOTALL)
+
+@router.get("/{id_trabajo}")
+def consultar_importacion(id_trabajo: str, token: str = Depends(verify_jwt_token)):
+    """
+    Estado y avance de una importación: filas procesadas, exitosas y errores hasta el momento
+    """
+    trabajo = obtener_trabajo(id_trabajo)
+    if not trabajo:
+        return JSONResponse(status_code=404, content={"detail": "Importación no encontrada"})
+    return trabajo.a_dict()
+
+@router.get("/{id_trabajo}/errores")
+def descargar_reporte_errores(id_trabajo: str, token: str = Depends(verify_jwt_token)):
+    """
+    Reporte CSV (fila, error) de una importación terminada
+    """
+    trabajo = obtener_trabajo(id_trabajo)
+    if not trabajo:
+        return JSONResponse(status_code=404, content={"detail": "Importación no encontrada"})
+    if not trabajo.terminado:
+        return JSONResponse(status_code=409, content={"detail": "La importación aún no ha terminado"})
+
+    salida = io.StringIO()
+    escritor = csv.writer(salida)
+    escritor.writerow(["fila", "error"])
+    for error in trabajo.a_dict()["errores"]:
+        coincidencia = _PATRON_ERROR_FILA.match(error)
+        escritor.writerow(coincidencia.groups() if coincidencia else ["", error])
+
+    # BOM para que Excel abra el archivo con los acentos correctos
+    return Response(
+        content="\ufeff" + salida.getvalue(),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="errores_{trabajo.tipo}_{trabajo.id}.csv"'}
+    )
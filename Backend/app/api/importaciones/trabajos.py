@@ -0,0 +1,131 @@
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from app.core.excel import guardar_temporal, leer_excel_por_bloques
+
+# Importaciones que se ejecutan a la vez; las demás esperan en cola
+MAX_IMPORTACIONES_SIMULTANEAS = 2
+
+# Tiempo que se conserva una importación terminada para consultarla
+RETENCION_TRABAJOS = timedelta(hours=24)
+
+ESTADO_PENDIENTE = 'pendiente'
+ESTADO_EN_PROCESO = 'en_proceso'
+ESTADO_COMPLETADO = 'completado'
+ESTADO_FALLIDO = 'fallido'
+
+# Conteos opcionales de los resultados que se copian al trabajo si están presentes
+# (p. ej. las importaciones en modo upsert)
+CONTEOS_ADICIONALES = ('insertados', 'actualizados', 'sin_cambios')
+
+class TrabajoImportacion:
+    """
+    Estado de una importación en segundo plano. El hilo que importa lo actualiza
+    después de cada bloque de filas y los endpoints de /imports lo leen.
+    """
+    def __init__(self, tipo: str, archivo: str):
+        self.id = uuid.uuid4().hex
+        self.tipo = tipo
+        self.archivo = archivo
+        self.estado = ESTADO_PENDIENTE
+        self.detail = None
+        self.total_procesados = 0
+        self.exitosos = 0
+        self.errores = []
+        self.conteos = {}
+        self.creado = datetime.now()
+        self.finalizado = None
+        self._lock = threading.Lock()
+
+    @property
+    def terminado(self) -> bool:
+        return self.estado in (ESTADO_COMPLETADO, ESTADO_FALLIDO)
+
+    def registrar_avance(self, resultado: dict):
+        """
+        Copia los conteos y errores acumulados (formato de respuesta de las importaciones)
+        """
+        with self._lock:
+            self.total_procesados = resultado["total_procesados"]
+            self.exitosos = resultado["exitosos"]
+            self.errores = list(resultado["errores"])
+            self.conteos = {clave: resultado[clave] for clave in CONTEOS_ADICIONALES if clave in resultado}
+
+    def a_dict(self) -> dict:
+        with self._lock:
+            return {
+                "id": self.id,
+                "tipo": self.tipo,
+                "archivo": self.archivo,
+                "estado": self.estado,
+                "detail": self.detail,
+                "total_procesados": self.total_procesados,
+                "exitosos": self.exitosos,
+                "errores": list(self.errores),
+                "parcial": len(self.errores) > 0 and self.exitosos > 0,
+                **self.conteos,
+                "creado": self.creado.isoformat(),
+                "finalizado": self.finalizado.isoformat() if self.finalizado else None,
+                "reporte_errores": f"/imports/{self.id}/errores" if self.terminado and self.errores else None
+            }
+
+    def _cambiar_estado(self, estado: str, detail: str = None):
+        with self._lock:
+            self.estado = estado
+            self.detail = detail
+            if estado in (ESTADO_COMPLETADO, ESTADO_FALLIDO):
+                self.finalizado = datetime.now()
+
+_trabajos = {}
+_trabajos_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=MAX_IMPORTACIONES_SIMULTANEAS, thread_name_prefix="importacion")
+
+def enviar_importacion(tipo: str, file, validar_columnas, procesar):
+    """
+    Encola la importación de un Excel subido y retorna (trabajo, error).
+
+    La subida se guarda en un archivo temporal porque deja de existir al terminar la
+    petición. `validar_columnas(columnas)` se ejecuta antes de encolar y, si retorna
+    algo distinto de None, no se crea el trabajo y se retorna eso como error.
+    `procesar(ruta, trabajo)` importa el archivo en un hilo del pool, llama a
+    trabajo.registrar_avance después de cada bloque y retorna el resultado final.
+    """
+    ruta = guardar_temporal(file.file)
+    try:
+        with leer_excel_por_bloques(ruta) as (columnas, _):
+            error = validar_columnas(columnas)
+    except Exception:
+        os.remove(ruta)
+        raise
+    if error is not None:
+        os.remove(ruta)
+        return None, error
+
+    trabajo = TrabajoImportacion(tipo, file.filename)
+    with _trabajos_lock:
+        _descartar_vencidos()
+        _trabajos[trabajo.id] = trabajo
+    _executor.submit(_ejecutar, trabajo, ruta, procesar)
+    return trabajo, None
+
+def obtener_trabajo(id_trabajo: str):
+    with _trabajos_lock:
+        return _trabajos.get(id_trabajo)
+
+def _ejecutar(trabajo: TrabajoImportacion, ruta: str, procesar):
+    trabajo._cambiar_estado(ESTADO_EN_PROCESO)
+    try:
+        trabajo.registrar_avance(procesar(ruta, trabajo))
+        trabajo._cambiar_estado(ESTADO_COMPLETADO)
+    except Exception as e:
+        print(f"Error en la importación {trabajo.id}: {e}")
+        trabajo._cambiar_estado(ESTADO_FALLIDO, f"Error al procesar el archivo: {str(e)}")
+    finally:
+        os.remove(ruta)
+
+def _descartar_vencidos():
+    limite = datetime.now() - RETENCION_TRABAJOS
+    for id_trabajo in [t.id for t in _trabajos.values() if t.finalizado and t.finalizado < limite]:
+        del _trabajos[id_trabajo]
@@ -0,0 +1,128 @@
+from sqlalchemy import bindparam, delete, func, insert, select, text, update
+from sqlalchemy.orm import Session
+from app.core.database.prestamo import Prestamo
+from app.core.database.solicitud import Solicitud
+from app.core.database.prestamos_activos import PrestamosActivos
+from app.core.database.upsert import sentencia_upsert
+
+# Estados de solicitud que representan un préstamo activo
+ESTADOS_ACTIVOS = ['pendiente', 'aprobado']
+
+# Lock de MySQL con el que un solo worker llena los contadores al arrancar
+LOCK_INICIALIZACION = 'lendit_prestamos_activos'
+ESPERA_LOCK_INICIALIZACION = 60
+
+def obtener_prestamos_activos(db: Session, identificacion: str) -> int:
+    """
+    Número de préstamos activos del solicitante (consulta por llave primaria)
+    """
+    cantidad = db.query(PrestamosActivos.CANTIDAD).filter(
+        PrestamosActivos.IDENTIFICACION == identificacion
+    ).scalar()
+    return cantidad or 0
+
+def obtener_prestamos_activos_lote(db: Session, identificaciones: list) -> dict:
+    """
+    Contadores de varios solicitantes en una sola consulta; los ausentes valen 0
+    """
+    if not identificaciones:
+        return {}
+    contadores = dict(db.query(PrestamosActivos.IDENTIFICACION, PrestamosActivos.CANTIDAD).filter(
+        PrestamosActivos.IDENTIFICACION.in_(identificaciones)
+    ).all())
+    return {identificacion: contadores.get(identificacion, 0) for identificacion in identificaciones}
+
+def ajustar_prestamos_activos(db: Session, identificacion: str, delta: int):
+    """
+    Suma `delta` al contador del solicitante dentro de la transacción actual
+    """
+    ajustar_prestamos_activos_lote(db, {identificacion: delta})
+
+def ajustar_prestamos_activos_lote(db: Session, deltas: dict):
+    """
+    Aplica varios ajustes {identificacion: delta} por lotes. Los aumentos usan un
+    upsert (CANTIDAD = CANTIDAD + delta) para que dos transacciones que crean el
+    primer contador de un solicitante no choquen; las disminuciones solo actualizan
+    contadores existentes.
+    """
+    aumentos = [
+        {"IDENTIFICACION": identificacion, "CANTIDAD": delta}
+        for identificacion, delta in deltas.items() if delta > 0
+    ]
+    if aumentos:
+        db.execute(sentencia_upsert(db, PrestamosActivos, [], columnas_sumar=["CANTIDAD"]), aumentos)
+    
+    tabla = PrestamosActivos.__table__
+    disminuciones = [
+        {"b_identificacion": identificacion, "b_delta": delta}
+        for identificacion, delta in deltas.items() if delta < 0
+    ]
+    if disminuciones:
+        db.connection().execute(
+            update(tabla)
+            .where(tabla.c.IDENTIFICACION == bindparam("b_identificacion"))
+            .values(CANTIDAD=tabla.c.CANTIDAD + bindparam("b_delta")),
+            disminuciones
+        )
+
+def registrar_cambio_estado(db: Session, solicitud: Solicitud, estado_anterior: str, estado_nuevo: str):
+    """
+    Ajusta el contador cuando una solicitud entra o sale de los estados activos
+    """
+    era_activa = estado_anterior in ESTADOS_ACTIVOS
+    es_activa = estado_nuevo in ESTADOS_ACTIVOS
+    if era_activa == es_activa:
+        return
+    
+    prestamos = db.query(func.count(Prestamo.IDPRESTAMO)).filter(
+        Prestamo.IDSOLICITUD == solicitud.IDSOLICITUD
+    ).scalar()
+    ajustar_prestamos_activos(db, solicitud.IDENTIFICACION, prestamos if es_activa else -prestamos)
+
+def reconciliar_prestamos_activos(db: Session) -> int:
+    """
+    Reconstruye todos los contadores desde HS_PRESTAMO en una sola pasada.
+    Retorna el número de solicitantes con préstamos activos.
+    """
+    activos = select(
+        Solicitud.IDENTIFICACION,
+        func.count(Prestamo.IDPRESTAMO)
+    ).join(
+        Prestamo, Prestamo.IDSOLICITUD == Solicitud.IDSOLICITUD
+    ).where(
+        Solicitud.ESTADO.in_(ESTADOS_ACTIVOS)
+    ).group_by(Solicitud.IDENTIFICACION)
+    
+    db.execute(delete(PrestamosActivos))
+    resultado = db.execute(
+        insert(PrestamosActivos).from_select(["IDENTIFICACION", "CANTIDAD"], activos)
+    )
+    db.commit()
+    return resultado.rowcount
+
+def inicializar_prestamos_activos(db: Session) -> bool:
+    """
+    Llena los contadores al arrancar solo si la tabla está vacía (primer despliegue).
+    Con varios workers, GET_LOCK hace que uno la llene y los demás la encuentren llena.
+    Después los contadores se mantienen en cada transacción y solo se reconstruyen
+    con POST /prestamo/activos/reconciliar.
+    Retorna True si se reconstruyeron.
+    """
+    motor = db.get_bind()
+    usar_lock = motor.dialect.name == 'mysql'
+    # El lock pertenece a la conexión: se toma en una propia para liberarlo en la misma
+    with motor.connect() as conexion:
+        if usar_lock and not conexion.execute(
+            text("SELECT GET_LOCK(:nombre, :espera)"),
+            {"nombre": LOCK_INICIALIZACION, "espera": ESPERA_LOCK_INICIALIZACION}
+        ).scalar():
+            return False
+        try:
+            if db.query(PrestamosActivos.IDENTIFICACION).first() is not None:
+                db.rollback()
+                return False
+            reconciliar_prestamos_activos(db)
+            return True
+        finally:
+            if usar_lock:
+                conexion.execute(text("SELECT RELEASE_LOCK(:nombre)"), {"nombre": LOCK_INICIALIZACION})
@@ -0,0 +1,64 @@
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+from app.core.database.producto import Producto
+from app.core.database.producto_solicitud import ProductoSolicitud
+from app.api.productos import contadores
+
+# Triggers de init_mysql.py que ya actualizan GS_PRODUCTO.ESTADO
+TRIGGER_PRESTAMO = 'after_prestamo_insert'
+TRIGGER_DEVOLUCION = 'after_solicitud_finalizada'
+
+# Nombres de los triggers instalados, consultados una sola vez por proceso
+_triggers_instalados = None
+
+def triggers_instalados(db: Session) -> set:
+    """
+    Retorna cuáles de los triggers de estado de productos existen en la base de datos
+    """
+    global _triggers_instalados
+    if _triggers_instalados is None:
+        if db.get_bind().dialect.name == 'mysql':
+            resultado = db.execute(text(
+                "SELECT TRIGGER_NAME FROM information_schema.TRIGGERS "
+                "WHERE TRIGGER_SCHEMA = DATABASE() AND TRIGGER_NAME IN (:prestamo, :devolucion)"
+            ), {"prestamo": TRIGGER_PRESTAMO, "devolucion": TRIGGER_DEVOLUCION})
+            _triggers_instalados = {fila[0] for fila in resultado}
+        else:
+            _triggers_instalados = set()
+    return _triggers_instalados
+
+def marcar_productos_prestados(db: Session, solicitudes_ids: list, productos: list = None) -> int:
+    """
+    Marca como 'Prestado' los productos de las solicitudes dadas con un solo UPDATE.
+    No lo ejecuta si el trigger after_prestamo_insert ya lo hizo al insertar el préstamo.
+    `productos` son las tuplas (id, id de tipo, estado anterior) que el llamador ya cargó.
+    """
+    return _actualizar_estado(db, solicitudes_ids, 'Prestado', productos, TRIGGER_PRESTAMO)
+
+def marcar_productos_disponibles(db: Session, solicitudes_ids: list, productos: list = None) -> int:
+    """
+    Marca como 'Disponible' los productos de las solicitudes dadas con un solo UPDATE.
+    No lo ejecuta si el trigger after_solicitud_finalizada lo hará al finalizar la solicitud.
+    `productos` son las tuplas (id, id de tipo, estado anterior) que el llamador ya cargó;
+    si no se dan se leen con una consulta, por lo que debe llamarse antes de finalizar
+    las solicitudes en la base de datos.
+    """
+    return _actualizar_estado(db, solicitudes_ids, 'Disponible', productos, TRIGGER_DEVOLUCION)
+
+def _actualizar_estado(db: Session, solicitudes_ids: list, estado: str, productos: list, trigger: str) -> int:
+    if not solicitudes_ids:
+        return 0
+
+    de_solicitudes = Producto.IDPRODUCTO.in_(
+        select(ProductoSolicitud.PRODUCTO_ID).where(ProductoSolicitud.SOLICITUD_ID.in_(solicitudes_ids))
+    )
+    # Los contadores en memoria se ajustan aunque el cambio lo haga el trigger
+    if productos is None:
+        productos = db.query(Producto.IDPRODUCTO, Producto.IDTIPOPRODUCTO, Producto.ESTADO).filter(
+            de_solicitudes
+        ).all()
+    contadores.cambiar_estado_al_confirmar(db, productos, estado)
+    if trigger in triggers_instalados(db):
+        return 0
+
+    return db.query(Producto).filter(de_solicitudes).update({Producto.ESTADO: estado}, synchronize_session=False)
@@ -1,15 +1,38 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
 from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session, selectinload
 from app.core.database.prestamo import Prestamo
 from app.core.database.db import SessionLocal
-from app.api.prestamos.prestamo_validacion import validar_prestamo, validar_productos_solicitud, PrestamoValidacionError
-from datetime import datetime
+from app.api.prestamos.prestamo_validacion import (
+    cargar_contexto_solicitante,
+    validar_prestamo,
+    validar_fecha_registro,
+    validar_productos_solicitud,
+    PrestamoValidacionError,
+    ESTADOS_ACTIVOS,
+)
+from app.api.prestamos.estado_productos import marcar_productos_prestados, marcar_productos_disponibles
+from app.api.prestamos.prestamo_lote import (
+    crear_prestamos_lote,
+    devolver_prestamos_lote,
+    prolongar_prestamos_lote,
+)
+from app.api.prestamos.contador_prestamos import (
+    ajustar_prestamos_activos,
+    registrar_cambio_estado,
+    reconciliar_prestamos_activos,
+)
+from app.core.database.prestamos_activos import PrestamosActivos
+from datetime import date, datetime
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 router = APIRouter()
 
+# Máximo de préstamos que devuelve /obtener con todos=true (uso administrativo)
+MAXIMO_TODOS = 5000
+
 def get_db():
     db = SessionLocal()
     try:
@@ -18,59 +41,79 @@ def get_db():
         db.close()
 
 @router.get("/obtener")
-async def obtenerPrestamos(db: Session = Depends(get_db)):
+def obtenerPrestamos(
+    response: Response,
+    cursor: Optional[int] = None,
+    limite: int = Query(100, ge=1, le=500),
+    todos: bool = False,
+    estado: Optional[List[str]] = Query(None),
+    identificacion: Optional[str] = None,
+    fecha_registro_desde: Optional[date] = None,
+    fecha_registro_hasta: Optional[date] = None,
+    fecha_limite_desde: Optional[date] = None,
+    fecha_limite_hasta: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Listar préstamos del más reciente al más antiguo.
+
+    Se pagina por cursor sobre IDPRESTAMO (`limite` préstamos por página, 100 por
+    defecto): se devuelven los préstamos con IDPRESTAMO menor que `cursor` y el
+    cursor de la siguiente página viaja en la cabecera X-Siguiente-Cursor (ausente
+    en la última página). Con `todos=true` se devuelven hasta MAXIMO_TODOS préstamos
+    en una sola página; las pantallas de la aplicación no lo usan.
+    """
     try:
         from app.core.database.solicitud import Solicitud
         from app.core.database.producto_solicitud import ProductoSolicitud
-        from app.core.database.producto import Producto
         
-        prestamos = db.query(Prestamo).order_by(Prestamo.IDPRESTAMO.desc()).all()
+        query = db.query(Prestamo)
+        
+        # Filtros sobre la solicitud asociada
+        if estado or identificacion:
+            query = query.join(Solicitud, Prestamo.IDSOLICITUD == Solicitud.IDSOLICITUD)
+            if estado:
+                query = query.filter(Solicitud.ESTADO.in_(estado))
+            if identificacion:
+                query = query.filter(Solicitud.IDENTIFICACION == identificacion)
+        
+        # Filtros por rango de fechas del préstamo
+        if fecha_registro_desde:
+            query = query.filter(Prestamo.FECHA_REGISTRO >= fecha_registro_desde)
+        if fecha_registro_hasta:
+            query = query.filter(Prestamo.FECHA_REGISTRO <= fecha_registro_hasta)
+        if fecha_limite_desde:
+            query = query.filter(Prestamo.FECHA_LIMITE >= fecha_limite_desde)
+        if fecha_limite_hasta:
+            query = query.filter(Prestamo.FECHA_LIMITE <= fecha_limite_hasta)
+        
+        if cursor is not None:
+            query = query.filter(Prestamo.IDPRESTAMO < cursor)
+        
+        if todos:
+            limite = MAXIMO_TODOS
+        # Pedir un registro extra para saber si existe una página siguiente
+        query = query.order_by(Prestamo.IDPRESTAMO.desc()).limit(limite + 1)
+        
+        # Cargar préstamos, solicitudes y productos con un número fijo de consultas
+        prestamos = query.options(
+            selectinload(Prestamo.solicitud)
+            .selectinload(Solicitud.productos_solicitud)
+            .selectinload(ProductoSolicitud.producto)
+        ).all()
+        
+        if len(prestamos) > limite:
+            prestamos = prestamos[:limite]
+            response.headers["X-Siguiente-Cursor"] = str(prestamos[-1].IDPRESTAMO)
 
         # Si no hay préstamos, devolver lista vacía en lugar de 404
         if not prestamos:
             return []
         
-        # Cargar las relaciones manualmente
         result = []
         for prestamo in prestamos:
             try:
-                solicitud = db.query(Solicitud).filter(Solicitud.IDSOLICITUD == prestamo.IDSOLICITUD).first()
-                productos_solicitud = db.query(ProductoSolicitud).filter(ProductoSolicitud.SOLICITUD_ID == prestamo.IDSOLICITUD).all()
-                
-                # Obtener detalles completos de los productos
-                productos_detalle = []
-                for ps in productos_solicitud:
-                    producto = db.query(Producto).filter(Producto.IDPRODUCTO == ps.PRODUCTO_ID).first()
-                    if producto:
-                        productos_detalle.append({
-                            "PRODUCTO_ID": ps.PRODUCTO_ID,
-                            "SOLICITUD_ID": ps.SOLICITUD_ID,
-                            "NOMBRE": producto.NOMBRE,
-                            "CODIGO_INTERNO": producto.CODIGO_INTERNO
-                        })
-                    else:
-                        productos_detalle.append({
-                            "PRODUCTO_ID": ps.PRODUCTO_ID,
-                            "SOLICITUD_ID": ps.SOLICITUD_ID,
-                            "NOMBRE": "Producto no encontrado",
-                            "CODIGO_INTERNO": "N/A"
-                        })
-                
-                prestamo_dict = {
-                    "IDPRESTAMO": prestamo.IDPRESTAMO,
-                    "IDSOLICITUD": prestamo.IDSOLICITUD,
-                    "FECHA_REGISTRO": prestamo.FECHA_REGISTRO.isoformat() if prestamo.FECHA_REGISTRO else None,
-                    "FECHA_LIMITE": prestamo.FECHA_LIMITE.isoformat() if prestamo.FECHA_LIMITE else None,
-                    "FECHA_PROLONGACION": prestamo.FECHA_PROLONGACION.isoformat() if prestamo.FECHA_PROLONGACION else None,
-                    "solicitud": {
-                        "IDSOLICITUD": solicitud.IDSOLICITUD if solicitud else None,
-                        "IDENTIFICACION": solicitud.IDENTIFICACION if solicitud else None,
-                        "FECHA_REGISTRO": solicitud.FECHA_REGISTRO.isoformat() if solicitud and solicitud.FECHA_REGISTRO else None,
-                        "ESTADO": solicitud.ESTADO if solicitud else None,
-                        "productos_solicitud": productos_detalle
-                    }
-                }
-                result.append(prestamo_dict)
+                result.append(_serializar_prestamo(prestamo))
             except Exception as e:
                 print(f"Error procesando préstamo {prestamo.IDPRESTAMO}: {e}")
                 continue
@@ -80,6 +123,165 @@ async def obtenerPrestamos(db: Session = Depends(get_db)):
         print(f"Error en obtenerPrestamos: {e}")
         return JSONResponse(status_code=500, content={"detail": f"Error al obtener préstamos: {str(e)}"})
 
+@router.get("/vencidos")
+def obtener_prestamos_vencidos(
+    response: Response,
+    fecha: Optional[date] = None,
+    agrupar_por: Optional[str] = Query(None, pattern="^(solicitante|tipo_producto)$"),
+    cursor: Optional[str] = None,
+    limite: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """
+    Listar los préstamos activos cuya fecha límite ya pasó (a la fecha dada, por defecto hoy).
+
+    Sin `agrupar_por` devuelve los préstamos paginados por IDPRESTAMO descendente; con
+    `agrupar_por=solicitante` o `agrupar_por=tipo_producto` devuelve un resumen por grupo
+    paginado por la clave del grupo. El cursor de la siguiente página viaja en la
+    cabecera X-Siguiente-Cursor.
+    """
+    try:
+        from app.core.database.solicitud import Solicitud
+        from app.core.database.solicitante import Solicitante
+        from app.core.database.producto_solicitud import ProductoSolicitud
+        from app.core.database.producto import Producto
+        from app.core.database.tipo_producto import TipoProducto
+        
+        fecha_corte = fecha or date.today()
+        condiciones_vencido = (
+            Solicitud.ESTADO.in_(ESTADOS_ACTIVOS),
+            Prestamo.FECHA_LIMITE < fecha_corte
+        )
+        
+        if agrupar_por == 'solicitante':
+            query = db.query(
+                Solicitud.IDENTIFICACION,
+                Solicitante.PRIMER_NOMBRE,
+                Solicitante.PRIMER_APELLIDO,
+                Solicitante.ROL,
+                func.count(Prestamo.IDPRESTAMO),
+                func.min(Prestamo.FECHA_LIMITE)
+            ).select_from(Solicitud).join(
+                Prestamo, Prestamo.IDSOLICITUD == Solicitud.IDSOLICITUD
+            ).join(
+                Solicitante, Solicitante.IDENTIFICACION == Solicitud.IDENTIFICACION
+            ).filter(*condiciones_vencido)
+            if cursor is not None:
+                query = query.filter(Solicitud.IDENTIFICACION > cursor)
+            filas = query.group_by(
+                Solicitud.IDENTIFICACION,
+                Solicitante.PRIMER_NOMBRE,
+                Solicitante.PRIMER_APELLIDO,
+                Solicitante.ROL
+            ).order_by(Solicitud.IDENTIFICACION).limit(limite + 1).all()
+            
+            if len(filas) > limite:
+                filas = filas[:limite]
+                response.headers["X-Siguiente-Cursor"] = filas[-1][0]
+            
+            return [{
+                "IDENTIFICACION": identificacion,
+                "PRIMER_NOMBRE": primer_nombre,
+                "PRIMER_APELLIDO": primer_apellido,
+                "ROL": rol,
+                "PRESTAMOS_VENCIDOS": prestamos_vencidos,
+                "FECHA_LIMITE_MAS_ANTIGUA": fecha_limite.isoformat() if fecha_limite else None,
+                "DIAS_VENCIDO": (fecha_corte - fecha_limite).days if fecha_limite else None
+            } for identificacion, primer_nombre, primer_apellido, rol, prestamos_vencidos, fecha_limite in filas]
+        
+        if agrupar_por == 'tipo_producto':
+            query = db.query(
+                TipoProducto.IDTIPOPRODUCTO,
+                TipoProducto.NOMBRE_TIPO_PRODUCTO,
+                func.count(func.distinct(Prestamo.IDPRESTAMO)),
+                func.count(ProductoSolicitud.PRODUCTO_ID)
+            ).select_from(Solicitud).join(
+                Prestamo, Prestamo.IDSOLICITUD == Solicitud.IDSOLICITUD
+            ).join(
+                ProductoSolicitud, ProductoSolicitud.SOLICITUD_ID == Solicitud.IDSOLICITUD
+            ).join(
+                Producto, Producto.IDPRODUCTO == ProductoSolicitud.PRODUCTO_ID
+            ).join(
+                TipoProducto, TipoProducto.IDTIPOPRODUCTO == Producto.IDTIPOPRODUCTO
+            ).filter(*condiciones_vencido)
+            if cursor is not None:
+                query = query.filter(TipoProducto.IDTIPOPRODUCTO > int(cursor))
+            filas = query.group_by(
+                TipoProducto.IDTIPOPRODUCTO,
+                TipoProducto.NOMBRE_TIPO_PRODUCTO
+            ).order_by(TipoProducto.IDTIPOPRODUCTO).limit(limite + 1).all()
+            
+            if len(filas) > limite:
+                filas = filas[:limite]
+                response.headers["X-Siguiente-Cursor"] = str(filas[-1][0])
+            
+            return [{
+                "IDTIPOPRODUCTO": id_tipo,
+                "NOMBRE_TIPO_PRODUCTO": nombre_tipo,
+                "PRESTAMOS_VENCIDOS": prestamos_vencidos,
+                "PRODUCTOS_VENCIDOS": productos_vencidos
+            } for id_tipo, nombre_tipo, prestamos_vencidos, productos_vencidos in filas]
+        
+        query = db.query(Prestamo).join(
+            Solicitud, Prestamo.IDSOLICITUD == Solicitud.IDSOLICITUD
+        ).filter(*condiciones_vencido)
+        if cursor is not None:
+            query = query.filter(Prestamo.IDPRESTAMO < int(cursor))
+        prestamos = query.options(
+            selectinload(Prestamo.solicitud)
+            .selectinload(Solicitud.productos_solicitud)
+            .selectinload(ProductoSolicitud.producto)
+        ).order_by(Prestamo.IDPRESTAMO.desc()).limit(limite + 1).all()
+        
+        if len(prestamos) > limite:
+            prestamos = prestamos[:limite]
+            response.headers["X-Siguiente-Cursor"] = str(prestamos[-1].IDPRESTAMO)
+        
+        result = []
+        for prestamo in prestamos:
+            prestamo_dict = _serializar_prestamo(prestamo)
+            prestamo_dict["DIAS_VENCIDO"] = (fecha_corte - prestamo.FECHA_LIMITE).days
+            result.append(prestamo_dict)
+        
+        return result
+    except ValueError:
+        return JSONResponse(status_code=400, content={"detail": "Cursor inválido"})
+    except Exception as e:
+        print(f"Error en obtener_prestamos_vencidos: {e}")
+        return JSONResponse(status_code=500, content={"detail": f"Error al obtener préstamos vencidos: {str(e)}"})
+
+def _serializar_prestamo(prestamo):
+    """
+    Convierte un préstamo con sus relaciones ya cargadas al formato JSON de /obtener
+    """
+    solicitud = prestamo.solicitud
+    
+    productos_detalle = []
+    if solicitud:
+        for ps in solicitud.productos_solicitud:
+            producto = ps.producto
+            productos_detalle.append({
+                "PRODUCTO_ID": ps.PRODUCTO_ID,
+                "SOLICITUD_ID": ps.SOLICITUD_ID,
+                "NOMBRE": producto.NOMBRE if producto else "Producto no encontrado",
+                "CODIGO_INTERNO": producto.CODIGO_INTERNO if producto else "N/A"
+            })
+    
+    return {
+        "IDPRESTAMO": prestamo.IDPRESTAMO,
+        "IDSOLICITUD": prestamo.IDSOLICITUD,
+        "FECHA_REGISTRO": prestamo.FECHA_REGISTRO.isoformat() if prestamo.FECHA_REGISTRO else None,
+        "FECHA_LIMITE": prestamo.FECHA_LIMITE.isoformat() if prestamo.FECHA_LIMITE else None,
+        "FECHA_PROLONGACION": prestamo.FECHA_PROLONGACION.isoformat() if prestamo.FECHA_PROLONGACION else None,
+        "solicitud": {
+            "IDSOLICITUD": solicitud.IDSOLICITUD if solicitud else None,
+            "IDENTIFICACION": solicitud.IDENTIFICACION if solicitud else None,
+            "FECHA_REGISTRO": solicitud.FECHA_REGISTRO.isoformat() if solicitud and solicitud.FECHA_REGISTRO else None,
+            "ESTADO": solicitud.ESTADO if solicitud else None,
+            "productos_solicitud": productos_detalle
+        }
+    }
+
 class PrestamoCreate(BaseModel):
     IDSOLICITUD: int
     FECHA_REGISTRO: str
@@ -93,7 +295,7 @@ class BuscarPrestamo(BaseModel):
     IDPRESTAMO: int
 
 @router.post("/crear")
-async def crear_prestamo(prestamo: PrestamoCreate, db: Session = Depends(get_db)):
+def crear_prestamo(prestamo: PrestamoCreate, db: Session = Depends(get_db)):
     try:
         from app.core.database.producto_solicitud import ProductoSolicitud
         from app.core.database.producto import Producto
@@ -104,23 +306,24 @@ async def crear_prestamo(prestamo: PrestamoCreate, db: Session = Depends(get_db)
         if not solicitud:
             return JSONResponse(status_code=404, content={"detail": "Solicitud no encontrada"})
         
-        # Obtener los productos de la solicitud
-        productos_solicitud = db.query(ProductoSolicitud).filter(
+        # Obtener los productos de la solicitud con su tipo y estado actual
+        productos_solicitud = db.query(
+            ProductoSolicitud.PRODUCTO_ID, Producto.IDTIPOPRODUCTO, Producto.ESTADO
+        ).join(
+            Producto, Producto.IDPRODUCTO == ProductoSolicitud.PRODUCTO_ID
+        ).filter(
             ProductoSolicitud.SOLICITUD_ID == prestamo.IDSOLICITUD
         ).all()
         
-        productos_ids = [ps.PRODUCTO_ID for ps in productos_solicitud]
+        productos_ids = [producto_id for producto_id, _, _ in productos_solicitud]
         
-        # Validar préstamo básico
+        # Validar préstamo básico y productos específicos (especialmente para aprendices
+        # y equipos de cómputo) compartiendo el solicitante cargado una sola vez
         try:
             fecha_limite = datetime.strptime(prestamo.FECHA_LIMITE, '%Y-%m-%d').date()
-            validar_prestamo(db, solicitud.IDENTIFICACION, fecha_limite)
-        except PrestamoValidacionError as e:
-            return JSONResponse(status_code=400, content={"detail": str(e)})
-        
-        # Validar productos específicos (especialmente para aprendices y equipos de cómputo)
-        try:
-            validar_productos_solicitud(db, solicitud.IDENTIFICACION, productos_ids)
+            contexto = cargar_contexto_solicitante(db, solicitud.IDENTIFICACION)
+            validar_prestamo(db, solicitud.IDENTIFICACION, fecha_limite, contexto)
+            validar_productos_solicitud(db, solicitud.IDENTIFICACION, productos_ids, contexto)
         except PrestamoValidacionError as e:
             return JSONResponse(status_code=400, content={"detail": str(e)})
         
@@ -132,29 +335,144 @@ async def crear_prestamo(prestamo: PrestamoCreate, db: Session = Depends(get_db)
         )
         
         db.add(nuevo_prestamo)
+        db.flush()
+        
+        # Actualizar estado de productos a 'Prestado' si el trigger no lo hizo
+        marcar_productos_prestados(db, [prestamo.IDSOLICITUD], productos_solicitud)
+        
+        if solicitud.ESTADO in ESTADOS_ACTIVOS:
+            ajustar_prestamos_activos(db, solicitud.IDENTIFICACION, 1)
+        
         db.commit()
         db.refresh(nuevo_prestamo)
         
-        # Actualizar estado de productos a 'prestado' (backup del trigger)
-        try:
-            for ps in productos_solicitud:
-                producto = db.query(Producto).filter(Producto.IDPRODUCTO == ps.PRODUCTO_ID).first()
-                if producto:
-                    producto.ESTADO = 'Prestado'
-            
-            db.commit()
-        except Exception as update_error:
-            print(f"Error actualizando estado de productos: {update_error}")
-            # No hacer rollback del préstamo por este error
-        
         return nuevo_prestamo
 
     except Exception as e:
         db.rollback()
         return JSONResponse(status_code=500, content={"detail": f"Error al crear préstamo: {str(e)}"})
 
+class CheckoutRequest(BaseModel):
+    IDENTIFICACION: str
+    PRODUCTOS: List[int]
+    FECHA_LIMITE: str
+    FECHA_REGISTRO: Optional[str] = None
+
+@router.post("/checkout")
+def checkout_prestamo(datos: CheckoutRequest, db: Session = Depends(get_db)):
+    """
+    Registrar un préstamo completo en una sola transacción: valida al solicitante y los
+    productos, crea la solicitud con sus productos, el préstamo y marca los productos
+    como prestados. Si algo falla no queda ninguna solicitud a medio construir.
+    """
+    try:
+        from app.core.database.producto_solicitud import ProductoSolicitud
+        from app.core.database.producto import Producto
+        from app.core.database.solicitud import Solicitud
+        
+        # Eliminar productos repetidos conservando el orden
+        productos_ids = list(dict.fromkeys(datos.PRODUCTOS))
+        if not productos_ids:
+            return JSONResponse(status_code=400, content={"detail": "Debe seleccionar al menos un producto"})
+        
+        try:
+            fecha_limite = datetime.strptime(datos.FECHA_LIMITE, '%Y-%m-%d').date()
+            fecha_registro = datetime.strptime(datos.FECHA_REGISTRO, '%Y-%m-%d').date() if datos.FECHA_REGISTRO else date.today()
+        except ValueError:
+            return JSONResponse(status_code=400, content={"detail": "Formato de fecha inválido (use AAAA-MM-DD)"})
+        
+        # Validar solicitante, límites y productos con el solicitante cargado una sola vez
+        try:
+            contexto = cargar_contexto_solicitante(db, datos.IDENTIFICACION)
+            validar_prestamo(db, datos.IDENTIFICACION, fecha_limite, contexto)
+            validar_fecha_registro(fecha_registro, fecha_limite)
+            validar_productos_solicitud(db, datos.IDENTIFICACION, productos_ids, contexto)
+        except PrestamoValidacionError as e:
+            return JSONResponse(status_code=400, content={"detail": str(e)})
+        
+        # Verificar existencia y disponibilidad de todos los productos en una consulta,
+        # bloqueando las filas para que otro préstamo no tome los mismos productos
+        productos = db.query(Producto.IDPRODUCTO, Producto.IDTIPOPRODUCTO, Producto.ESTADO).filter(
+            Producto.IDPRODUCTO.in_(productos_ids)
+        ).with_for_update().all()
+        estados = {producto_id: estado for producto_id, _, estado in productos}
+        
+        no_encontrados = [str(pid) for pid in productos_ids if pid not in estados]
+        if no_encontrados:
+            return JSONResponse(status_code=404, content={"detail": f"Productos no encontrados: {', '.join(no_encontrados)}"})
+        
+        no_disponibles = [str(pid) for pid in productos_ids if estados[pid] != 'Disponible']
+        if no_disponibles:
+            return JSONResponse(status_code=400, content={"detail": f"Productos no disponibles: {', '.join(no_disponibles)}"})
+        
+        nueva_solicitud = Solicitud(
+            IDENTIFICACION=datos.IDENTIFICACION,
+            FECHA_REGISTRO=fecha_registro,
+            ESTADO='pendiente'
+        )
+        db.add(nueva_solicitud)
+        db.flush()
+        
+        # Insertar todos los productos de la solicitud en una sola sentencia
+        db.execute(insert(ProductoSolicitud), [
+            {"PRODUCTO_ID": producto_id, "SOLICITUD_ID": nueva_solicitud.IDSOLICITUD}
+            for producto_id in productos_ids
+        ])
+        
+        nuevo_prestamo = Prestamo(
+            IDSOLICITUD=nueva_solicitud.IDSOLICITUD,
+            FECHA_REGISTRO=fecha_registro,
+            FECHA_LIMITE=fecha_limite,
+            FECHA_PROLONGACION=None
+        )
+        db.add(nuevo_prestamo)
+        db.flush()
+        
+        marcar_productos_prestados(db, [nueva_solicitud.IDSOLICITUD], productos)
+        ajustar_prestamos_activos(db, datos.IDENTIFICACION, 1)
+        
+        db.commit()
+        
+        return JSONResponse(status_code=201, content={
+            "detail": "Préstamo registrado exitosamente",
+            "IDPRESTAMO": nuevo_prestamo.IDPRESTAMO,
+            "IDSOLICITUD": nueva_solicitud.IDSOLICITUD,
+            "FECHA_REGISTRO": nuevo_prestamo.FECHA_REGISTRO.isoformat(),
+            "FECHA_LIMITE": nuevo_prestamo.FECHA_LIMITE.isoformat(),
+            "PRODUCTOS": productos_ids
+        })
+
+    except Exception as e:
+        db.rollback()
+        return JSONResponse(status_code=500, content={"detail": f"Error al registrar préstamo: {str(e)}"})
+
+class PrestamoLoteItem(BaseModel):
+    IDSOLICITUD: int
+    FECHA_LIMITE: str
+    FECHA_REGISTRO: Optional[str] = None
+
+class PrestamoLoteRequest(BaseModel):
+    prestamos: List[PrestamoLoteItem]
+
+@router.post("/crear-lote")
+def crear_prestamos_en_lote(datos: PrestamoLoteRequest, db: Session = Depends(get_db)):
+    """
+    Registrar varios préstamos en una sola transacción. Los items inválidos no impiden
+    registrar los demás: la respuesta indica el resultado de cada uno en el mismo orden.
+    """
+    if not datos.prestamos:
+        return JSONResponse(status_code=400, content={"detail": "Debe enviar al menos un préstamo"})
+    
+    try:
+        resultados = crear_prestamos_lote(db, [item.model_dump() for item in datos.prestamos])
+        db.commit()
+        return _respuesta_lote(resultados, "registraron")
+    except Exception as e:
+        db.rollback()
+        return JSONResponse(status_code=500, content={"detail": f"Error al crear préstamos: {str(e)}"})
+
 @router.put("/actualizarEstado")
-async def actualizar_estado_prestamo(prestamo: ActualizarEstado, db: Session = Depends(get_db)):
+def actualizar_estado_prestamo(prestamo: ActualizarEstado, db: Session = Depends(get_db)):
     from app.core.database.solicitud import Solicitud
     
     # Buscar el préstamo por su id
@@ -176,6 +494,9 @@ async def actualizar_estado_prestamo(prestamo: ActualizarEstado, db: Session = D
         # Actualizar el estado de la solicitud asociada
         solicitud = db.query(Solicitud).filter(Solicitud.IDSOLICITUD == existing_prestamo.IDSOLICITUD).first()
         if solicitud:
+            if nuevo_estado == 'finalizado' and solicitud.ESTADO != 'finalizado':
+                marcar_productos_disponibles(db, [solicitud.IDSOLICITUD])
+            registrar_cambio_estado(db, solicitud, solicitud.ESTADO, nuevo_estado)
             solicitud.ESTADO = nuevo_estado
             db.commit()
             return JSONResponse(status_code=200, content={"detail": "Estado actualizado"})
@@ -185,10 +506,13 @@ async def actualizar_estado_prestamo(prestamo: ActualizarEstado, db: Session = D
         return JSONResponse(status_code=404, content={"detail": "Préstamo No Encontrado"})
 
 @router.delete("/eliminar")
-async def eliminar_prestamo(prestamo: BuscarPrestamo, db: Session = Depends(get_db)):
+def eliminar_prestamo(prestamo: BuscarPrestamo, db: Session = Depends(get_db)):
     existing_prestamo = db.query(Prestamo).filter(Prestamo.IDPRESTAMO == prestamo.IDPRESTAMO).first()
     if existing_prestamo:
         try:
+            solicitud = existing_prestamo.solicitud
+            if solicitud and solicitud.ESTADO in ESTADOS_ACTIVOS:
+                ajustar_prestamos_activos(db, solicitud.IDENTIFICACION, -1)
             db.query(Prestamo).filter(Prestamo.IDPRESTAMO == prestamo.IDPRESTAMO).delete()
             db.commit()
             return JSONResponse(status_code=200, content={"detail": "Préstamo Eliminado"})
@@ -205,7 +529,7 @@ class ProlongacionRequest(BaseModel):
     dias: int
 
 @router.put("/{id_prestamo}/prolongar")
-async def prolongar_prestamo(id_prestamo: int, datos: ProlongacionRequest, db: Session = Depends(get_db)):
+def prolongar_prestamo(id_prestamo: int, datos: ProlongacionRequest, db: Session = Depends(get_db)):
     """
     Prolongar un préstamo extendiendo su fecha límite
     """
@@ -265,14 +589,12 @@ async def prolongar_prestamo(id_prestamo: int, datos: ProlongacionRequest, db: S
         return JSONResponse(status_code=500, content={"detail": f"Error al prolongar préstamo: {str(e)}"})
 
 @router.put("/{id_prestamo}/devolver")
-async def devolver_prestamo(id_prestamo: int, db: Session = Depends(get_db)):
+def devolver_prestamo(id_prestamo: int, db: Session = Depends(get_db)):
     """
     Devolver un préstamo cambiando el estado de la solicitud asociada a 'finalizado'
     """
     try:
         from app.core.database.solicitud import Solicitud
-        from app.core.database.producto_solicitud import ProductoSolicitud
-        from app.core.database.producto import Producto
         
         # Buscar el préstamo por su ID
         prestamo = db.query(Prestamo).filter(Prestamo.IDPRESTAMO == id_prestamo).first()
@@ -290,22 +612,13 @@ async def devolver_prestamo(id_prestamo: int, db: Session = Depends(get_db)):
         if solicitud.ESTADO not in ['pendiente', 'aprobado']:
             return JSONResponse(status_code=400, content={"detail": "El préstamo no está activo y no puede ser devuelto"})
         
+        # Actualizar estado de productos a 'Disponible' si el trigger no lo hará
+        marcar_productos_disponibles(db, [prestamo.IDSOLICITUD])
+        
         # Cambiar el estado a finalizado
+        registrar_cambio_estado(db, solicitud, solicitud.ESTADO, 'finalizado')
         solicitud.ESTADO = 'finalizado'
         
-        # Actualizar estado de productos a 'disponible' (backup del trigger)
-        try:
-            productos_solicitud = db.query(ProductoSolicitud).filter(
-                ProductoSolicitud.SOLICITUD_ID == prestamo.IDSOLICITUD
-            ).all()
-            
-            for ps in productos_solicitud:
-                producto = db.query(Producto).filter(Producto.IDPRODUCTO == ps.PRODUCTO_ID).first()
-                if producto:
-                    producto.ESTADO = 'Disponible'
-        except Exception as update_error:
-            print(f"Error actualizando estado de productos al devolver: {update_error}")
-        
         # Guardar los cambios
         db.commit()
         
@@ -321,8 +634,88 @@ async def devolver_prestamo(id_prestamo: int, db: Session = Depends(get_db)):
         print(f"Error al devolver préstamo: {e}")
         return JSONResponse(status_code=500, content={"detail": f"Error al devolver préstamo: {str(e)}"})
 
+class DevolucionLoteRequest(BaseModel):
+    prestamos: List[int]
+
+class ProlongacionLoteItem(BaseModel):
+    IDPRESTAMO: int
+    dias: int
+
+class ProlongacionLoteRequest(BaseModel):
+    prestamos: List[ProlongacionLoteItem]
+
+def _respuesta_lote(resultados: list, accion: str):
+    exitosos = sum(1 for resultado in resultados if resultado["exitoso"])
+    return JSONResponse(status_code=200, content={
+        "detail": f"Se {accion} {exitosos} de {len(resultados)} préstamos",
+        "total_procesados": len(resultados),
+        "exitosos": exitosos,
+        "fallidos": len(resultados) - exitosos,
+        "resultados": resultados
+    })
+
+@router.put("/devolver-lote")
+def devolver_prestamos_en_lote(datos: DevolucionLoteRequest, db: Session = Depends(get_db)):
+    """
+    Devolver varios préstamos en una sola transacción, con el resultado de cada uno
+    """
+    if not datos.prestamos:
+        return JSONResponse(status_code=400, content={"detail": "Debe enviar al menos un préstamo"})
+    
+    try:
+        resultados = devolver_prestamos_lote(db, datos.prestamos)
+        db.commit()
+        return _respuesta_lote(resultados, "devolvieron")
+    except Exception as e:
+        db.rollback()
+        print(f"Error al devolver préstamos: {e}")
+        return JSONResponse(status_code=500, content={"detail": f"Error al devolver préstamos: {str(e)}"})
+
+@router.put("/prolongar-lote")
+def prolongar_prestamos_en_lote(datos: ProlongacionLoteRequest, db: Session = Depends(get_db)):
+    """
+    Prolongar varios préstamos en una sola transacción, con el resultado de cada uno
+    """
+    if not datos.prestamos:
+        return JSONResponse(status_code=400, content={"detail": "Debe enviar al menos un préstamo"})
+    
+    try:
+        resultados = prolongar_prestamos_lote(db, [item.model_dump() for item in datos.prestamos])
+        db.commit()
+        return _respuesta_lote(resultados, "prolongaron")
+    except Exception as e:
+        db.rollback()
+        print(f"Error al prolongar préstamos: {e}")
+        return JSONResponse(status_code=500, content={"detail": f"Error al prolongar préstamos: {str(e)}"})
+
+@router.get("/activos")
+def obtener_contadores_activos(identificacion: Optional[List[str]] = Query(None), db: Session = Depends(get_db)):
+    """
+    Préstamos activos por solicitante, leídos del contador (para insignias en la interfaz)
+    """
+    query = db.query(PrestamosActivos).filter(PrestamosActivos.CANTIDAD > 0)
+    if identificacion:
+        query = query.filter(PrestamosActivos.IDENTIFICACION.in_(identificacion))
+    
+    return {contador.IDENTIFICACION: contador.CANTIDAD for contador in query.all()}
+
+@router.post("/activos/reconciliar")
+def reconciliar_contadores_activos(db: Session = Depends(get_db)):
+    """
+    Reconstruye los contadores de préstamos activos desde el historial
+    """
+    try:
+        solicitantes = reconciliar_prestamos_activos(db)
+        return JSONResponse(status_code=200, content={
+            "detail": "Contadores de préstamos activos reconstruidos",
+            "solicitantes_con_prestamos": solicitantes
+        })
+    except Exception as e:
+        db.rollback()
+        return JSONResponse(status_code=500, content={"detail": f"Error al reconciliar contadores: {str(e)}"})
+
 @router.get("/buscar")
-async def buscar_prestamo(id: str = None, db: Session = Depends(get_db)):
+def buscar_prestamo(id: str = None, db: Session = Depends(get_db)):
     query = db.query(Prestamo)
     if id:
         query = query.filter(Prestamo.IDPRESTAMO == id)
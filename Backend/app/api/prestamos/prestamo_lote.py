@@ -0,0 +1,285 @@
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session
+from app.core.database.prestamo import Prestamo
+from app.core.database.solicitud import Solicitud
+from app.core.database.solicitante import Solicitante
+from app.core.database.producto import Producto
+from app.core.database.producto_solicitud import ProductoSolicitud
+from app.api.prestamos.prestamo_validacion import (
+    cargar_contextos_solicitantes,
+    contar_equipos_prestados_lote,
+    obtener_tipo_equipo_computo,
+    verificar_solicitante,
+    validar_fecha_limite,
+    validar_fecha_registro,
+    verificar_limite_prestamos,
+    verificar_equipos_aprendiz,
+    PrestamoValidacionError,
+    ESTADOS_ACTIVOS,
+)
+from app.api.prestamos.estado_productos import marcar_productos_prestados, marcar_productos_disponibles
+from app.api.prestamos.contador_prestamos import ajustar_prestamos_activos_lote
+
+def crear_prestamos_lote(db: Session, items: list) -> list:
+    """
+    Valida y registra varios préstamos a la vez. Cada item es un dict con IDSOLICITUD,
+    FECHA_LIMITE y opcionalmente FECHA_REGISTRO (AAAA-MM-DD).
+
+    Solicitudes, productos, solicitantes y contadores se cargan con un número fijo de
+    consultas; la validación se hace en memoria teniendo en cuenta los préstamos ya
+    aceptados del mismo lote, y los préstamos válidos se insertan con un solo INSERT.
+    No confirma la transacción: eso queda a cargo de quien llama.
+
+    Retorna un resultado por item en el mismo orden de entrada.
+    """
+    resultados = [{"IDSOLICITUD": item["IDSOLICITUD"]} for item in items]
+    ids_solicitudes = list({item["IDSOLICITUD"] for item in items})
+
+    solicitudes = {
+        s.IDSOLICITUD: s for s in db.query(Solicitud).filter(Solicitud.IDSOLICITUD.in_(ids_solicitudes)).all()
+    } if ids_solicitudes else {}
+
+    con_prestamo = {fila[0] for fila in db.query(Prestamo.IDSOLICITUD).filter(
+        Prestamo.IDSOLICITUD.in_(list(solicitudes))
+    ).distinct().all()} if solicitudes else set()
+
+    # Productos de todas las solicitudes como (id, tipo, estado), para contar equipos
+    # de cómputo y ajustar los contadores de productos
+    productos_por_solicitud = {}
+    if solicitudes:
+        for solicitud_id, producto_id, tipo_id, estado in db.query(
+            ProductoSolicitud.SOLICITUD_ID, Producto.IDPRODUCTO, Producto.IDTIPOPRODUCTO, Producto.ESTADO
+        ).join(
+            Producto, Producto.IDPRODUCTO == ProductoSolicitud.PRODUCTO_ID
+        ).filter(ProductoSolicitud.SOLICITUD_ID.in_(list(solicitudes))).all():
+            productos_por_solicitud.setdefault(solicitud_id, []).append((producto_id, tipo_id, estado))
+
+    contextos = cargar_contextos_solicitantes(db, list({s.IDENTIFICACION for s in solicitudes.values()}))
+
+    # Los equipos prestados solo importan para aprendices que piden equipos de cómputo
+    tipo_equipo_id = None
+    aprendices = [
+        identificacion for identificacion, contexto in contextos.items()
+        if (contexto.solicitante.ROL or '').lower() == 'aprendiz'
+    ]
+    if aprendices:
+        tipo_equipo_id = obtener_tipo_equipo_computo(db)
+        if tipo_equipo_id:
+            for identificacion, cantidad in contar_equipos_prestados_lote(db, aprendices, tipo_equipo_id).items():
+                contextos[identificacion].equipos_prestados = cantidad
+
+    nuevos = []
+    vistos = set()
+    deltas = {}
+    for resultado, item in zip(resultados, items):
+        solicitud = solicitudes.get(item["IDSOLICITUD"])
+        try:
+            if not solicitud:
+                raise PrestamoValidacionError("Solicitud no encontrada")
+            if solicitud.IDSOLICITUD in vistos:
+                raise PrestamoValidacionError("La solicitud está repetida en el lote")
+            if solicitud.IDSOLICITUD in con_prestamo:
+                raise PrestamoValidacionError("La solicitud ya tiene un préstamo registrado")
+
+            try:
+                fecha_limite = datetime.strptime(item["FECHA_LIMITE"], '%Y-%m-%d').date()
+                fecha_registro = datetime.strptime(item["FECHA_REGISTRO"], '%Y-%m-%d').date() if item.get("FECHA_REGISTRO") else date.today()
+            except ValueError:
+                raise PrestamoValidacionError("Formato de fecha inválido (use AAAA-MM-DD)")
+
+            contexto = contextos.get(solicitud.IDENTIFICACION)
+            verificar_solicitante(contexto.solicitante if contexto else None)
+            validar_fecha_limite(fecha_limite)
+            validar_fecha_registro(fecha_registro, fecha_limite)
+            verificar_limite_prestamos(contexto)
+
+            equipos_solicitados = 0
+            if tipo_equipo_id and (contexto.solicitante.ROL or '').lower() == 'aprendiz':
+                equipos_solicitados = sum(
+                    1 for _, tipo_id, _ in productos_por_solicitud.get(solicitud.IDSOLICITUD, [])
+                    if tipo_id == tipo_equipo_id
+                )
+                if equipos_solicitados:
+                    verificar_equipos_aprendiz(contexto, equipos_solicitados)
+        except PrestamoValidacionError as e:
+            resultado.update({"exitoso": False, "detail": str(e)})
+            continue
+
+        # Los siguientes items del mismo solicitante ven este préstamo como activo
+        vistos.add(solicitud.IDSOLICITUD)
+        if solicitud.ESTADO in ESTADOS_ACTIVOS:
+            contexto.prestamos_activos += 1
+            contexto.equipos_prestados = (contexto.equipos_prestados or 0) + equipos_solicitados
+            deltas[solicitud.IDENTIFICACION] = deltas.get(solicitud.IDENTIFICACION, 0) + 1
+
+        nuevos.append({
+            "IDSOLICITUD": solicitud.IDSOLICITUD,
+            "FECHA_REGISTRO": fecha_registro,
+            "FECHA_LIMITE": fecha_limite,
+            "FECHA_PROLONGACION": None
+        })
+        resultado.update({
+            "exitoso": True,
+            "FECHA_REGISTRO": fecha_registro.isoformat(),
+            "FECHA_LIMITE": fecha_limite.isoformat()
+        })
+
+    if not nuevos:
+        return resultados
+
+    db.execute(insert(Prestamo), nuevos)
+
+    # Recuperar los IDs generados; cada solicitud aceptada tiene un único préstamo
+    ids_aceptados = [nuevo["IDSOLICITUD"] for nuevo in nuevos]
+    ids_prestamos = dict(db.query(Prestamo.IDSOLICITUD, Prestamo.IDPRESTAMO).filter(
+        Prestamo.IDSOLICITUD.in_(ids_aceptados)
+    ).all())
+    for resultado in resultados:
+        if resultado["exitoso"]:
+            resultado["IDPRESTAMO"] = ids_prestamos.get(resultado["IDSOLICITUD"])
+
+    marcar_productos_prestados(db, ids_aceptados, [
+        producto for solicitud_id in ids_aceptados for producto in productos_por_solicitud.get(solicitud_id, [])
+    ])
+    ajustar_prestamos_activos_lote(db, deltas)
+
+    return resultados
+
+def devolver_prestamos_lote(db: Session, ids_prestamos: list) -> list:
+    """
+    Devuelve varios préstamos: carga préstamos y solicitudes con una sola consulta,
+    aplica las mismas reglas que /{id}/devolver en memoria y finaliza todas las
+    solicitudes con un único UPDATE. No confirma la transacción.
+
+    Retorna un resultado por préstamo en el mismo orden de entrada.
+    """
+    filas = {
+        fila.IDPRESTAMO: fila for fila in db.query(
+            Prestamo.IDPRESTAMO, Prestamo.IDSOLICITUD, Solicitud.ESTADO, Solicitud.IDENTIFICACION
+        ).outerjoin(
+            Solicitud, Prestamo.IDSOLICITUD == Solicitud.IDSOLICITUD
+        ).filter(Prestamo.IDPRESTAMO.in_(list(set(ids_prestamos)))).all()
+    } if ids_prestamos else {}
+
+    resultados = []
+    finalizadas = {}
+    for id_prestamo in ids_prestamos:
+        fila = filas.get(id_prestamo)
+        if not fila:
+            resultados.append({"IDPRESTAMO": id_prestamo, "exitoso": False, "detail": "Préstamo no encontrado"})
+            continue
+        if fila.ESTADO is None:
+            resultados.append({"IDPRESTAMO": id_prestamo, "exitoso": False, "detail": "Solicitud asociada no encontrada"})
+            continue
+        # Una solicitud finalizada antes en el mismo lote ya no está activa
+        if fila.ESTADO not in ['pendiente', 'aprobado'] or fila.IDSOLICITUD in finalizadas:
+            resultados.append({"IDPRESTAMO": id_prestamo, "exitoso": False, "detail": "El préstamo no está activo y no puede ser devuelto"})
+            continue
+
+        finalizadas[fila.IDSOLICITUD] = fila.IDENTIFICACION
+        resultados.append({
+            "IDPRESTAMO": id_prestamo,
+            "exitoso": True,
+            "IDSOLICITUD": fila.IDSOLICITUD,
+            "nuevo_estado": "finalizado"
+        })
+
+    if not finalizadas:
+        return resultados
+
+    ids_solicitudes = list(finalizadas)
+
+    # Cada solicitud finalizada deja de sumar todos sus préstamos al contador
+    deltas = {}
+    for solicitud_id, cantidad in db.query(
+        Prestamo.IDSOLICITUD, func.count(Prestamo.IDPRESTAMO)
+    ).filter(Prestamo.IDSOLICITUD.in_(ids_solicitudes)).group_by(Prestamo.IDSOLICITUD).all():
+        identificacion = finalizadas[solicitud_id]
+        deltas[identificacion] = deltas.get(identificacion, 0) - cantidad
+
+    # Actualizar estado de productos a 'Disponible' si el trigger no lo hará (antes de
+    # finalizar las solicitudes, para leer su estado anterior)
+    marcar_productos_disponibles(db, ids_solicitudes)
+
+    db.query(Solicitud).filter(
+        Solicitud.IDSOLICITUD.in_(ids_solicitudes)
+    ).update({Solicitud.ESTADO: 'finalizado'}, synchronize_session=False)
+    ajustar_prestamos_activos_lote(db, deltas)
+
+    return resultados
+
+def prolongar_prestamos_lote(db: Session, items: list) -> list:
+    """
+    Prolonga varios préstamos. Cada item es un dict con IDPRESTAMO y dias.
+
+    Préstamos, solicitudes y solicitantes se cargan con una sola consulta, las reglas
+    de /{id}/prolongar (incluido el máximo de un día para aprendices) se aplican en
+    memoria y las nuevas fechas se guardan con un UPDATE por lotes. No confirma la
+    transacción.
+
+    Retorna un resultado por item en el mismo orden de entrada.
+    """
+    ids_prestamos = list({item["IDPRESTAMO"] for item in items})
+    filas = {
+        fila.IDPRESTAMO: fila for fila in db.query(
+            Prestamo.IDPRESTAMO,
+            Prestamo.FECHA_LIMITE,
+            Prestamo.FECHA_PROLONGACION,
+            Solicitud.IDSOLICITUD,
+            Solicitud.ESTADO,
+            Solicitante.IDENTIFICACION,
+            Solicitante.ROL
+        ).outerjoin(
+            Solicitud, Prestamo.IDSOLICITUD == Solicitud.IDSOLICITUD
+        ).outerjoin(
+            Solicitante, Solicitante.IDENTIFICACION == Solicitud.IDENTIFICACION
+        ).filter(Prestamo.IDPRESTAMO.in_(ids_prestamos)).all()
+    } if ids_prestamos else {}
+
+    resultados = []
+    cambios = {}
+    fecha_prolongacion = date.today()
+    for item in items:
+        id_prestamo, dias = item["IDPRESTAMO"], item["dias"]
+        fila = filas.get(id_prestamo)
+
+        if not fila:
+            error = "Préstamo no encontrado"
+        elif fila.FECHA_PROLONGACION or id_prestamo in cambios:
+            error = "El préstamo ya ha sido prolongado"
+        elif fila.IDSOLICITUD is None:
+            error = "Solicitud asociada no encontrada"
+        elif fila.ESTADO not in ['pendiente', 'aprobado']:
+            error = "El préstamo no está activo y no puede ser prolongado"
+        elif fila.IDENTIFICACION is None:
+            error = "Solicitante no encontrado"
+        elif fila.ROL.lower() == 'aprendiz' and dias > 1:
+            error = "Los aprendices solo pueden prolongar por 1 día"
+        elif dias <= 0 or dias > 30:
+            error = "Los días de prolongación deben estar entre 1 y 30"
+        else:
+            error = None
+
+        if error:
+            resultados.append({"IDPRESTAMO": id_prestamo, "exitoso": False, "detail": error})
+            continue
+
+        nueva_fecha_limite = fila.FECHA_LIMITE + timedelta(days=dias)
+        cambios[id_prestamo] = {
+            "IDPRESTAMO": id_prestamo,
+            "FECHA_LIMITE": nueva_fecha_limite,
+            "FECHA_PROLONGACION": fecha_prolongacion
+        }
+        resultados.append({
+            "IDPRESTAMO": id_prestamo,
+            "exitoso": True,
+            "detail": f"Préstamo prolongado por {dias} días",
+            "nueva_fecha_limite": nueva_fecha_limite.isoformat()
+        })
+
+    # UPDATE por llave primaria con todos los cambios en una sola ejecución
+    if cambios:
+        db.execute(update(Prestamo), list(cambios.values()))
+
+    return resultados
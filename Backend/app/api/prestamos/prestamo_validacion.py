@@ -1,3 +1,4 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from app.core.database.prestamo import Prestamo
@@ -6,16 +7,60 @@ from app.core.database.producto import Producto
 from app.core.database.tipo_producto import TipoProducto
 from app.core.database.solicitud import Solicitud
 from app.core.database.producto_solicitud import ProductoSolicitud
+from app.api.prestamos.contador_prestamos import (
+    ESTADOS_ACTIVOS,
+    obtener_prestamos_activos,
+    obtener_prestamos_activos_lote,
+)
+
+# Máximo de días que puede durar un préstamo
+MAX_DIAS_PRESTAMO = 30
+
+# Definir límites por rol
+LIMITES_PRESTAMOS = {
+    'aprendiz': 1,
+    'instructor': 2,
+    'funcionario': 2,
+    'contratista': 2
+}
 
 class PrestamoValidacionError(Exception):
     pass
 
-def validar_prestamo(db: Session, identificacion_solicitante: str, fecha_limite: datetime):
+class ContextoSolicitante:
     """
-    Valida si un solicitante puede realizar un préstamo
+    Datos de un solicitante que comparten las validaciones de un préstamo.
+    Los conteos se cargan bajo demanda y solo una vez.
+    """
+    def __init__(self, solicitante: Solicitante, prestamos_activos: int = None, equipos_prestados: int = None):
+        self.solicitante = solicitante
+        self.prestamos_activos = prestamos_activos
+        self.equipos_prestados = equipos_prestados
+
+def cargar_contexto_solicitante(db: Session, identificacion_solicitante: str) -> ContextoSolicitante:
+    """
+    Carga el solicitante una sola vez y verifica que pueda realizar préstamos
     """
-    # Verificar si el solicitante existe
     solicitante = db.query(Solicitante).filter(Solicitante.IDENTIFICACION == identificacion_solicitante).first()
+    verificar_solicitante(solicitante)
+    return ContextoSolicitante(solicitante)
+
+def cargar_contextos_solicitantes(db: Session, identificaciones: list) -> dict:
+    """
+    Carga varios solicitantes y sus contadores de préstamos activos con una consulta
+    cada uno. Los solicitantes inexistentes no aparecen en el resultado.
+    """
+    if not identificaciones:
+        return {}
+    solicitantes = db.query(Solicitante).filter(Solicitante.IDENTIFICACION.in_(identificaciones)).all()
+    prestamos_activos = obtener_prestamos_activos_lote(db, [s.IDENTIFICACION for s in solicitantes])
+    return {
+        s.IDENTIFICACION: ContextoSolicitante(s, prestamos_activos=prestamos_activos[s.IDENTIFICACION])
+        for s in solicitantes
+    }
+
+def verificar_solicitante(solicitante: Solicitante):
+    # Verificar si el solicitante existe
     if not solicitante:
         raise PrestamoValidacionError("El solicitante no existe")
 
@@ -23,101 +68,125 @@ def validar_prestamo(db: Session, identificacion_solicitante: str, fecha_limite:
     if solicitante.ESTADO != 'apto':
         raise PrestamoValidacionError("El solicitante no está apto para realizar préstamos")
 
+def validar_fecha_limite(fecha_limite: datetime):
     # Verificar si la fecha límite es válida (no puede ser anterior a la fecha actual)
     if fecha_limite < datetime.now().date():
         raise PrestamoValidacionError("La fecha límite no puede ser anterior a la fecha actual")
 
-    # Verificar si la fecha límite no excede el máximo permitido (por ejemplo, 30 días)
-    max_dias = 30
-    fecha_maxima = datetime.now().date() + timedelta(days=max_dias)
+    # Verificar si la fecha límite no excede el máximo permitido
+    fecha_maxima = datetime.now().date() + timedelta(days=MAX_DIAS_PRESTAMO)
     if fecha_limite > fecha_maxima:
-        raise PrestamoValidacionError(f"La fecha límite no puede exceder {max_dias} días")
+        raise PrestamoValidacionError(f"La fecha límite no puede exceder {MAX_DIAS_PRESTAMO} días")
 
-    # Verificar si el solicitante tiene préstamos activos
-    from app.core.database.solicitud import Solicitud
-    
-    prestamos_activos = db.query(Prestamo).join(Solicitud).filter(
-        Solicitud.IDENTIFICACION == identificacion_solicitante,
-        Solicitud.ESTADO.in_(['pendiente', 'aprobado'])
-    ).count()
-
-    # Definir límites por rol
-    limites_prestamos = {
-        'aprendiz': 1,
-        'instructor': 2,
-        'funcionario': 2,
-        'contratista': 2
-    }
+def validar_fecha_registro(fecha_registro, fecha_limite):
+    # Misma regla que el trigger before_prestamo_insert, para rechazarla antes de escribir
+    if fecha_limite <= fecha_registro:
+        raise PrestamoValidacionError("La fecha límite debe ser posterior a la fecha de registro")
 
-    limite = limites_prestamos.get(solicitante.ROL, 1)  # Por defecto 1 si el rol no está definido
-    if prestamos_activos >= limite:
+def verificar_limite_prestamos(contexto: ContextoSolicitante):
+    limite = LIMITES_PRESTAMOS.get(contexto.solicitante.ROL, 1)  # Por defecto 1 si el rol no está definido
+    if contexto.prestamos_activos >= limite:
         raise PrestamoValidacionError(f"El solicitante ya tiene el máximo de préstamos permitidos ({limite})")
 
+def verificar_equipos_aprendiz(contexto: ContextoSolicitante, equipos_solicitados: int):
+    # Verificar si el aprendiz ya tiene un equipo de cómputo prestado
+    if contexto.equipos_prestados:
+        raise PrestamoValidacionError(
+            "Los aprendices no pueden solicitar más de un equipo de cómputo. "
+            "Ya tienes un equipo de cómputo prestado."
+        )
+
+    # Verificar si está solicitando más de un equipo de cómputo en esta solicitud
+    if equipos_solicitados > 1:
+        raise PrestamoValidacionError(
+            "Los aprendices no pueden solicitar más de un equipo de cómputo por solicitud."
+        )
+
+def obtener_tipo_equipo_computo(db: Session):
+    """
+    Retorna el IDTIPOPRODUCTO de "equipo de cómputo" o None si no existe
+    """
+    tipo_equipo_computo = db.query(TipoProducto.IDTIPOPRODUCTO).filter(
+        TipoProducto.NOMBRE_TIPO_PRODUCTO.ilike('%equipo%computo%')
+    ).first()
+    return tipo_equipo_computo[0] if tipo_equipo_computo else None
+
+def contar_equipos_prestados(db: Session, identificacion_solicitante: str, tipo_equipo_id: int) -> int:
+    """
+    Cuenta en una sola consulta los equipos de cómputo que el solicitante tiene en préstamos activos
+    """
+    return db.query(func.count(ProductoSolicitud.PRODUCTO_ID)).select_from(Prestamo).join(
+        Solicitud, Prestamo.IDSOLICITUD == Solicitud.IDSOLICITUD
+    ).join(
+        ProductoSolicitud, ProductoSolicitud.SOLICITUD_ID == Solicitud.IDSOLICITUD
+    ).join(
+        Producto, Producto.IDPRODUCTO == ProductoSolicitud.PRODUCTO_ID
+    ).filter(
+        Solicitud.IDENTIFICACION == identificacion_solicitante,
+        Solicitud.ESTADO.in_(ESTADOS_ACTIVOS),
+        Producto.IDTIPOPRODUCTO == tipo_equipo_id
+    ).scalar()
+
+def contar_equipos_prestados_lote(db: Session, identificaciones: list, tipo_equipo_id: int) -> dict:
+    """
+    Igual que contar_equipos_prestados pero para varios solicitantes en una consulta agrupada
+    """
+    if not identificaciones:
+        return {}
+    conteos = dict(db.query(
+        Solicitud.IDENTIFICACION,
+        func.count(ProductoSolicitud.PRODUCTO_ID)
+    ).select_from(Prestamo).join(
+        Solicitud, Prestamo.IDSOLICITUD == Solicitud.IDSOLICITUD
+    ).join(
+        ProductoSolicitud, ProductoSolicitud.SOLICITUD_ID == Solicitud.IDSOLICITUD
+    ).join(
+        Producto, Producto.IDPRODUCTO == ProductoSolicitud.PRODUCTO_ID
+    ).filter(
+        Solicitud.IDENTIFICACION.in_(identificaciones),
+        Solicitud.ESTADO.in_(ESTADOS_ACTIVOS),
+        Producto.IDTIPOPRODUCTO == tipo_equipo_id
+    ).group_by(Solicitud.IDENTIFICACION).all())
+    return {identificacion: conteos.get(identificacion, 0) for identificacion in identificaciones}
+
+def validar_prestamo(db: Session, identificacion_solicitante: str, fecha_limite: datetime, contexto: ContextoSolicitante = None):
+    """
+    Valida si un solicitante puede realizar un préstamo
+    """
+    if contexto is None:
+        contexto = cargar_contexto_solicitante(db, identificacion_solicitante)
+
+    validar_fecha_limite(fecha_limite)
+
+    # Verificar si el solicitante tiene préstamos activos (contador mantenido por transacción)
+    if contexto.prestamos_activos is None:
+        contexto.prestamos_activos = obtener_prestamos_activos(db, identificacion_solicitante)
+
+    verificar_limite_prestamos(contexto)
+
     return True
 
-def validar_productos_solicitud(db: Session, identificacion_solicitante: str, productos_ids: list):
+def validar_productos_solicitud(db: Session, identificacion_solicitante: str, productos_ids: list, contexto: ContextoSolicitante = None):
     """
     Valida si un solicitante puede solicitar los productos específicos
     """
-    # Verificar si el solicitante existe
-    solicitante = db.query(Solicitante).filter(Solicitante.IDENTIFICACION == identificacion_solicitante).first()
-    if not solicitante:
-        raise PrestamoValidacionError("El solicitante no existe")
-
-    # Verificar si el solicitante está apto
-    if solicitante.ESTADO != 'apto':
-        raise PrestamoValidacionError("El solicitante no está apto para realizar préstamos")
+    if contexto is None:
+        contexto = cargar_contexto_solicitante(db, identificacion_solicitante)
 
     # Validación específica para aprendices y equipos de cómputo
-    if solicitante.ROL.lower() == 'aprendiz':
-        # Obtener el tipo de producto "equipo de cómputo"
-        tipo_equipo_computo = db.query(TipoProducto).filter(
-            TipoProducto.NOMBRE_TIPO_PRODUCTO.ilike('%equipo%computo%')
-        ).first()
-        
-        if not tipo_equipo_computo:
-            tipo_equipo_computo = db.query(TipoProducto).filter(
-                TipoProducto.NOMBRE_TIPO_PRODUCTO.ilike('%equipo de computo%')
-            ).first()
-        
-        if tipo_equipo_computo:
-            # Verificar si alguno de los productos solicitados es equipo de cómputo
-            productos_equipo_computo = []
-            for producto_id in productos_ids:
-                producto = db.query(Producto).filter(Producto.IDPRODUCTO == producto_id).first()
-                if producto and producto.IDTIPOPRODUCTO == tipo_equipo_computo.IDTIPOPRODUCTO:
-                    productos_equipo_computo.append(producto)
-            
-            if productos_equipo_computo:
-                # Verificar si el aprendiz ya tiene un equipo de cómputo prestado
-                # Buscar préstamos activos del solicitante
-                prestamos_activos = db.query(Prestamo).join(Solicitud).filter(
-                    Solicitud.IDENTIFICACION == identificacion_solicitante,
-                    Solicitud.ESTADO.in_(['pendiente', 'aprobado'])
-                ).all()
-                
-                for prestamo in prestamos_activos:
-                    # Verificar productos de cada préstamo activo
-                    productos_prestamo = db.query(ProductoSolicitud).filter(
-                        ProductoSolicitud.SOLICITUD_ID == prestamo.IDSOLICITUD
-                    ).all()
-                    
-                    for ps in productos_prestamo:
-                        producto_prestado = db.query(Producto).filter(
-                            Producto.IDPRODUCTO == ps.PRODUCTO_ID
-                        ).first()
-                        
-                        if (producto_prestado and 
-                            producto_prestado.IDTIPOPRODUCTO == tipo_equipo_computo.IDTIPOPRODUCTO):
-                            raise PrestamoValidacionError(
-                                "Los aprendices no pueden solicitar más de un equipo de cómputo. "
-                                "Ya tienes un equipo de cómputo prestado."
-                            )
-                
-                # Verificar si está solicitando más de un equipo de cómputo en esta solicitud
-                if len(productos_equipo_computo) > 1:
-                    raise PrestamoValidacionError(
-                        "Los aprendices no pueden solicitar más de un equipo de cómputo por solicitud."
-                    )
+    if contexto.solicitante.ROL.lower() == 'aprendiz' and productos_ids:
+        tipo_equipo_id = obtener_tipo_equipo_computo(db)
+
+        if tipo_equipo_id:
+            # Contar los equipos de cómputo solicitados con una sola consulta IN
+            equipos_solicitados = db.query(func.count(Producto.IDPRODUCTO)).filter(
+                Producto.IDPRODUCTO.in_(productos_ids),
+                Producto.IDTIPOPRODUCTO == tipo_equipo_id
+            ).scalar()
+
+            if equipos_solicitados:
+                if contexto.equipos_prestados is None:
+                    contexto.equipos_prestados = contar_equipos_prestados(db, identificacion_solicitante, tipo_equipo_id)
+                verificar_equipos_aprendiz(contexto, equipos_solicitados)
 
     return True
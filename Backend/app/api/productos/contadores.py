@@ -0,0 +1,172 @@
+"""
+Contadores de productos por tipo y estado mantenidos en memoria para /productos/contadores.
+
+Cada cambio (crear, actualizar, eliminar, prestar o devolver) se registra como el
+paso de un producto de (tipo, estado) anterior a (tipo, estado) nuevo y ajusta los
+conteos sin consultar la base de datos, incluso cuando el nuevo estado lo escribe
+un trigger de MySQL. Los cambios se aplican cuando su transacción se confirma.
+
+La carga es una sola consulta agrupada por tipo y estado (índice
+idx_producto_tipo_estado); las peticiones que llegan mientras tanto esperan esa
+misma carga en lugar de lanzar la suya. Para incorporar cambios de otros procesos,
+un hilo recalcula los contadores cada RECONCILIACION segundos.
+"""
+import threading
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.database.db import SessionLocal, al_confirmar
+from app.core.database.producto import Producto
+from app.core.database.tipo_producto import TipoProducto
+
+# Segundos entre reconciliaciones con la base de datos
+RECONCILIACION = 300
+
+_tipos = None        # id de tipo -> nombre, en orden de id
+_conteos = {}        # id de tipo -> {estado: cantidad}
+_cambios_en_carga = None
+_lock = threading.Lock()
+_lock_carga = threading.Lock()
+_reconciliador = None
+_detener = threading.Event()
+
+def obtener() -> list:
+    """
+    Lista de (nombre del tipo, {estado: cantidad}) de todos los tipos, en orden de id
+    """
+    while True:
+        _asegurar_cargado()
+        with _lock:
+            # Si se invalidó entre la carga y la lectura, volver a cargar
+            if _tipos is not None:
+                return [(nombre, dict(_conteos.get(id_tipo, {}))) for id_tipo, nombre in _tipos.items()]
+
+def recalcular():
+    """
+    Cuenta los productos por tipo y estado con una consulta agrupada y reemplaza los
+    contadores actuales
+    """
+    global _tipos, _conteos, _cambios_en_carga
+    with _lock:
+        # Los cambios confirmados mientras se ejecuta la consulta se aplican al final
+        _cambios_en_carga = []
+    try:
+        db = SessionLocal()
+        try:
+            filas = db.query(
+                TipoProducto.IDTIPOPRODUCTO,
+                TipoProducto.NOMBRE_TIPO_PRODUCTO,
+                Producto.ESTADO,
+                func.count(Producto.IDPRODUCTO)
+            ).outerjoin(
+                Producto, Producto.IDTIPOPRODUCTO == TipoProducto.IDTIPOPRODUCTO
+            ).group_by(
+                TipoProducto.IDTIPOPRODUCTO, TipoProducto.NOMBRE_TIPO_PRODUCTO, Producto.ESTADO
+            ).order_by(TipoProducto.IDTIPOPRODUCTO).all()
+        finally:
+            db.close()
+
+        tipos = {}
+        conteos = {}
+        for id_tipo, nombre, estado, cantidad in filas:
+            tipos[id_tipo] = nombre
+            if cantidad:
+                conteos.setdefault(id_tipo, {})[estado] = cantidad
+
+        with _lock:
+            for cambios in _cambios_en_carga:
+                _aplicar_en(conteos, cambios)
+            _tipos, _conteos = tipos, conteos
+    finally:
+        with _lock:
+            _cambios_en_carga = None
+
+def invalidar():
+    """
+    Descarta los contadores; la siguiente consulta los vuelve a cargar
+    """
+    global _tipos
+    with _lock:
+        _tipos = None
+
+def iniciar_reconciliacion():
+    """
+    Inicia (una sola vez por proceso) el hilo que recalcula los contadores cada
+    RECONCILIACION segundos, aunque nadie los consulte
+    """
+    global _reconciliador
+    if _reconciliador is None:
+        _detener.clear()
+        _reconciliador = threading.Thread(target=_reconciliar, name="contadores-productos", daemon=True)
+        _reconciliador.start()
+
+def detener_reconciliacion():
+    """
+    Detiene el hilo de reconciliación (al apagar la aplicación)
+    """
+    global _reconciliador
+    if _reconciliador is not None:
+        _detener.set()
+        _reconciliador.join()
+        _reconciliador = None
+
+def registrar_al_confirmar(db: Session, cambios: list):
+    """
+    Registra cambios de productos, como pares (anterior, nuevo) de tuplas (id de tipo,
+    estado), cuando la transacción de `db` se confirme. `anterior` es None para un
+    producto creado y `nuevo` es None para uno eliminado.
+    """
+    cambios = list(cambios)
+    al_confirmar(db, lambda: _aplicar(cambios))
+
+def cambiar_estado_al_confirmar(db: Session, productos: list, estado: str):
+    """
+    Registra que los productos dados, como tuplas (id, id de tipo, estado anterior),
+    pasan a `estado` cuando la transacción de `db` se confirme
+    """
+    registrar_al_confirmar(db, [
+        ((id_tipo, anterior), (id_tipo, estado)) for _, id_tipo, anterior in productos
+    ])
+
+def eliminar_al_confirmar(db: Session, productos: list):
+    """
+    Quita de los contadores los productos eliminados, como tuplas (id de tipo, estado),
+    cuando la transacción de `db` se confirme
+    """
+    registrar_al_confirmar(db, [(producto, None) for producto in productos])
+
+def _aplicar(cambios: list):
+    with _lock:
+        if _cambios_en_carga is not None:
+            _cambios_en_carga.append(cambios)
+        if _tipos is not None:
+            _aplicar_en(_conteos, cambios)
+
+def _aplicar_en(conteos: dict, cambios: list):
+    for anterior, nuevo in cambios:
+        if anterior == nuevo:
+            continue
+        if anterior is not None:
+            _sumar(conteos, *anterior, -1)
+        if nuevo is not None:
+            _sumar(conteos, *nuevo, 1)
+
+def _sumar(conteos: dict, id_tipo: int, estado: str, cantidad: int):
+    por_estado = conteos.setdefault(id_tipo, {})
+    por_estado[estado] = por_estado.get(estado, 0) + cantidad
+    if not por_estado[estado]:
+        del por_estado[estado]
+
+def _asegurar_cargado():
+    if _tipos is None:
+        # Una sola carga aunque lleguen varias peticiones a la vez
+        with _lock_carga:
+            if _tipos is None:
+                recalcular()
+
+def _reconciliar():
+    while not _detener.wait(RECONCILIACION):
+        try:
+            with _lock_carga:
+                recalcular()
+        except Exception as e:
+            print(f"Error al reconciliar los contadores de productos: {e}")
@@ -0,0 +1,195 @@
+"""
+Fotografías de la disponibilidad de productos por jornada en GS_CONTEO_DIARIO.
+
+Al inicio de cada jornada (HORAS_JORNADA) un hilo en segundo plano copia el estado
+de todos los productos con un único INSERT ... SELECT: una fila por producto, con su
+tipo y cantidadDisponible 1 si está disponible y 0 si no. Los productos dados de
+baja no se incluyen. Los reportes históricos leen estas fotografías en lugar de
+reconstruir la disponibilidad a partir del historial de préstamos; al eliminar un
+producto sus fotografías se conservan (con idProducto en NULL) y siguen contando.
+"""
+import threading
+from datetime import date, datetime, timedelta
+from datetime import time as hora
+from sqlalchemy import case, func, insert, literal, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.database.db import SessionLocal
+from app.core.database.conteo_diario import ConteoDiario
+from app.core.database.producto import Producto
+from app.core.database.tipo_producto import TipoProducto
+
+# Hora de inicio de cada jornada, en el orden del día
+HORAS_JORNADA = {
+    'mañana': hora(7, 0),
+    'tarde': hora(13, 0)
+}
+
+# Máximo de segundos que duerme el programador entre revisiones (cambios de hora del reloj)
+MAX_ESPERA_PROGRAMADOR = 3600
+
+_programador = None
+_detener = threading.Event()
+
+def tomar_conteo(db: Session, fecha: date, jornada: str) -> int:
+    """
+    Guarda la disponibilidad actual de los productos como la jornada de `fecha` y
+    confirma la transacción. No hace nada si esa jornada ya tiene fotografía.
+
+    Retorna la cantidad de productos guardados.
+    """
+    if _existe_conteo(db, fecha, jornada):
+        return 0
+
+    disponible = case((Producto.ESTADO == 'Disponible', 1), else_=0)
+    sentencia = insert(ConteoDiario).from_select(
+        ["fecha", "jornada", "idProducto", "idTipoProducto", "cantidadDisponible"],
+        select(
+            literal(fecha, ConteoDiario.fecha.type),
+            literal(jornada, ConteoDiario.jornada.type),
+            Producto.IDPRODUCTO,
+            Producto.IDTIPOPRODUCTO,
+            disponible
+        ).where(Producto.ESTADO != 'Dado de baja')
+    )
+    try:
+        filas = db.execute(sentencia).rowcount
+        db.commit()
+        return filas
+    except IntegrityError:
+        # Otro proceso tomó la misma jornada al mismo tiempo (índice único)
+        db.rollback()
+        return 0
+
+def jornada_actual(ahora: datetime):
+    """
+    Jornada que ya empezó a la hora `ahora`, o None antes de la primera del día
+    """
+    actual = None
+    for jornada, inicio in HORAS_JORNADA.items():
+        if ahora.time() >= inicio:
+            actual = jornada
+    return actual
+
+def tomar_conteo_pendiente(ahora: datetime = None) -> int:
+    """
+    Toma la fotografía de la jornada en curso si todavía no existe. Las jornadas que
+    ya terminaron no se toman tarde porque no reflejarían su disponibilidad.
+    """
+    ahora = ahora or datetime.now()
+    jornada = jornada_actual(ahora)
+    if jornada is None:
+        return 0
+
+    db = SessionLocal()
+    try:
+        return tomar_conteo(db, ahora.date(), jornada)
+    finally:
+        db.close()
+
+def iniciar_programador():
+    """
+    Inicia (una sola vez por proceso) el hilo que toma las fotografías de cada jornada
+    """
+    global _programador
+    if _programador is None:
+        _detener.clear()
+        _programador = threading.Thread(target=_programar, name="conteo-diario", daemon=True)
+        _programador.start()
+
+def detener_programador():
+    """
+    Detiene el hilo de las fotografías (al apagar la aplicación)
+    """
+    global _programador
+    if _programador is not None:
+        _detener.set()
+        _programador.join()
+        _programador = None
+
+def resumen_por_rango(db: Session, desde: date, hasta: date, jornada: str = None) -> list:
+    """
+    Disponibles y total de productos de cada jornada entre `desde` y `hasta`, en total
+    y por tipo de producto, con una sola consulta agrupada
+    """
+    consulta = db.query(
+        ConteoDiario.fecha,
+        ConteoDiario.jornada,
+        TipoProducto.NOMBRE_TIPO_PRODUCTO,
+        func.sum(ConteoDiario.cantidadDisponible),
+        func.count(ConteoDiario.idConteo)
+    ).outerjoin(
+        TipoProducto, TipoProducto.IDTIPOPRODUCTO == ConteoDiario.idTipoProducto
+    ).filter(ConteoDiario.fecha.between(desde, hasta))
+    if jornada:
+        consulta = consulta.filter(ConteoDiario.jornada == jornada)
+
+    resumen = {}
+    for fecha, jornada_fila, nombre_tipo, disponibles, total in consulta.group_by(
+        ConteoDiario.fecha, ConteoDiario.jornada, TipoProducto.NOMBRE_TIPO_PRODUCTO
+    ).all():
+        entrada = resumen.setdefault((fecha, jornada_fila), {
+            "fecha": fecha.isoformat(),
+            "jornada": jornada_fila,
+            "disponibles": 0,
+            "total": 0,
+            "por_tipo": {}
+        })
+        entrada["disponibles"] += int(disponibles)
+        entrada["total"] += total
+        entrada["por_tipo"][nombre_tipo] = {"disponibles": int(disponibles), "total": total}
+
+    orden_jornadas = list(HORAS_JORNADA)
+    return [resumen[clave] for clave in sorted(resumen, key=lambda c: (c[0], orden_jornadas.index(c[1])))]
+
+def detalle_de_jornada(db: Session, fecha: date, jornada: str) -> list:
+    """
+    Disponibilidad de cada producto en la fotografía de una jornada; los productos
+    eliminados después aparecen con IDPRODUCTO, CODIGO_INTERNO y NOMBRE en None
+    """
+    filas = db.query(
+        ConteoDiario.idProducto,
+        Producto.CODIGO_INTERNO,
+        Producto.NOMBRE,
+        TipoProducto.NOMBRE_TIPO_PRODUCTO,
+        ConteoDiario.cantidadDisponible
+    ).outerjoin(
+        Producto, Producto.IDPRODUCTO == ConteoDiario.idProducto
+    ).outerjoin(
+        TipoProducto, TipoProducto.IDTIPOPRODUCTO == ConteoDiario.idTipoProducto
+    ).filter(
+        ConteoDiario.fecha == fecha,
+        ConteoDiario.jornada == jornada
+    ).order_by(ConteoDiario.idProducto, ConteoDiario.idConteo).all()
+
+    return [{
+        "IDPRODUCTO": fila.idProducto,
+        "CODIGO_INTERNO": fila.CODIGO_INTERNO,
+        "NOMBRE": fila.NOMBRE,
+        "tipo": fila.NOMBRE_TIPO_PRODUCTO,
+        "disponible": fila.cantidadDisponible > 0
+    } for fila in filas]
+
+def _existe_conteo(db: Session, fecha: date, jornada: str) -> bool:
+    return db.query(
+        db.query(ConteoDiario.idConteo).filter(
+            ConteoDiario.fecha == fecha,
+            ConteoDiario.jornada == jornada
+        ).exists()
+    ).scalar()
+
+def _segundos_hasta_proxima(ahora: datetime) -> float:
+    hoy = ahora.date()
+    inicios = [datetime.combine(hoy, inicio) for inicio in HORAS_JORNADA.values()]
+    inicios.append(datetime.combine(hoy + timedelta(days=1), min(HORAS_JORNADA.values())))
+    proxima = min(inicio for inicio in inicios if inicio > ahora)
+    return min((proxima - ahora).total_seconds() + 1, MAX_ESPERA_PROGRAMADOR)
+
+def _programar():
+    while True:
+        try:
+            tomar_conteo_pendiente()
+        except Exception as e:
+            print(f"Error al tomar el conteo diario de productos: {e}")
+        if _detener.wait(_segundos_hasta_proxima(datetime.now())):
+            break
@@ -0,0 +1,312 @@
+import pandas as pd
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.core.database.producto import Producto
+from app.core.database.tipo_producto import TipoProducto
+from app.api.productos import contadores as contadores_productos
+
+ESTADOS_PRODUCTO = ['Disponible', 'Prestado', 'Mantenimiento', 'Dado de baja']
+
+COLUMNAS_REQUERIDAS_EXCEL = [
+    'Código interno',
+    'Nombre del producto',
+    'Tipo de producto',
+    'Placa',
+    'SERIAL',
+    'Marca',
+    'Estado',
+    'Observaciones'
+]
+
+# Columnas que el modo upsert compara y actualiza
+COLUMNAS_ACTUALIZABLES = [
+    'NOMBRE', 'IDTIPOPRODUCTO', 'PLACA_SENA', 'SERIAL', 'MARCA', 'ESTADO', 'OBSERVACIONES'
+]
+
+# Mismos mensajes que reportaban create_producto y update_producto al chocar con un índice único
+ERROR_AL_CREAR = "Error al procesar - 400: Error al crear el producto"
+ERROR_AL_ACTUALIZAR = "Error al procesar - 400: Error al actualizar el producto"
+
+def _texto(valor) -> str:
+    return str(valor).strip() if pd.notna(valor) else ""
+
+def _clave(valor: str) -> str:
+    # Los índices únicos usan la intercalación de MySQL, que no distingue mayúsculas
+    return valor.casefold()
+
+class ImportadorProductos:
+    """
+    Importa productos desde DataFrames con el formato de la plantilla de Excel.
+
+    Los códigos internos, placas y seriales existentes se cargan una sola vez por
+    importación; los duplicados, con la base de datos o dentro del archivo, se
+    detectan con esos conjuntos y las filas válidas de cada bloque se insertan con
+    un solo INSERT por lotes. Los errores se reportan por fila con los mismos
+    mensajes de la importación fila a fila.
+
+    Con `upsert` un código interno existente no es un error: la fila se compara con
+    el producto actual y solo se actualizan las columnas que cambiaron, con un
+    UPDATE por lotes por cada combinación de columnas. Un Estado vacío conserva el
+    estado actual del producto.
+
+    Un mismo importador puede procesar varios bloques de un archivo: recuerda lo ya
+    importado para detectar duplicados entre bloques.
+    """
+    def __init__(self, db: Session, upsert: bool = False):
+        self.db = db
+        self.upsert = upsert
+        self.total_procesados = 0
+        self.insertados = 0
+        self.actualizados = 0
+        self.sin_cambios = 0
+        self.errores = []
+        self._tipos = None
+        self._codigos = set()
+        self._placas = set()
+        self._seriales = set()
+        self._actuales = {}
+        self._actuales_por_id = {}
+        self._en_archivo = set()
+
+    @property
+    def exitosos(self) -> int:
+        return self.insertados + self.actualizados + self.sin_cambios
+
+    def procesar(self, df: pd.DataFrame, fila_inicial: int = 2):
+        """
+        Valida e inserta (o actualiza, con `upsert`) las filas de `df` en la transacción
+        de la sesión, sin confirmarla. `fila_inicial` es el número de fila de Excel de
+        la primera fila del bloque.
+        """
+        if df.empty:
+            return
+        if self._tipos is None:
+            self._precargar()
+
+        errores = []
+        nuevos = []
+        cambios = {}
+        # (valores enviados, fila existente, producto) de cada fila que reservó sus valores únicos
+        reservas = []
+        for posicion, valores in enumerate(df[COLUMNAS_REQUERIDAS_EXCEL].itertuples(index=False, name=None)):
+            fila_num = fila_inicial + posicion
+            codigo_interno, nombre, tipo_producto_nombre, placa_sena, serial, marca, estado, observaciones = map(_texto, valores)
+            tipo_producto_nombre = tipo_producto_nombre.lower()
+            estado_vacio = pd.isna(valores[6])
+            estado = "Disponible" if estado_vacio else estado
+            error = self._validar_campos(codigo_interno, nombre, tipo_producto_nombre, estado)
+            if error:
+                errores.append((fila_num, error))
+                continue
+
+            producto = {
+                'CODIGO_INTERNO': codigo_interno,
+                'NOMBRE': nombre,
+                'IDTIPOPRODUCTO': self._tipos[tipo_producto_nombre],
+                'PLACA_SENA': placa_sena or None,
+                'SERIAL': serial or None,
+                'MARCA': marca or None,
+                'ESTADO': estado,
+                'OBSERVACIONES': observaciones or None
+            }
+            actual = None
+            if self.upsert:
+                clave_codigo = _clave(codigo_interno)
+                if clave_codigo in self._en_archivo:
+                    errores.append((fila_num, f"El código interno '{codigo_interno}' está repetido en el archivo"))
+                    continue
+                self._en_archivo.add(clave_codigo)
+                actual = self._actuales.get(clave_codigo)
+                if actual is not None and estado_vacio:
+                    producto['ESTADO'] = actual['ESTADO']
+
+            if actual is not None:
+                columnas = tuple(c for c in COLUMNAS_ACTUALIZABLES if producto[c] != actual[c])
+                if not columnas:
+                    self.sin_cambios += 1
+                    continue
+            error = self._validar_unicos(tipo_producto_nombre, actual, producto)
+            if error:
+                errores.append((fila_num, error))
+                continue
+
+            # La reserva es provisional: se deshace si la base de datos rechaza la fila
+            self._reservar(actual, producto)
+            if actual is None:
+                valores = producto
+                nuevos.append((fila_num, valores))
+            else:
+                valores = {'IDPRODUCTO': actual['IDPRODUCTO'], **{c: producto[c] for c in columnas}}
+                cambios.setdefault(columnas, []).append((fila_num, valores))
+            reservas.append((valores, actual, producto))
+
+        # Sin render_nulls el ORM separa en sentencias distintas las filas con None en columnas diferentes
+        insertados = self._ejecutar_por_lotes(
+            insert(Producto).execution_options(render_nulls=True), nuevos, errores, ERROR_AL_CREAR
+        )
+        self._registrar_insertados(insertados)
+        aplicadas = {id(valores) for valores in insertados}
+
+        for columnas, grupo in cambios.items():
+            actualizados = self._ejecutar_por_lotes(update(Producto), grupo, errores, ERROR_AL_ACTUALIZAR)
+            self.actualizados += len(actualizados)
+            aplicadas.update(id(valores) for valores in actualizados)
+            registros = []
+            for valores in actualizados:
+                # El estado en memoria solo refleja las filas que se escribieron
+                actual = self._actuales_por_id[valores['IDPRODUCTO']]
+                anterior = (actual['IDTIPOPRODUCTO'], actual['ESTADO'])
+                actual.update(valores)
+                registros.append((anterior, (actual['IDTIPOPRODUCTO'], actual['ESTADO'])))
+            if registros and ('IDTIPOPRODUCTO' in columnas or 'ESTADO' in columnas):
+                contadores_productos.registrar_al_confirmar(self.db, registros)
+
+        # En orden inverso, para que un valor liberado y tomado por otra fila rechazada
+        # termine reservado por su dueño original
+        for valores, actual, producto in reversed(reservas):
+            if id(valores) not in aplicadas:
+                self._liberar(actual, producto)
+
+        self.total_procesados += len(df)
+        self.insertados += len(insertados)
+        self.errores.extend(f"Fila {fila_num}: {error}" for fila_num, error in sorted(errores, key=lambda e: e[0]))
+
+    def resultado(self) -> dict:
+        resultado = {
+            "total_procesados": self.total_procesados,
+            "exitosos": self.exitosos,
+            "errores": self.errores,
+            "parcial": self.exitosos > 0 and len(self.errores) > 0
+        }
+        if self.upsert:
+            resultado.update({
+                "insertados": self.insertados,
+                "actualizados": self.actualizados,
+                "sin_cambios": self.sin_cambios
+            })
+        return resultado
+
+    def _precargar(self):
+        """
+        Carga los tipos de producto y, con una sola consulta, los códigos internos,
+        placas y seriales existentes (con `upsert`, las filas completas)
+        """
+        self._tipos = {
+            nombre.lower(): id_tipo
+            for id_tipo, nombre in self.db.query(TipoProducto.IDTIPOPRODUCTO, TipoProducto.NOMBRE_TIPO_PRODUCTO).all()
+        }
+        if self.upsert:
+            columnas = [Producto.IDPRODUCTO, Producto.CODIGO_INTERNO, *[getattr(Producto, c) for c in COLUMNAS_ACTUALIZABLES]]
+            for fila in self.db.execute(select(*columnas)).mappings():
+                actual = dict(fila)
+                self._actuales[_clave(actual['CODIGO_INTERNO'])] = actual
+                self._actuales_por_id[actual['IDPRODUCTO']] = actual
+                self._reservar(None, actual)
+        else:
+            for codigo, placa, serial in self.db.query(Producto.CODIGO_INTERNO, Producto.PLACA_SENA, Producto.SERIAL).all():
+                self._reservar(None, {'CODIGO_INTERNO': codigo, 'PLACA_SENA': placa, 'SERIAL': serial})
+
+    def _reservar(self, actual, producto):
+        """
+        Marca como usados el código, la placa y el serial de `producto` y libera los
+        que tenía `actual`, la fila existente cuando se actualiza
+        """
+        for columna, usados in (('CODIGO_INTERNO', self._codigos), ('PLACA_SENA', self._placas), ('SERIAL', self._seriales)):
+            if actual is not None and actual[columna]:
+                usados.discard(_clave(actual[columna]))
+            if producto[columna]:
+                usados.add(_clave(producto[columna]))
+
+    def _liberar(self, actual, producto):
+        """
+        Deshace _reservar(actual, producto) para una fila que la base de datos rechazó
+        """
+        for columna, usados in (('CODIGO_INTERNO', self._codigos), ('PLACA_SENA', self._placas), ('SERIAL', self._seriales)):
+            if producto[columna]:
+                usados.discard(_clave(producto[columna]))
+            if actual is not None and actual[columna]:
+                usados.add(_clave(actual[columna]))
+
+    def _validar_campos(self, codigo_interno: str, nombre: str, tipo_producto_nombre: str, estado: str):
+        """
+        Retorna el mensaje de error de los campos obligatorios, el tipo y el estado, o None
+        """
+        errores_fila = []
+        if not codigo_interno:
+            errores_fila.append("Código interno es obligatorio")
+        if not nombre:
+            errores_fila.append("Nombre del producto es obligatorio")
+        if not tipo_producto_nombre:
+            errores_fila.append("Tipo de producto es obligatorio")
+        elif tipo_producto_nombre not in self._tipos:
+            errores_fila.append(f"Tipo de producto '{tipo_producto_nombre}' no existe")
+        if estado not in ESTADOS_PRODUCTO:
+            errores_fila.append(f"Estado debe ser uno de: {', '.join(ESTADOS_PRODUCTO)}")
+        return '; '.join(errores_fila) if errores_fila else None
+
+    def _validar_unicos(self, tipo_producto_nombre: str, actual, producto: dict):
+        """
+        Retorna el mensaje de error si otro producto ya usa el código, la placa o el
+        serial de `producto`, o None. `actual` es la fila existente cuando se actualiza.
+        """
+        def repetido(columna: str, usados: set) -> bool:
+            valor = producto[columna]
+            if not valor:
+                return False
+            # Conservar su propio valor no es un duplicado
+            if actual is not None and actual[columna] and _clave(actual[columna]) == _clave(valor):
+                return False
+            return _clave(valor) in usados
+
+        if actual is None and repetido('CODIGO_INTERNO', self._codigos):
+            return f"El código interno '{producto['CODIGO_INTERNO']}' ya existe"
+
+        placa_repetida = repetido('PLACA_SENA', self._placas)
+        serial_repetido = repetido('SERIAL', self._seriales)
+        # Placa y serial solo se validan con mensaje propio para equipos de cómputo;
+        # en los demás tipos el índice único rechaza el producto
+        if tipo_producto_nombre == "equipo de cómputo":
+            if placa_repetida:
+                return f"La placa SENA '{producto['PLACA_SENA']}' ya existe"
+            if serial_repetido:
+                return f"El serial '{producto['SERIAL']}' ya existe"
+        elif placa_repetida or serial_repetido:
+            return ERROR_AL_CREAR if actual is None else ERROR_AL_ACTUALIZAR
+        return None
+
+    def _ejecutar_por_lotes(self, sentencia, filas: list, errores: list, mensaje_error: str) -> list:
+        """
+        Ejecuta la sentencia una sola vez con todas las filas, dadas como (número de
+        fila, valores). Si la base de datos rechaza el lote, la ejecuta fila por fila
+        para reportar el error solo en la que falla. Retorna los valores aplicados.
+        """
+        if not filas:
+            return []
+        try:
+            with self.db.begin_nested():
+                self.db.execute(sentencia, [valores for _, valores in filas])
+            return [valores for _, valores in filas]
+        except SQLAlchemyError:
+            pass
+
+        aplicadas = []
+        for fila_num, valores in filas:
+            try:
+                with self.db.begin_nested():
+                    self.db.execute(sentencia, [valores])
+                aplicadas.append(valores)
+            except IntegrityError:
+                errores.append((fila_num, mensaje_error))
+            except SQLAlchemyError as e:
+                errores.append((fila_num, f"Error al procesar - {str(e)}"))
+        return aplicadas
+
+    def _registrar_insertados(self, insertados: list):
+        """
+        Registra los productos insertados en los contadores en memoria al confirmar la transacción
+        """
+        if insertados:
+            contadores_productos.registrar_al_confirmar(self.db, [
+                (None, (producto['IDTIPOPRODUCTO'], producto['ESTADO'])) for producto in insertados
+            ])
@@ -1,11 +1,25 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from app.core.database.producto import Producto
+from app.core.database.conteo_diario import ConteoDiario
 from app.schemas.producto_modelo import ProductoCreate
 from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
 import logging
 import pandas as pd
-import io
+from app.core.database.db import SessionLocal
+from app.core.excel import leer_excel_por_bloques
+from app.api.importaciones.trabajos import enviar_importacion
+from app.api.productos import contadores as contadores_productos
+from app.api.productos.importacion import ImportadorProductos, COLUMNAS_REQUERIDAS_EXCEL
+
+# Sufijo de las claves de /productos/contadores para cada estado
+SUFIJOS_ESTADO = {
+    'Disponible': 'disponibles',
+    'Prestado': 'prestados',
+    'Mantenimiento': 'mantenimiento',
+    'Dado de baja': 'dados_de_baja'
+}
 
 def get_productos(db: Session, skip: int = 0, limit: int = 100):
     try:
@@ -63,6 +77,10 @@ def create_producto(db: Session, producto: ProductoCreate):
             OBSERVACIONES=producto.OBSERVACIONES
         )
         db.add(db_producto)
+        db.flush()
+        contadores_productos.registrar_al_confirmar(
+            db, [(None, (db_producto.IDTIPOPRODUCTO, db_producto.ESTADO))]
+        )
         db.commit()
         db.refresh(db_producto)
         return db_producto
@@ -107,8 +125,12 @@ def update_producto(db: Session, codigo_interno: str, producto_data: dict):
             if existing_serial:
                 raise HTTPException(status_code=400, detail="El serial ya existe")
     
+    anterior = (db_producto.IDTIPOPRODUCTO, db_producto.ESTADO)
     for key, value in producto_data.items():
         setattr(db_producto, key, value)
+    contadores_productos.registrar_al_confirmar(
+        db, [(anterior, (db_producto.IDTIPOPRODUCTO, db_producto.ESTADO))]
+    )
     
     try:
         db.commit()
@@ -124,7 +146,12 @@ def delete_producto(db: Session, codigo_interno: str):
         raise HTTPException(status_code=404, detail="Producto no encontrado")
     
     try:
+        # Las fotografías de disponibilidad son historia: se conservan sin el producto
+        db.query(ConteoDiario).filter(
+            ConteoDiario.idProducto == db_producto.IDPRODUCTO
+        ).update({ConteoDiario.idProducto: None}, synchronize_session=False)
         db.delete(db_producto)
+        contadores_productos.eliminar_al_confirmar(db, [(db_producto.IDTIPOPRODUCTO, db_producto.ESTADO)])
         db.commit()
         return {"message": "Producto eliminado exitosamente"}
     except IntegrityError:
@@ -132,184 +159,137 @@ def delete_producto(db: Session, codigo_interno: str):
         raise HTTPException(status_code=400, detail="Error al eliminar el producto")
 
 def get_contadores(db: Session):
+    """
+    Productos disponibles y no disponibles por tipo y en total, más el desglose por
+    cada estado no disponible, tomados de los contadores en memoria (contadores.py)
+    """
     try:
-        # Obtener contadores por tipo de producto
-        from .tipo_producto import get_tipos_producto
-        tipos_producto = get_tipos_producto(db)
-        
         contadores = {}
-        
-        for tipo in tipos_producto:
-            disponibles = db.query(Producto).filter(
-                Producto.IDTIPOPRODUCTO == tipo.IDTIPOPRODUCTO,
-                Producto.ESTADO == "Disponible"
-            ).count()
-            
-            no_disponibles = db.query(Producto).filter(
-                Producto.IDTIPOPRODUCTO == tipo.IDTIPOPRODUCTO,
-                Producto.ESTADO != "Disponible"
-            ).count()
-            
+        totales = {"disponibles": 0, "no_disponibles": 0}
+        totales.update(dict.fromkeys(SUFIJOS_ESTADO.values(), 0))
+        for nombre_tipo, por_estado in contadores_productos.obtener():
             # Crear nombres de claves basados en el nombre del tipo
-            nombre_key = tipo.NOMBRE_TIPO_PRODUCTO.replace(" ", "_").replace("ó", "o")
-            contadores[f"{nombre_key}_disponibles"] = disponibles
-            contadores[f"{nombre_key}_no_disponibles"] = no_disponibles
-        
+            nombre_key = nombre_tipo.replace(" ", "_").replace("ó", "o")
+            for sufijo in totales:
+                contadores[f"{nombre_key}_{sufijo}"] = 0
+
+            for estado, cantidad in por_estado.items():
+                sufijo = SUFIJOS_ESTADO.get(estado)
+                if estado != "Disponible":
+                    contadores[f"{nombre_key}_no_disponibles"] += cantidad
+                    totales["no_disponibles"] += cantidad
+                if sufijo:
+                    contadores[f"{nombre_key}_{sufijo}"] += cantidad
+                    totales[sufijo] += cantidad
+
         # Mantener compatibilidad con nombres anteriores
-        total_disponibles = db.query(Producto).filter(Producto.ESTADO == "Disponible").count()
-        total_no_disponibles = db.query(Producto).filter(Producto.ESTADO != "Disponible").count()
-        
-        contadores["totalDisponibles"] = total_disponibles
-        contadores["totalNoDisponibles"] = total_no_disponibles
-        
+        contadores["totalDisponibles"] = totales["disponibles"]
+        contadores["totalNoDisponibles"] = totales["no_disponibles"]
+        contadores["totalPrestados"] = totales["prestados"]
+        contadores["totalMantenimiento"] = totales["mantenimiento"]
+        contadores["totalDadosDeBaja"] = totales["dados_de_baja"]
+
         return contadores
     except Exception as e:
         logging.error(f"Error al obtener contadores: {e}")
         raise HTTPException(status_code=500, detail="Error interno al obtener contadores")
 
-async def import_from_excel(db: Session, file: UploadFile):
+def import_from_excel(db: Session, file: UploadFile, streaming: bool = False, upsert: bool = False):
     """
-    Importa productos desde un archivo Excel
+    Importa productos desde un archivo Excel. Con `streaming` el archivo se lee por
+    bloques de filas que se procesan antes de leer el siguiente, sin cargar todo el
+    archivo en memoria. Con `upsert` los productos existentes se actualizan en lugar
+    de reportarse como duplicados (ver ImportadorProductos).
     """
     try:
         # Validar el archivo
         if not file.filename.endswith('.xlsx'):
             raise HTTPException(status_code=400, detail="El archivo debe ser un Excel (.xlsx)")
         
-        # Leer el archivo Excel
-        contents = await file.read()
-        df = pd.read_excel(io.BytesIO(contents))
+        if streaming:
+            return _import_from_excel_por_bloques(db, file, upsert)
         
-        # Definir las columnas esperadas
-        columnas_requeridas = [
-            'Código interno',
-            'Nombre del producto', 
-            'Tipo de producto',
-            'Placa',
-            'SERIAL',
-            'Marca',
-            'Estado',
-            'Observaciones'
-        ]
+        # Leer el archivo Excel como texto directamente del archivo temporal de la subida
+        df = pd.read_excel(file.file, dtype=str)
         
         # Verificar que las columnas requeridas estén presentes
-        columnas_disponibles = df.columns.tolist()
-        columnas_faltantes = [col for col in columnas_requeridas if col not in columnas_disponibles]
-        
+        columnas_faltantes = _columnas_faltantes(df.columns.tolist())
         if columnas_faltantes:
-            return {
-                "columnas_requeridas": columnas_requeridas,
-                "columnas_disponibles": columnas_disponibles,
-                "columnas_faltantes": columnas_faltantes
-            }
-        
-        # Obtener tipos de producto para validación
-        from .tipo_producto import get_tipos_producto
-        tipos_producto = get_tipos_producto(db)
-        tipos_dict = {tipo.NOMBRE_TIPO_PRODUCTO.lower(): tipo.IDTIPOPRODUCTO for tipo in tipos_producto}
+            return columnas_faltantes
         
-        # Contadores
-        total_procesados = 0
-        exitosos = 0
-        errores = []
-        
-        # Procesar cada fila
-        for index, row in df.iterrows():
-            fila_num = index + 2  # +2 porque Excel empieza en 1 y hay header
-            errores_fila = []
-            
-            try:
-                # Validar campos obligatorios
-                codigo_interno = str(row['Código interno']).strip() if pd.notna(row['Código interno']) else ""
-                nombre = str(row['Nombre del producto']).strip() if pd.notna(row['Nombre del producto']) else ""
-                tipo_producto_nombre = str(row['Tipo de producto']).strip().lower() if pd.notna(row['Tipo de producto']) else ""
-                
-                if not codigo_interno:
-                    errores_fila.append("Código interno es obligatorio")
-                if not nombre:
-                    errores_fila.append("Nombre del producto es obligatorio")
-                if not tipo_producto_nombre:
-                    errores_fila.append("Tipo de producto es obligatorio")
-                
-                # Validar tipo de producto
-                tipo_producto_id = None
-                if tipo_producto_nombre:
-                    tipo_producto_id = tipos_dict.get(tipo_producto_nombre)
-                    if not tipo_producto_id:
-                        errores_fila.append(f"Tipo de producto '{tipo_producto_nombre}' no existe")
-                
-                # Validar estado
-                estado = str(row['Estado']).strip() if pd.notna(row['Estado']) else "Disponible"
-                estados_validos = ['Disponible', 'Prestado', 'Mantenimiento', 'Dado de baja']
-                if estado not in estados_validos:
-                    errores_fila.append(f"Estado debe ser uno de: {', '.join(estados_validos)}")
-                
-                # Campos opcionales
-                placa_sena = str(row['Placa']).strip() if pd.notna(row['Placa']) and str(row['Placa']).strip() != '' else None
-                serial = str(row['SERIAL']).strip() if pd.notna(row['SERIAL']) and str(row['SERIAL']).strip() != '' else None
-                marca = str(row['Marca']).strip() if pd.notna(row['Marca']) and str(row['Marca']).strip() != '' else None
-                observaciones = str(row['Observaciones']).strip() if pd.notna(row['Observaciones']) and str(row['Observaciones']).strip() != '' else None
-                
-                # Si hay errores en la fila, agregarlos y continuar
-                if errores_fila:
-                    errores.append(f"Fila {fila_num}: {'; '.join(errores_fila)}")
-                    total_procesados += 1
-                    continue
-                
-                # Verificar duplicados
-                existing_codigo = db.query(Producto).filter(Producto.CODIGO_INTERNO == codigo_interno).first()
-                if existing_codigo:
-                    errores.append(f"Fila {fila_num}: El código interno '{codigo_interno}' ya existe")
-                    total_procesados += 1
-                    continue
-                
-                # Validaciones específicas para equipos de cómputo
-                if tipo_producto_nombre == "equipo de cómputo":
-                    if placa_sena:
-                        existing_placa = db.query(Producto).filter(Producto.PLACA_SENA == placa_sena).first()
-                        if existing_placa:
-                            errores.append(f"Fila {fila_num}: La placa SENA '{placa_sena}' ya existe")
-                            total_procesados += 1
-                            continue
-                    
-                    if serial:
-                        existing_serial = db.query(Producto).filter(Producto.SERIAL == serial).first()
-                        if existing_serial:
-                            errores.append(f"Fila {fila_num}: El serial '{serial}' ya existe")
-                            total_procesados += 1
-                            continue
-                
-                # Crear el producto
-                producto_data = ProductoCreate(
-                    CODIGO_INTERNO=codigo_interno,
-                    NOMBRE=nombre,
-                    IDTIPOPRODUCTO=tipo_producto_id,
-                    PLACA_SENA=placa_sena,
-                    SERIAL=serial,
-                    MARCA=marca,
-                    ESTADO=estado,
-                    OBSERVACIONES=observaciones
-                )
-                
-                # Intentar crear el producto
-                create_producto(db, producto_data)
-                exitosos += 1
-                
-            except Exception as e:
-                errores.append(f"Fila {fila_num}: Error al procesar - {str(e)}")
-            
-            total_procesados += 1
+        # Validar todas las filas e insertar las válidas en una sola transacción
+        importador = ImportadorProductos(db, upsert)
+        importador.procesar(df)
+        db.commit()
         
-        # Preparar respuesta
-        response = {
-            "total_procesados": total_procesados,
-            "exitosos": exitosos,
-            "errores": errores,
-            "parcial": exitosos > 0 and len(errores) > 0
-        }
+        return importador.resultado()
         
-        return response
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Error al importar productos desde Excel: {e}")
+        raise HTTPException(status_code=500, detail=f"Error al procesar el archivo: {str(e)}")
+
+def _import_from_excel_por_bloques(db: Session, file: UploadFile, upsert: bool):
+    with leer_excel_por_bloques(file.file) as (columnas, bloques):
+        columnas_faltantes = _columnas_faltantes(columnas)
+        if columnas_faltantes:
+            return columnas_faltantes
         
+        importador = ImportadorProductos(db, upsert)
+        for fila_inicial, df in bloques:
+            importador.procesar(df, fila_inicial)
+            db.commit()
+    
+    return importador.resultado()
+
+def import_from_excel_en_segundo_plano(file: UploadFile, upsert: bool = False):
+    """
+    Encola la importación de productos y retorna el trabajo para consultar su avance
+    """
+    if not file.filename.endswith('.xlsx'):
+        raise HTTPException(status_code=400, detail="El archivo debe ser un Excel (.xlsx)")
+    
+    try:
+        trabajo, columnas_faltantes = enviar_importacion(
+            'productos', file, _columnas_faltantes,
+            lambda ruta, trabajo: _importar_en_trabajo(ruta, trabajo, upsert)
+        )
     except Exception as e:
         logging.error(f"Error al importar productos desde Excel: {e}")
         raise HTTPException(status_code=500, detail=f"Error al procesar el archivo: {str(e)}")
+    
+    if columnas_faltantes:
+        return columnas_faltantes
+    return JSONResponse(
+        status_code=202,
+        content={"detail": "Importación en proceso", "id": trabajo.id, "estado": f"/imports/{trabajo.id}"}
+    )
+
+def _importar_en_trabajo(ruta: str, trabajo, upsert: bool = False):
+    db = SessionLocal()
+    try:
+        with leer_excel_por_bloques(ruta) as (_, bloques):
+            importador = ImportadorProductos(db, upsert)
+            for fila_inicial, df in bloques:
+                importador.procesar(df, fila_inicial)
+                db.commit()
+                trabajo.registrar_avance(importador.resultado())
+        return importador.resultado()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def _columnas_faltantes(columnas_disponibles: list):
+    """
+    Retorna el detalle de columnas si falta alguna requerida, o None
+    """
+    columnas_faltantes = [col for col in COLUMNAS_REQUERIDAS_EXCEL if col not in columnas_disponibles]
+    if columnas_faltantes:
+        return {
+            "columnas_requeridas": COLUMNAS_REQUERIDAS_EXCEL,
+            "columnas_disponibles": columnas_disponibles,
+            "columnas_faltantes": columnas_faltantes
+        }
+    return None
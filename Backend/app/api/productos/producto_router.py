@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Path
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import date
 from app.core.database.db import get_db
 from app.schemas.producto_modelo import Producto, ProductoCreate
-from . import producto
+from . import producto, conteo_diario
 from app.api.auth.login import verify_jwt_token
 
 router = APIRouter()
@@ -12,6 +13,45 @@ router = APIRouter()
 def get_contadores_endpoint(db: Session = Depends(get_db), token: str = Depends(verify_jwt_token)):
     return producto.get_contadores(db)
 
+@router.get("/conteos-diarios")
+def get_conteos_diarios(
+    desde: date,
+    hasta: date,
+    jornada: Optional[str] = Query(None, pattern="^(mañana|tarde)$"),
+    db: Session = Depends(get_db),
+    token: str = Depends(verify_jwt_token)
+):
+    """
+    Disponibilidad guardada de cada jornada entre dos fechas, en total y por tipo
+    """
+    if desde > hasta:
+        raise HTTPException(status_code=400, detail="La fecha inicial debe ser anterior o igual a la final")
+    return conteo_diario.resumen_por_rango(db, desde, hasta, jornada)
+
+@router.get("/conteos-diarios/{fecha}/{jornada}")
+def get_conteo_de_jornada(
+    fecha: date,
+    jornada: str = Path(..., pattern="^(mañana|tarde)$"),
+    db: Session = Depends(get_db),
+    token: str = Depends(verify_jwt_token)
+):
+    """
+    Disponibilidad de cada producto en la fotografía de una jornada
+    """
+    return conteo_diario.detalle_de_jornada(db, fecha, jornada)
+
+@router.post("/conteos-diarios/tomar")
+def tomar_conteo_diario(
+    jornada: str = Query(..., pattern="^(mañana|tarde)$"),
+    db: Session = Depends(get_db),
+    token: str = Depends(verify_jwt_token)
+):
+    """
+    Toma ahora la fotografía de la jornada indicada para hoy, si todavía no existe
+    """
+    guardados = conteo_diario.tomar_conteo(db, date.today(), jornada)
+    return {"fecha": date.today().isoformat(), "jornada": jornada, "productos": guardados}
+
 @router.get("/", response_model=List[Producto])
 def get_productos(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), token: str = Depends(verify_jwt_token)):
     productos = producto.get_productos(db, skip=skip, limit=limit)
@@ -37,9 +77,20 @@ def delete_producto_endpoint(codigo_interno: str, db: Session = Depends(get_db),
     return producto.delete_producto(db=db, codigo_interno=codigo_interno)
 
 @router.post("/importar-excel")
-async def importar_productos_excel(
+def importar_productos_excel(
     file: UploadFile = File(...),
+    streaming: bool = False,
+    segundo_plano: bool = False,
+    modo: str = Query("insertar", pattern="^(insertar|upsert)$"),
     db: Session = Depends(get_db),
     token: str = Depends(verify_jwt_token)
 ):
-    return await producto.import_from_excel(db=db, file=file)
+    """
+    Importa productos desde Excel. Con `modo=upsert` los códigos internos existentes
+    se actualizan con las columnas que cambiaron y la respuesta incluye los conteos
+    de insertados, actualizados y sin cambios
+    """
+    upsert = modo == "upsert"
+    if segundo_plano:
+        return producto.import_from_excel_en_segundo_plano(file=file, upsert=upsert)
+    return producto.import_from_excel(db=db, file=file, streaming=streaming, upsert=upsert)
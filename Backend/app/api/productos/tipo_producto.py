@@ -3,6 +3,8 @@ from sqlalchemy.exc import IntegrityError
 from app.core.database.tipo_producto import TipoProducto
 from app.core.database.producto import Producto
 from app.schemas.tipo_producto_modelo import TipoProductoCreate
+from app.core.database.db import al_confirmar
+from app.api.productos import contadores
 from fastapi import HTTPException
 import logging
 
@@ -23,6 +25,8 @@ def create_tipo_producto(db: Session, tipo: TipoProductoCreate):
             NOMBRE_TIPO_PRODUCTO=tipo.NOMBRE_TIPO_PRODUCTO
         )
         db.add(db_tipo)
+        # El nuevo tipo aparece en /productos/contadores con la siguiente carga
+        al_confirmar(db, contadores.invalidar)
         db.commit()
         db.refresh(db_tipo)
         return db_tipo
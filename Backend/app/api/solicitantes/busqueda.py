@@ -0,0 +1,289 @@
+"""
+Índice en memoria para buscar solicitantes por identificación o nombre.
+
+Cada palabra de la identificación y de los cuatro campos de nombre se normaliza
+(minúsculas, sin tildes) y se indexa por sus trigramas y por sus prefijos de uno y
+dos caracteres. Una búsqueda encuentra las palabras que contienen cada término,
+intersecta sus solicitantes y los ordena: primero palabras completas, luego
+prefijos y al final coincidencias dentro de la palabra.
+
+El índice se construye completo al arrancar (o en el primer uso). Las escrituras de
+solicitantes lo actualizan cuando su transacción se confirma y, para incorporar
+cambios hechos por otros procesos, un hilo construye uno nuevo cada
+REFRESCO_COMPLETO segundos y lo intercambia por el actual: las búsquedas siguen
+usando el índice anterior mientras tanto.
+"""
+import heapq
+import re
+import threading
+import unicodedata
+from functools import lru_cache
+from itertools import groupby, product
+from sqlalchemy.orm import Session
+from app.core.database.db import SessionLocal, al_confirmar
+from app.core.database.solicitante import Solicitante
+
+# Segundos entre reconstrucciones completas del índice
+REFRESCO_COMPLETO = 600
+
+# Hasta este número de candidatos se puntúa uno a uno
+MAX_CANDIDATOS_INDIVIDUALES = 2000
+
+CAMPOS_INDEXADOS = ['IDENTIFICACION', 'PRIMER_NOMBRE', 'SEGUNDO_NOMBRE', 'PRIMER_APELLIDO', 'SEGUNDO_APELLIDO']
+
+_PATRON_SEPARADORES = re.compile(r"[\s.,;:!?\-_/]+")
+
+@lru_cache(maxsize=65536)
+def normalizar(texto) -> str:
+    """
+    Minúsculas, sin tildes y con espacios simples
+    """
+    if not texto:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(_PATRON_SEPARADORES.split(texto.lower())).strip()
+
+@lru_cache(maxsize=65536)
+def _claves_palabra(palabra: str) -> frozenset:
+    """
+    Trigramas y prefijos de uno y dos caracteres ("^") de una palabra
+    """
+    claves = {"^" + palabra[:1], "^" + palabra[:2]}
+    claves.update(palabra[i:i + 3] for i in range(len(palabra) - 2))
+    return frozenset(claves)
+
+class IndiceSolicitantes:
+    """
+    Índice invertido de dos niveles: trigramas y prefijos -> palabras del vocabulario,
+    y palabra -> solicitantes. Las coincidencias se verifican sobre el vocabulario
+    (nombres muy repetidos y documentos) y no solicitante por solicitante.
+    """
+    def __init__(self):
+        self._palabras = {}        # identificación -> palabras normalizadas
+        self._solicitantes = {}    # palabra -> identificaciones
+        self._vocabulario = {}     # trigrama o prefijo -> palabras
+
+    def __len__(self):
+        return len(self._palabras)
+
+    def agregar(self, registro: dict):
+        """
+        Indexa (o reindexa) un solicitante; `registro` tiene las columnas de CAMPOS_INDEXADOS
+        """
+        identificacion = registro['IDENTIFICACION']
+        self.eliminar(identificacion)
+
+        palabras = set()
+        for campo in CAMPOS_INDEXADOS:
+            palabras.update(normalizar(registro.get(campo)).split())
+        self._palabras[identificacion] = palabras
+
+        for palabra in palabras:
+            solicitantes = self._solicitantes.get(palabra)
+            if solicitantes is not None:
+                solicitantes.add(identificacion)
+                continue
+            self._solicitantes[palabra] = {identificacion}
+            for clave in _claves_palabra(palabra):
+                vocabulario = self._vocabulario.get(clave)
+                if vocabulario is None:
+                    self._vocabulario[clave] = {palabra}
+                else:
+                    vocabulario.add(palabra)
+
+    def eliminar(self, identificacion: str):
+        palabras = self._palabras.pop(identificacion, None)
+        if palabras is None:
+            return
+        for palabra in palabras:
+            solicitantes = self._solicitantes[palabra]
+            solicitantes.discard(identificacion)
+            if solicitantes:
+                continue
+            del self._solicitantes[palabra]
+            for clave in _claves_palabra(palabra):
+                vocabulario = self._vocabulario[clave]
+                vocabulario.discard(palabra)
+                if not vocabulario:
+                    del self._vocabulario[clave]
+
+    def buscar(self, consulta: str, limite: int) -> list:
+        """
+        Identificaciones que contienen todos los términos de la consulta, de la más
+        relevante a la menos relevante. Los términos de menos de tres caracteres solo
+        coinciden con el inicio de una palabra.
+
+        Cada término suma 3 si es una palabra completa, 2 si es el inicio de una
+        palabra y 1 si está dentro de una; los empates se ordenan por identificación.
+        """
+        terminos = list(dict.fromkeys(normalizar(consulta).split()))
+        if not terminos:
+            return []
+
+        # Por término: solicitantes con la palabra completa, con una palabra que
+        # empieza por el término y con una que solo lo contiene
+        niveles = []
+        for termino in terminos:
+            exactos, empiezan, contienen = set(), set(), set()
+            for palabra in self._palabras_con(termino):
+                if palabra == termino:
+                    exactos |= self._solicitantes[palabra]
+                elif palabra.startswith(termino):
+                    empiezan |= self._solicitantes[palabra]
+                else:
+                    contienen |= self._solicitantes[palabra]
+            if not (exactos or empiezan or contienen):
+                return []
+            empiezan -= exactos
+            contienen -= exactos
+            contienen -= empiezan
+            niveles.append((exactos, empiezan, contienen))
+
+        if len(terminos) == 1:
+            candidatos = None
+        else:
+            candidatos = _interseccion([exactos | empiezan | contienen for exactos, empiezan, contienen in niveles])
+            if len(candidatos) <= MAX_CANDIDATOS_INDIVIDUALES or len(terminos) > 3:
+                puntuados = [
+                    (-sum(3 if i in exactos else 2 if i in empiezan else 1 for exactos, empiezan, _ in niveles), i)
+                    for i in candidatos
+                ]
+                return [i for _, i in heapq.nsmallest(limite, puntuados)]
+
+        # Consultas generales: recorrer los grupos de mayor a menor puntaje con
+        # operaciones de conjuntos en lugar de puntuar miles de candidatos uno a uno
+        combinaciones = sorted(product(range(3), repeat=len(terminos)), key=sum)
+        resultado = []
+        for _, grupo in groupby(combinaciones, key=sum):
+            mismo_puntaje = set()
+            for combinacion in grupo:
+                conjuntos = [niveles[t][nivel] for t, nivel in enumerate(combinacion)]
+                if all(conjuntos):
+                    mismo_puntaje |= _interseccion(conjuntos)
+            resultado.extend(heapq.nsmallest(limite - len(resultado), mismo_puntaje))
+            if len(resultado) >= limite:
+                break
+        return resultado
+
+    def _palabras_con(self, termino: str):
+        if len(termino) < 3:
+            return self._vocabulario.get("^" + termino, ())
+        listas = [self._vocabulario.get(termino[i:i + 3]) for i in range(len(termino) - 2)]
+        if not all(listas):
+            return ()
+        palabras = _interseccion(listas)
+        if len(listas) == 1:
+            return palabras
+        # Los trigramas pueden estar en otra posición: verificar el término completo
+        return [palabra for palabra in palabras if termino in palabra]
+
+def _interseccion(conjuntos: list) -> set:
+    conjuntos = sorted(conjuntos, key=len)
+    return conjuntos[0].intersection(*conjuntos[1:])
+
+_indice = None
+_cambios_en_construccion = None
+_lock = threading.Lock()
+_lock_construccion = threading.Lock()
+_refrescador = None
+_detener = threading.Event()
+
+def buscar(consulta: str, limite: int = 20) -> list:
+    """
+    Identificaciones de los solicitantes que coinciden con `consulta`, ordenadas por relevancia
+    """
+    indice = _obtener_indice()
+    with _lock:
+        return indice.buscar(consulta, limite)
+
+def construir_indice():
+    """
+    Construye el índice con todos los solicitantes y reemplaza el actual
+    """
+    global _indice, _cambios_en_construccion
+    with _lock:
+        # Los cambios confirmados mientras se lee la tabla se aplican al final
+        _cambios_en_construccion = []
+    try:
+        db = SessionLocal()
+        try:
+            filas = db.query(*[getattr(Solicitante, campo) for campo in CAMPOS_INDEXADOS]).all()
+        finally:
+            db.close()
+
+        indice = IndiceSolicitantes()
+        for fila in filas:
+            indice.agregar(fila._asdict())
+        with _lock:
+            for registros, identificaciones in _cambios_en_construccion:
+                _aplicar_en(indice, registros, identificaciones)
+            _indice = indice
+    finally:
+        with _lock:
+            _cambios_en_construccion = None
+
+def iniciar_refresco():
+    """
+    Inicia (una sola vez por proceso) el hilo que reconstruye el índice cada
+    REFRESCO_COMPLETO segundos
+    """
+    global _refrescador
+    if _refrescador is None:
+        _detener.clear()
+        _refrescador = threading.Thread(target=_refrescar, name="indice-solicitantes", daemon=True)
+        _refrescador.start()
+
+def detener_refresco():
+    """
+    Detiene el hilo de reconstrucción (al apagar la aplicación)
+    """
+    global _refrescador
+    if _refrescador is not None:
+        _detener.set()
+        _refrescador.join()
+        _refrescador = None
+
+def indexar_al_confirmar(db: Session, registros: list):
+    """
+    Indexa los solicitantes escritos (dicts con las columnas de CAMPOS_INDEXADOS)
+    cuando la transacción de `db` se confirme
+    """
+    registros = [{campo: registro.get(campo) for campo in CAMPOS_INDEXADOS} for registro in registros]
+    al_confirmar(db, lambda: _aplicar(registros, []))
+
+def eliminar_al_confirmar(db: Session, identificaciones: list):
+    """
+    Quita del índice los solicitantes eliminados cuando la transacción de `db` se confirme
+    """
+    identificaciones = list(identificaciones)
+    al_confirmar(db, lambda: _aplicar([], identificaciones))
+
+def _aplicar(registros: list, identificaciones: list):
+    with _lock:
+        if _cambios_en_construccion is not None:
+            _cambios_en_construccion.append((registros, identificaciones))
+        if _indice is not None:
+            _aplicar_en(_indice, registros, identificaciones)
+
+def _aplicar_en(indice: IndiceSolicitantes, registros: list, identificaciones: list):
+    for registro in registros:
+        indice.agregar(registro)
+    for identificacion in identificaciones:
+        indice.eliminar(identificacion)
+
+def _obtener_indice() -> IndiceSolicitantes:
+    if _indice is None:
+        # Una sola construcción aunque lleguen varias búsquedas a la vez
+        with _lock_construccion:
+            if _indice is None:
+                construir_indice()
+    return _indice
+
+def _refrescar():
+    while not _detener.wait(REFRESCO_COMPLETO):
+        try:
+            with _lock_construccion:
+                construir_indice()
+        except Exception as e:
+            print(f"Error al reconstruir el índice de solicitantes: {e}")
@@ -0,0 +1,280 @@
+"""
+Caché en memoria del proceso del catálogo de programas y fichas.
+
+Se carga completa en el primer uso (son tablas pequeñas) y luego las búsquedas de
+programas por nombre y de fichas por código no consultan la base de datos. Lo que
+no está en la caché (por ejemplo, creado por otro proceso) se busca con la sesión
+de quien llama y se agrega cuando su transacción se confirma, porque puede ver
+filas aún no confirmadas.
+
+Las creaciones se escriben en la transacción de quien llama y se publican en la
+caché solo cuando esa transacción se confirma; si se revierte, se descartan. Los
+códigos nuevos de programa (PROGnnnn) salen de un contador en memoria inicializado
+con el mayor código existente; un código reservado en una transacción que se
+revierte no se reutiliza.
+"""
+import re
+import threading
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.database.db import SessionLocal, al_confirmar
+from app.core.database.programas import Programas
+from app.core.database.ficha import Ficha
+
+_PATRON_CODIGO_PROGRAMA = re.compile(r"^PROG(\d+)$")
+
+_lock = threading.RLock()
+_cargado = False
+_programas = {}       # nombre -> código
+_nombres = {}         # código -> nombre
+_fichas = {}          # código de ficha -> código de programa
+_ultimo_numero = 0
+
+def codigo_programa(db: Session, nombre: str):
+    """
+    Código del programa con ese nombre, o None si no existe
+    """
+    _cargar()
+    with _lock:
+        codigo = _programas.get(nombre)
+    if codigo is None:
+        codigo = _buscar_programas(db, [nombre]).get(nombre)
+    return codigo
+
+def nombre_programa(db: Session, codigo: str):
+    """
+    Nombre del programa con ese código, o None si no existe
+    """
+    _cargar()
+    with _lock:
+        nombre = _nombres.get(codigo)
+    if nombre is None:
+        programa = db.query(Programas.NOMBRE_PROGRAMA, Programas.CODPROGRAMA).filter(
+            Programas.CODPROGRAMA == codigo
+        ).first()
+        if programa:
+            nombre = programa.NOMBRE_PROGRAMA
+            registrar_creados(db, programas={programa.NOMBRE_PROGRAMA: programa.CODPROGRAMA})
+    return nombre
+
+def programa_de_ficha(db: Session, codigo_ficha: str):
+    """
+    Código del programa al que pertenece la ficha, o None si la ficha no existe
+    """
+    _cargar()
+    with _lock:
+        codigo = _fichas.get(codigo_ficha)
+    if codigo is None:
+        codigo = _buscar_fichas(db, [codigo_ficha]).get(codigo_ficha)
+    return codigo
+
+def precargar(db: Session, nombres_programas: list, codigos_fichas: list):
+    """
+    Busca en la base de datos, con una consulta IN por tabla, los programas y fichas
+    que no están en la caché. Retorna (programas, fichas) con los encontrados de
+    los pedidos: {nombre: código} y {ficha: código de programa}.
+    """
+    _cargar()
+    with _lock:
+        programas = {n: _programas[n] for n in nombres_programas if n in _programas}
+        fichas = {f: _fichas[f] for f in codigos_fichas if f in _fichas}
+    programas.update(_buscar_programas(db, [n for n in nombres_programas if n not in programas]))
+    fichas.update(_buscar_fichas(db, [f for f in codigos_fichas if f not in fichas]))
+    return programas, fichas
+
+def reservar_codigo_programa() -> str:
+    """
+    Siguiente código PROGnnnn del contador
+    """
+    global _ultimo_numero
+    _cargar()
+    with _lock:
+        _ultimo_numero += 1
+        return f"PROG{_ultimo_numero:04d}"
+
+def obtener_o_crear_programa(db: Session, nombre: str) -> str:
+    """
+    Código del programa con ese nombre; si no existe lo crea en la transacción de `db`
+    """
+    codigo = codigo_programa(db, nombre)
+    if codigo is not None:
+        return codigo
+    return crear_programa(db, nombre)
+
+def crear_programa(db: Session, nombre: str) -> str:
+    """
+    Crea el programa en la transacción de `db` con el siguiente código del contador
+    """
+    try:
+        with db.begin_nested():
+            codigo = reservar_codigo_programa()
+            db.add(Programas(CODPROGRAMA=codigo, NOMBRE_PROGRAMA=nombre))
+    except IntegrityError:
+        # Otro proceso usó el código: recargar la caché y reintentar una vez
+        invalidar()
+        codigo = codigo_programa(db, nombre)
+        if codigo is not None:
+            return codigo
+        codigo = reservar_codigo_programa()
+        db.add(Programas(CODPROGRAMA=codigo, NOMBRE_PROGRAMA=nombre))
+        db.flush()
+
+    registrar_creados(db, programas={nombre: codigo})
+    return codigo
+
+def asignar_ficha(db: Session, codigo_ficha: str, nombre: str) -> str:
+    """
+    Busca o crea el programa `nombre` y la ficha de un aprendiz y retorna el código
+    del programa. Lanza ValueError si la ficha ya pertenece a otro programa.
+    """
+    programa_ficha = programa_de_ficha(db, codigo_ficha)
+    codigo = codigo_programa(db, nombre)
+
+    if programa_ficha is not None and programa_ficha != codigo:
+        nombre_existente = nombre_programa(db, programa_ficha) or "programa desconocido"
+        raise ValueError(f"Este número de ficha ({codigo_ficha}) pertenece a otro programa: {nombre_existente}")
+
+    if codigo is None:
+        codigo = crear_programa(db, nombre)
+    if programa_ficha is None:
+        crear_ficha(db, codigo_ficha, codigo)
+    return codigo
+
+def crear_ficha(db: Session, codigo_ficha: str, codigo_programa: str):
+    """
+    Crea la ficha en la transacción de `db`
+    """
+    db.add(Ficha(CODFICHA=codigo_ficha, CODPROGRAMA=codigo_programa))
+    db.flush()
+    registrar_creados(db, fichas={codigo_ficha: codigo_programa})
+
+def crear_lote(db: Session, programas: list, fichas: list):
+    """
+    Inserta por lotes programas ({CODPROGRAMA, NOMBRE_PROGRAMA}, con códigos de
+    reservar_codigo_programa) y fichas ({CODFICHA, CODPROGRAMA}) en la transacción de `db`.
+    Retorna (programas, fichas) con lo que quedó asociado: {nombre: código} y
+    {ficha: código de programa}.
+
+    Si otro proceso creó mientras tanto un programa, una ficha o un código iguales,
+    se usan los existentes, se reservan códigos nuevos para el resto y se reintenta una vez.
+    """
+    if not programas and not fichas:
+        return {}, {}
+    asociados = ({}, {})
+    try:
+        with db.begin_nested():
+            _insertar_lote(db, programas, fichas)
+    except IntegrityError:
+        # La caché no coincide con la base de datos: recargarla y reintentar sin lo existente
+        invalidar()
+        programas, fichas, asociados = _descartar_existentes(db, programas, fichas)
+        _insertar_lote(db, programas, fichas)
+
+    creados_programas = {p["NOMBRE_PROGRAMA"]: p["CODPROGRAMA"] for p in programas}
+    creadas_fichas = {f["CODFICHA"]: f["CODPROGRAMA"] for f in fichas}
+    registrar_creados(db, programas=creados_programas, fichas=creadas_fichas)
+    return {**asociados[0], **creados_programas}, {**asociados[1], **creadas_fichas}
+
+def registrar_creados(db: Session, programas: dict = None, fichas: dict = None):
+    """
+    Publica en la caché los programas y fichas creados (o leídos) en la transacción de
+    `db` cuando esta se confirme; si se revierte, no se publican
+    """
+    al_confirmar(db, lambda: _agregar(programas or {}, fichas or {}))
+
+def invalidar():
+    """
+    Descarta la caché; el próximo uso la vuelve a cargar desde la base de datos
+    """
+    global _cargado
+    with _lock:
+        _cargado = False
+
+def _cargar():
+    global _cargado, _programas, _nombres, _fichas, _ultimo_numero
+    if _cargado:
+        return
+    with _lock:
+        if _cargado:
+            return
+        db = SessionLocal()
+        try:
+            programas = dict(db.query(Programas.NOMBRE_PROGRAMA, Programas.CODPROGRAMA).all())
+            fichas = dict(db.query(Ficha.CODFICHA, Ficha.CODPROGRAMA).all())
+        finally:
+            db.close()
+
+        numeros = [
+            int(coincidencia.group(1))
+            for coincidencia in map(_PATRON_CODIGO_PROGRAMA.match, programas.values())
+            if coincidencia
+        ]
+        _programas = programas
+        _nombres = {codigo: nombre for nombre, codigo in programas.items()}
+        _fichas = fichas
+        # Nunca retroceder: los códigos ya reservados en este proceso no se reutilizan
+        _ultimo_numero = max(numeros + [_ultimo_numero])
+        _cargado = True
+
+def _agregar(programas: dict, fichas: dict):
+    global _ultimo_numero
+    with _lock:
+        for nombre, codigo in programas.items():
+            _programas[nombre] = codigo
+            _nombres[codigo] = nombre
+            coincidencia = _PATRON_CODIGO_PROGRAMA.match(codigo)
+            if coincidencia:
+                _ultimo_numero = max(_ultimo_numero, int(coincidencia.group(1)))
+        _fichas.update(fichas)
+
+def _buscar_programas(db: Session, nombres: list) -> dict:
+    encontrados = {}
+    for inicio in range(0, len(nombres), 1000):
+        encontrados.update(db.query(Programas.NOMBRE_PROGRAMA, Programas.CODPROGRAMA).filter(
+            Programas.NOMBRE_PROGRAMA.in_(nombres[inicio:inicio + 1000])
+        ).all())
+    if encontrados:
+        registrar_creados(db, programas=encontrados)
+    return encontrados
+
+def _buscar_fichas(db: Session, codigos: list) -> dict:
+    encontradas = {}
+    for inicio in range(0, len(codigos), 1000):
+        encontradas.update(db.query(Ficha.CODFICHA, Ficha.CODPROGRAMA).filter(
+            Ficha.CODFICHA.in_(codigos[inicio:inicio + 1000])
+        ).all())
+    if encontradas:
+        registrar_creados(db, fichas=encontradas)
+    return encontradas
+
+def _insertar_lote(db: Session, programas: list, fichas: list):
+    if programas:
+        db.execute(insert(Programas), programas)
+    if fichas:
+        db.execute(insert(Ficha), fichas)
+
+def _descartar_existentes(db: Session, programas: list, fichas: list):
+    """
+    Quita del lote los programas (por nombre) y fichas que ya existen en la base de
+    datos, reserva códigos nuevos para los programas restantes y actualiza las fichas
+    que apuntaban a los códigos reemplazados. Retorna (programas, fichas, (programas
+    existentes, fichas existentes)).
+    """
+    existentes = _buscar_programas(db, [p["NOMBRE_PROGRAMA"] for p in programas])
+    fichas_existentes = _buscar_fichas(db, [f["CODFICHA"] for f in fichas])
+
+    codigos = {}
+    nuevos_programas = []
+    for programa in programas:
+        nombre = programa["NOMBRE_PROGRAMA"]
+        codigo = existentes.get(nombre) or reservar_codigo_programa()
+        codigos[programa["CODPROGRAMA"]] = codigo
+        if nombre not in existentes:
+            nuevos_programas.append({"CODPROGRAMA": codigo, "NOMBRE_PROGRAMA": nombre})
+
+    nuevas_fichas = [
+        {"CODFICHA": f["CODFICHA"], "CODPROGRAMA": codigos.get(f["CODPROGRAMA"], f["CODPROGRAMA"])}
+        for f in fichas if f["CODFICHA"] not in fichas_existentes
+    ]
+    return nuevos_programas, nuevas_fichas, (existentes, fichas_existentes)
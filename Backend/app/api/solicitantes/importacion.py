@@ -0,0 +1,148 @@
+import pandas as pd
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.core.database.solicitante import Solicitante
+from app.api.solicitantes import catalogo, busqueda
+from app.api.solicitantes.limpieza import COLUMNAS_REQUERIDAS, limpiar_filas_en_paralelo
+
+# Tamaño de los bloques para las consultas IN de precarga
+TAMANO_BLOQUE_CONSULTA = 1000
+
+def _en_bloques(valores: list):
+    for inicio in range(0, len(valores), TAMANO_BLOQUE_CONSULTA):
+        yield valores[inicio:inicio + TAMANO_BLOQUE_CONSULTA]
+
+class ImportadorSolicitantes:
+    """
+    Importa solicitantes desde DataFrames con el formato de la plantilla de Excel.
+
+    La limpieza y las validaciones por fila se hacen sobre columnas completas (en un
+    pool de procesos cuando el bloque es grande, ver limpieza.py); las
+    identificaciones existentes se precargan con consultas IN, los programas y
+    fichas se resuelven con el catálogo en caché (catalogo.py) y las filas válidas
+    se insertan por lotes. Los errores se reportan por fila con
+    los mismos mensajes de la importación fila a fila.
+
+    Un mismo importador puede procesar varios bloques de un archivo: recuerda lo ya
+    importado para detectar duplicados entre bloques.
+    """
+    def __init__(self, db: Session):
+        self.db = db
+        self.total_procesados = 0
+        self.exitosos = 0
+        self.errores = []
+        self._identificaciones = set()
+        self._programas = {}
+        self._fichas = {}
+
+    def procesar(self, df: pd.DataFrame, fila_inicial: int = 2):
+        """
+        Valida e inserta las filas de `df` en la transacción de la sesión (sin confirmarla).
+        `fila_inicial` es el número de fila de Excel de la primera fila del bloque.
+        """
+        if df.empty:
+            return
+
+        filas = limpiar_filas_en_paralelo(df)
+        self.total_procesados += len(df)
+        self._precargar(filas)
+
+        programas_nuevos = []
+        fichas_nuevas = []
+        solicitantes_nuevos = []
+
+        for posicion, fila in enumerate(filas.itertuples(index=False)):
+            try:
+                if fila.error:
+                    raise ValueError(fila.error)
+
+                solicitante_data = {
+                    'IDENTIFICACION': fila.identificacion.upper(),
+                    'PRIMER_NOMBRE': fila.primer_nombre.upper(),
+                    'SEGUNDO_NOMBRE': fila.segundo_nombre.upper() if fila.segundo_nombre else None,
+                    'PRIMER_APELLIDO': fila.primer_apellido.upper(),
+                    'SEGUNDO_APELLIDO': fila.segundo_apellido.upper() if fila.segundo_apellido else None,
+                    'CORREO': fila.correo.upper() if fila.correo is not None else None,
+                    'TELEFONO': fila.telefono,
+                    'ROL': fila.rol,
+                    'ESTADO': 'apto'
+                }
+
+                programa_nuevo = ficha_nueva = None
+                if fila.rol == 'aprendiz':
+                    programa_nombre = fila.programa.upper()
+                    codigo_programa = self._programas.get(programa_nombre)
+                    programa_ficha = self._fichas.get(fila.ficha)
+                    # Un programa nuevo no puede tener fichas existentes
+                    if programa_ficha is not None and programa_ficha != codigo_programa:
+                        raise ValueError(f"La ficha {fila.ficha} ya está asociada a otro programa")
+
+                    if not codigo_programa:
+                        programa_nuevo = {"CODPROGRAMA": None, "NOMBRE_PROGRAMA": programa_nombre}
+                    if programa_ficha is None:
+                        ficha_nueva = {"CODFICHA": fila.ficha, "CODPROGRAMA": codigo_programa}
+
+                    solicitante_data['FICHA'] = fila.ficha
+
+                # Verificar si ya existe un solicitante con la misma identificación
+                if solicitante_data['IDENTIFICACION'] in self._identificaciones:
+                    raise ValueError(f"Ya existe un solicitante con la identificación {fila.identificacion}")
+            except Exception as e:
+                self.errores.append(f"Fila {fila_inicial + posicion}: {str(e)}")
+                continue
+
+            # La fila es válida: registrar lo que creó para las filas siguientes
+            if programa_nuevo:
+                programa_nuevo["CODPROGRAMA"] = catalogo.reservar_codigo_programa()
+                self._programas[programa_nuevo["NOMBRE_PROGRAMA"]] = programa_nuevo["CODPROGRAMA"]
+                programas_nuevos.append(programa_nuevo)
+                if ficha_nueva:
+                    ficha_nueva["CODPROGRAMA"] = programa_nuevo["CODPROGRAMA"]
+            if ficha_nueva:
+                self._fichas[ficha_nueva["CODFICHA"]] = ficha_nueva["CODPROGRAMA"]
+                fichas_nuevas.append(ficha_nueva)
+            self._identificaciones.add(solicitante_data['IDENTIFICACION'])
+            solicitantes_nuevos.append(solicitante_data)
+
+        # Si otro proceso creó alguno mientras tanto, el catálogo retorna los códigos finales
+        programas, fichas = catalogo.crear_lote(self.db, programas_nuevos, fichas_nuevas)
+        self._programas.update(programas)
+        self._fichas.update(fichas)
+        if solicitantes_nuevos:
+            # Separar por columnas presentes para que el INSERT por lotes sea homogéneo
+            con_ficha = [s for s in solicitantes_nuevos if 'FICHA' in s]
+            sin_ficha = [s for s in solicitantes_nuevos if 'FICHA' not in s]
+            if con_ficha:
+                self.db.execute(insert(Solicitante), con_ficha)
+            if sin_ficha:
+                self.db.execute(insert(Solicitante), sin_ficha)
+            busqueda.indexar_al_confirmar(self.db, solicitantes_nuevos)
+        self.exitosos += len(solicitantes_nuevos)
+
+    def resultado(self) -> dict:
+        return {
+            "total_procesados": self.total_procesados,
+            "exitosos": self.exitosos,
+            "errores": self.errores,
+            "parcial": len(self.errores) > 0 and self.exitosos > 0
+        }
+
+    def _precargar(self, filas: pd.DataFrame):
+        """
+        Carga con consultas IN las identificaciones que el bloque menciona y que aún no
+        se conocen, y del catálogo los programas y fichas del bloque
+        """
+        validas = filas[filas["error"] == '']
+
+        identificaciones = [i for i in validas["identificacion"].str.upper().unique().tolist() if i not in self._identificaciones]
+        for bloque in _en_bloques(identificaciones):
+            self._identificaciones.update(fila[0] for fila in self.db.query(Solicitante.IDENTIFICACION).filter(
+                Solicitante.IDENTIFICACION.in_(bloque)
+            ).all())
+
+        aprendices = validas[validas["rol"] == 'aprendiz']
+        nombres_programas = [p for p in aprendices["programa"].str.upper().unique().tolist() if p not in self._programas]
+        fichas = [f for f in aprendices["ficha"].unique().tolist() if f not in self._fichas]
+        programas, fichas = catalogo.precargar(self.db, nombres_programas, fichas)
+        self._programas.update(programas)
+        self._fichas.update(fichas)
@@ -0,0 +1,123 @@
+# Limpieza y validación por columnas de las filas de la plantilla de solicitantes.
+# No importa nada de la base de datos para que los procesos del pool de validación
+# puedan cargarlo sin abrir conexiones.
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from app.api.solicitantes.normalizacion import (
+    dividir_nombres,
+    limpiar_serie,
+    limpiar_serie_opcional,
+    normalizar_roles,
+    normalizar_telefonos
+)
+
+COLUMNAS_REQUERIDAS = [
+    "Nombre completo",
+    "Número de documento",
+    "Número de teléfono",
+    "Tipo de rol",
+    "Número de ficha",
+    "Programa de formación"
+]
+
+ROLES_VALIDOS = ['aprendiz', 'contratista', 'funcionario', 'instructor']
+
+# Por debajo de este número de filas por fragmento no compensa enviar datos a otros procesos
+FILAS_MINIMAS_POR_FRAGMENTO = 5000
+
+# Procesos del pool de validación
+MAX_PROCESOS_VALIDACION = os.cpu_count() or 1
+
+_pool = None
+_lock_pool = threading.Lock()
+
+def limpiar_filas(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Limpia todas las columnas y calcula el primer error de cada fila en el mismo
+    orden en que los revisa la importación fila a fila
+    """
+    nombres = dividir_nombres(df["Nombre completo"])
+    identificacion = limpiar_serie(df["Número de documento"])
+    telefono = normalizar_telefonos(df["Número de teléfono"])
+    rol = normalizar_roles(df["Tipo de rol"])
+    ficha = limpiar_serie_opcional(df["Número de ficha"])
+    programa = limpiar_serie_opcional(df["Programa de formación"])
+    if "Correo electrónico" in df.columns:
+        correo = limpiar_serie_opcional(df["Correo electrónico"])
+    else:
+        correo = pd.Series([None] * len(df), index=df.index, dtype=object)
+
+    aprendiz = rol == 'aprendiz'
+    faltan_datos_aprendiz = aprendiz & (ficha.isna() | (ficha == '') | programa.isna() | (programa == ''))
+
+    error = np.select(
+        [
+            nombres["primer_apellido"].isna(),
+            ~identificacion.str.isdigit(),
+            telefono.isna(),
+            ~rol.isin(ROLES_VALIDOS),
+            faltan_datos_aprendiz,
+        ],
+        [
+            "El nombre completo debe tener al menos nombre y apellido",
+            "El número de documento debe contener solo dígitos",
+            "Número de teléfono inválido (debe tener 10 dígitos y empezar con 3)",
+            "Tipo de rol inválido (debe ser: aprendiz, contratista, funcionario o instructor)",
+            "Los campos 'Número de ficha' y 'Programa de formación' son obligatorios para aprendices",
+        ],
+        default=''
+    )
+
+    return pd.DataFrame({
+        "error": error,
+        "identificacion": identificacion,
+        "primer_nombre": nombres["primer_nombre"],
+        "segundo_nombre": nombres["segundo_nombre"],
+        "primer_apellido": nombres["primer_apellido"],
+        "segundo_apellido": nombres["segundo_apellido"],
+        "correo": correo,
+        "telefono": telefono,
+        "rol": rol,
+        "ficha": ficha,
+        "programa": programa,
+    }, index=df.index).astype(object).where(lambda filas: filas.notna(), None)
+
+def limpiar_filas_en_paralelo(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Igual que limpiar_filas, pero en hojas grandes divide el DataFrame en fragmentos
+    que se validan en un pool de procesos y se vuelven a unir en el orden original
+    """
+    fragmentos = min(MAX_PROCESOS_VALIDACION, math.ceil(len(df) / FILAS_MINIMAS_POR_FRAGMENTO))
+    if fragmentos <= 1:
+        return limpiar_filas(df)
+
+    limites = np.linspace(0, len(df), fragmentos + 1, dtype=int)
+    partes = [df.iloc[inicio:fin] for inicio, fin in zip(limites[:-1], limites[1:])]
+    return pd.concat(list(_obtener_pool().map(limpiar_filas, partes)))
+
+def _obtener_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _lock_pool:
+            if _pool is None:
+                # "spawn": hacer fork de un servidor con hilos puede heredar locks tomados
+                _pool = ProcessPoolExecutor(
+                    max_workers=MAX_PROCESOS_VALIDACION,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _pool
+
+def cerrar_pool():
+    """
+    Termina los procesos del pool de validación (al apagar la aplicación)
+    """
+    global _pool
+    with _lock_pool:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
@@ -0,0 +1,142 @@
+# Reglas de normalización de los datos de solicitantes (textos, roles, nombres y teléfonos).
+# Cada regla es una función escalar; las importaciones usan sus versiones sobre
+# pd.Series, que aplican esa misma función celda por celda. Sin pyarrow los métodos
+# .str de pandas también recorren la serie en Python, una vez por operación, y son
+# más lentos (ver scripts/benchmark_normalizacion.py).
+# No importa nada de la base de datos para que los procesos del pool de validación
+# puedan cargarlo sin abrir conexiones.
+import pandas as pd
+
+# Puntuación que se quita al final de los textos
+PUNTUACION_FINAL = '.,;:!?'
+
+PREFIJO_INTERNACIONAL = '+57'
+INDICATIVO_PAIS = '57'
+
+def limpiar_texto(valor) -> str:
+    """
+    Quita espacios alrededor y la puntuación final; None queda como cadena vacía
+    """
+    if valor is None:
+        return ''
+    return str(valor).strip().rstrip(PUNTUACION_FINAL).strip()
+
+def normalizar_texto(valor) -> str:
+    """
+    Texto limpio y en mayúsculas, como se guarda en la base de datos
+    """
+    return limpiar_texto(valor).upper()
+
+def normalizar_opcional(valor):
+    """
+    Igual que normalizar_texto, pero los valores vacíos quedan como None
+    """
+    return normalizar_texto(valor) if valor else None
+
+def normalizar_rol(valor) -> str:
+    """
+    Texto limpio y en minúsculas, como los valores de RolEnum
+    """
+    return limpiar_texto(valor).lower()
+
+def dividir_nombre(nombre_completo) -> tuple:
+    """
+    Separa un nombre completo en (primer nombre, segundo nombre, primer apellido,
+    segundo apellido). Con tres palabras no hay segundo nombre y con dos solo hay
+    nombre y apellido; retorna None si tiene menos de dos palabras
+    """
+    partes = limpiar_texto(nombre_completo).split()
+    if len(partes) >= 4:
+        return partes[0], partes[1], partes[2], partes[3]
+    if len(partes) == 3:
+        return partes[0], None, partes[1], partes[2]
+    if len(partes) == 2:
+        return partes[0], None, partes[1], None
+    return None
+
+def normalizar_telefono(telefono):
+    """
+    Valida el número de teléfono:
+    - Debe empezar con 3
+    - Debe tener 10 dígitos
+    - Maneja números en notación científica
+    - Elimina el código de país (57) si está presente
+    - Maneja números con prefijo internacional (+57)
+    Retorna None si no cumple con los criterios
+    """
+    try:
+        # Convertir a string y limpiar
+        telefono = str(telefono).strip().replace('.', '').replace(' ', '')
+
+        # Manejar notación científica
+        if 'E' in telefono.upper():
+            telefono = str(int(float(telefono)))
+
+        # Remover prefijo internacional
+        if telefono.startswith(PREFIJO_INTERNACIONAL):
+            telefono = telefono[len(PREFIJO_INTERNACIONAL):]
+        elif telefono.startswith(INDICATIVO_PAIS):
+            telefono = telefono[len(INDICATIVO_PAIS):]
+
+        # Si el número tiene más de 10 dígitos, tomar los últimos 10
+        telefono = telefono[-10:]
+
+        # Validar formato final
+        if len(telefono) == 10 and telefono.startswith('3') and telefono.isdigit():
+            return telefono
+        return None
+    except (ValueError, OverflowError):
+        return None
+
+def _aplicar(serie: pd.Series, regla) -> pd.Series:
+    """
+    Aplica la regla escalar a cada celda; las celdas vacías llegan como None
+    """
+    valores = serie.to_numpy(dtype=object, copy=True)
+    valores[pd.isna(valores)] = None
+    return pd.Series([regla(valor) for valor in valores], index=serie.index, dtype=object)
+
+def limpiar_serie(serie: pd.Series) -> pd.Series:
+    """
+    limpiar_texto sobre una serie; las celdas vacías quedan como cadena vacía
+    """
+    return _aplicar(serie, limpiar_texto)
+
+def limpiar_serie_opcional(serie: pd.Series) -> pd.Series:
+    """
+    Igual que limpiar_serie pero conserva las celdas vacías como None
+    """
+    return limpiar_serie(serie).where(serie.notna(), None)
+
+def normalizar_serie(serie: pd.Series) -> pd.Series:
+    """
+    normalizar_opcional sobre una serie; las celdas vacías quedan como None
+    """
+    return _aplicar(serie, normalizar_opcional)
+
+def normalizar_roles(serie: pd.Series) -> pd.Series:
+    """
+    normalizar_rol sobre una serie; las celdas vacías quedan como cadena vacía
+    """
+    return _aplicar(serie, normalizar_rol)
+
+def dividir_nombres(serie: pd.Series) -> pd.DataFrame:
+    """
+    dividir_nombre sobre una serie: un DataFrame con las columnas primer_nombre,
+    segundo_nombre, primer_apellido y segundo_apellido. Los nombres de menos de dos
+    palabras quedan con todas las columnas en None
+    """
+    partes = _aplicar(serie, lambda nombre: dividir_nombre(nombre) or (None, None, None, None))
+    return pd.DataFrame(
+        partes.tolist(),
+        columns=["primer_nombre", "segundo_nombre", "primer_apellido", "segundo_apellido"],
+        index=serie.index,
+        dtype=object
+    )
+
+def normalizar_telefonos(serie: pd.Series) -> pd.Series:
+    """
+    normalizar_telefono sobre una serie: el teléfono normalizado o None cuando no
+    cumple los criterios
+    """
+    return _aplicar(serie, normalizar_telefono)
@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Response, status, Request
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Response, status, Request, Query
 from fastapi.responses import JSONResponse
+from sqlalchemy import and_, case
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from app.schemas.solicitante_modelo import (
@@ -8,184 +9,84 @@ from app.schemas.solicitante_modelo import (
     EliminarSolicitante,
     EliminarMultiplesSolicitantes,
     UpdateSolicitante,
+    UpsertSolicitantesLote,
     RolEnum,
 )
-from typing import List
+from typing import List, Optional
 import pandas as pd
-import io
 from app.core.database.solicitante import Solicitante
 from app.core.database.programas import Programas
 from app.core.database.ficha import Ficha
 from app.core.database.db import SessionLocal
 from fastapi.encoders import jsonable_encoder
 from app.api.auth.login import verify_jwt_token
+from app.api.solicitantes.importacion import ImportadorSolicitantes, COLUMNAS_REQUERIDAS
+from app.api.solicitantes import catalogo, busqueda
+from app.api.solicitantes.normalizacion import normalizar_opcional, normalizar_telefono, normalizar_texto
+from app.api.solicitantes.solicitante_lote import eliminar_solicitantes_lote, upsert_solicitantes_lote
+from app.core.excel import leer_excel_por_bloques
+from app.api.importaciones.trabajos import enviar_importacion
 
 router = APIRouter()
 
 @router.post("/importar-excel")
-async def importar_solicitantes_excel(
+def importar_solicitantes_excel(
     file: UploadFile = File(...),
+    streaming: bool = False,
+    segundo_plano: bool = False,
     token: str = Depends(verify_jwt_token)
 ):
+    """
+    Importar solicitantes desde Excel. Con `streaming=true` el archivo se lee por
+    bloques de filas y cada bloque se valida y confirma antes de leer el siguiente,
+    de modo que la memoria usada no depende del tamaño del archivo.
+
+    Con `segundo_plano=true` la importación (en modo streaming) se encola y se
+    responde de inmediato con el id para consultar el avance en /imports/{id}.
+    """
     if not file.filename.endswith('.xlsx'):
         return JSONResponse(
             status_code=400,
             content={"detail": "El archivo debe ser un archivo Excel (.xlsx)"}
         )
 
-    db = SessionLocal()
-    try:
-        # Leer el archivo Excel
-        contents = await file.read()
-        df = pd.read_excel(io.BytesIO(contents))
-
-        # Validar las columnas requeridas
-        columnas_requeridas = [
-            "Nombre completo",
-            "Número de documento",
-            "Número de teléfono",
-            "Tipo de rol",
-            "Número de ficha",
-            "Programa de formación"
-        ]
-        columnas_disponibles = df.columns.tolist()
-        
-        # Verificar si todas las columnas requeridas están presentes
-        columnas_faltantes = [col for col in columnas_requeridas if col not in columnas_disponibles]
-        if columnas_faltantes:
+    if segundo_plano:
+        try:
+            trabajo, error_columnas = enviar_importacion('solicitantes', file, _validar_columnas, _importar_solicitantes_en_trabajo)
+        except Exception as e:
             return JSONResponse(
-                status_code=400,
-                content={
-                    "detail": "Formato de archivo inválido",
-                    "columnas_requeridas": columnas_requeridas,
-                    "columnas_disponibles": columnas_disponibles
-                }
+                status_code=500,
+                content={"detail": f"Error al procesar el archivo: {str(e)}"}
             )
+        if error_columnas:
+            return error_columnas
+        return JSONResponse(
+            status_code=202,
+            content={"detail": "Importación en proceso", "id": trabajo.id, "estado": f"/imports/{trabajo.id}"}
+        )
 
-        total_procesados = 0
-        exitosos = 0
-        errores = []
-        
-        # Procesar cada fila de forma independiente
-        for index, row in df.iterrows():
-            # Crear una nueva transacción para cada fila
-            db_transaction = SessionLocal()
-            try:
-                total_procesados += 1
-                
-                # Extraer y validar datos
-                nombre_completo = str(row["Nombre completo"]).strip()
-                # Limpiar caracteres especiales del nombre
-                nombre_completo = nombre_completo.rstrip('.,;:!?').strip()
-                nombres = nombre_completo.split()
-                
-                # Asignar nombres y apellidos
-                if len(nombres) >= 4:
-                    primer_nombre = nombres[0]
-                    segundo_nombre = nombres[1]
-                    primer_apellido = nombres[2]
-                    segundo_apellido = nombres[3]
-                elif len(nombres) == 3:
-                    primer_nombre = nombres[0]
-                    segundo_nombre = None
-                    primer_apellido = nombres[1]
-                    segundo_apellido = nombres[2]
-                elif len(nombres) == 2:
-                    primer_nombre = nombres[0]
-                    segundo_nombre = None
-                    primer_apellido = nombres[1]
-                    segundo_apellido = None
-                else:
-                    raise ValueError("El nombre completo debe tener al menos nombre y apellido")
-
-                identificacion = str(row["Número de documento"]).strip()
-                # Limpiar caracteres especiales del documento
-                identificacion = identificacion.rstrip('.,;:!?').strip()
-                if not identificacion.isdigit():
-                    raise ValueError("El número de documento debe contener solo dígitos")
-
-                telefono = validate_phone(row["Número de teléfono"])
-                if not telefono:
-                    raise ValueError("Número de teléfono inválido (debe tener 10 dígitos y empezar con 3)")
-
-                rol = str(row["Tipo de rol"]).strip().lower()
-                # Limpiar caracteres especiales del rol
-                rol = rol.rstrip('.,;:!?').strip()
-                if rol not in ['aprendiz', 'contratista', 'funcionario', 'instructor']:
-                    raise ValueError("Tipo de rol inválido (debe ser: aprendiz, contratista, funcionario o instructor)")
-
-                # Validar campos específicos para aprendices
-                ficha = str(row["Número de ficha"]).strip().rstrip('.,;:!?').strip() if pd.notna(row["Número de ficha"]) else None
-                programa = str(row["Programa de formación"]).strip().rstrip('.,;:!?').strip() if pd.notna(row["Programa de formación"]) else None
-
-                if rol == 'aprendiz':
-                    if not ficha or not programa:
-                        raise ValueError("Los campos 'Número de ficha' y 'Programa de formación' son obligatorios para aprendices")
-
-                # Preparar datos del solicitante
-                solicitante_data = {
-                    'IDENTIFICACION': identificacion.upper(),
-                    'PRIMER_NOMBRE': primer_nombre.upper(),
-                    'SEGUNDO_NOMBRE': segundo_nombre.upper() if segundo_nombre else None,
-                    'PRIMER_APELLIDO': primer_apellido.upper(),
-                    'SEGUNDO_APELLIDO': segundo_apellido.upper() if segundo_apellido else None,
-                    'CORREO': str(row.get("Correo electrónico", "")).strip().rstrip('.,;:!?').strip().upper() if pd.notna(row.get("Correo electrónico")) else None,
-                    'TELEFONO': telefono,
-                    'ROL': rol,
-                    'ESTADO': 'apto'
-                }
-
-                # Manejar ficha y programa
-                if rol == 'aprendiz':
-                    # Buscar o crear el programa
-                    programa_obj = db_transaction.query(Programas).filter_by(NOMBRE_PROGRAMA=programa.upper()).first()
-                    if not programa_obj:
-                        last_program = db_transaction.query(Programas).order_by(Programas.CODPROGRAMA.desc()).first()
-                        new_num = 1 if not last_program else int(last_program.CODPROGRAMA[4:]) + 1
-                        new_code = f"PROG{new_num:04d}"
-                        programa_obj = Programas(CODPROGRAMA=new_code, NOMBRE_PROGRAMA=programa.upper())
-                        db_transaction.add(programa_obj)
-                        db_transaction.flush()
-
-                    # Buscar o crear la ficha
-                    ficha_obj = db_transaction.query(Ficha).filter_by(CODFICHA=ficha).first()
-                    if not ficha_obj:
-                        ficha_obj = Ficha(CODFICHA=ficha, CODPROGRAMA=programa_obj.CODPROGRAMA)
-                        db_transaction.add(ficha_obj)
-                        db_transaction.flush()
-                    elif ficha_obj.CODPROGRAMA != programa_obj.CODPROGRAMA:
-                        raise ValueError(f"La ficha {ficha} ya está asociada a otro programa")
-
-                    solicitante_data['FICHA'] = ficha
-
-                # Verificar si ya existe un solicitante con la misma identificación
-                existing = db_transaction.query(Solicitante).filter_by(IDENTIFICACION=identificacion.upper()).first()
-                if existing:
-                    raise ValueError(f"Ya existe un solicitante con la identificación {identificacion}")
-
-                # Crear el solicitante
-                nuevo_solicitante = Solicitante(**solicitante_data)
-                db_transaction.add(nuevo_solicitante)
-                
-                # Commit de esta transacción específica
-                db_transaction.commit()
-                exitosos += 1
-
-            except Exception as e:
-                errores.append(f"Fila {index + 2}: {str(e)}")
-                db_transaction.rollback()
-            finally:
-                db_transaction.close()
+    db = SessionLocal()
+    try:
+        if streaming:
+            return _importar_solicitantes_por_bloques(db, file)
+
+        # Leer todo como texto para que documentos, teléfonos y fichas no se conviertan
+        # en números (p. ej. "3001234567.0" cuando la columna tiene celdas vacías)
+        df = pd.read_excel(file.file, dtype=str)
 
+        # Verificar si todas las columnas requeridas están presentes
+        error_columnas = _validar_columnas(df.columns.tolist())
+        if error_columnas:
+            return error_columnas
+
+        # Validar todas las filas por columnas e insertar las válidas en una sola transacción
+        importador = ImportadorSolicitantes(db)
+        importador.procesar(df)
+        db.commit()
 
         return JSONResponse(
             status_code=200,
-            content={
-                "total_procesados": total_procesados,
-                "exitosos": exitosos,
-                "errores": errores,
-                "parcial": len(errores) > 0 and exitosos > 0
-            }
+            content=importador.resultado()
         )
 
     except Exception as e:
@@ -197,9 +98,56 @@ async def importar_solicitantes_excel(
     finally:
         db.close()
 
+def _validar_columnas(columnas_disponibles: list):
+    """
+    Retorna la respuesta de error si faltan columnas requeridas, o None
+    """
+    columnas_faltantes = [col for col in COLUMNAS_REQUERIDAS if col not in columnas_disponibles]
+    if columnas_faltantes:
+        return JSONResponse(
+            status_code=400,
+            content={
+                "detail": "Formato de archivo inválido",
+                "columnas_requeridas": COLUMNAS_REQUERIDAS,
+                "columnas_disponibles": columnas_disponibles
+            }
+        )
+    return None
+
+def _importar_solicitantes_por_bloques(db: Session, file: UploadFile):
+    with leer_excel_por_bloques(file.file) as (columnas, bloques):
+        error_columnas = _validar_columnas(columnas)
+        if error_columnas:
+            return error_columnas
+
+        importador = ImportadorSolicitantes(db)
+        for fila_inicial, df in bloques:
+            importador.procesar(df, fila_inicial)
+            db.commit()
+
+    return JSONResponse(
+        status_code=200,
+        content=importador.resultado()
+    )
+
+def _importar_solicitantes_en_trabajo(ruta: str, trabajo):
+    db = SessionLocal()
+    try:
+        with leer_excel_por_bloques(ruta) as (_, bloques):
+            importador = ImportadorSolicitantes(db)
+            for fila_inicial, df in bloques:
+                importador.procesar(df, fila_inicial)
+                db.commit()
+                trabajo.registrar_avance(importador.resultado())
+        return importador.resultado()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
 
 @router.post("/registrar")
-async def registrar_solicitante(
+def registrar_solicitante(
     solicitante: SolicitanteResponse,
     token: str = Depends(verify_jwt_token)
 ):
@@ -214,7 +162,7 @@ async def registrar_solicitante(
             )
 
         # Validar el teléfono
-        telefono_validado = validate_phone(solicitante.telefono)
+        telefono_validado = normalizar_telefono(solicitante.telefono)
         if telefono_validado is None:
             return JSONResponse(
                 status_code=400,
@@ -231,12 +179,12 @@ async def registrar_solicitante(
 
         # Preparar datos del solicitante
         solicitante_data = {
-            'IDENTIFICACION': solicitante.identificacion.strip().rstrip('.,;:!?').strip().upper(),
-            'PRIMER_NOMBRE': solicitante.primer_nombre.strip().rstrip('.,;:!?').strip().upper(),
-            'SEGUNDO_NOMBRE': solicitante.segundo_nombre.strip().rstrip('.,;:!?').strip().upper() if solicitante.segundo_nombre else None,
-            'PRIMER_APELLIDO': solicitante.primer_apellido.strip().rstrip('.,;:!?').strip().upper(),
-            'SEGUNDO_APELLIDO': solicitante.segundo_apellido.strip().rstrip('.,;:!?').strip().upper() if solicitante.segundo_apellido else None,
-            'CORREO': solicitante.correo.strip().rstrip('.,;:!?').strip().upper() if solicitante.correo else None,
+            'IDENTIFICACION': normalizar_texto(solicitante.identificacion),
+            'PRIMER_NOMBRE': normalizar_texto(solicitante.primer_nombre),
+            'SEGUNDO_NOMBRE': normalizar_opcional(solicitante.segundo_nombre),
+            'PRIMER_APELLIDO': normalizar_texto(solicitante.primer_apellido),
+            'SEGUNDO_APELLIDO': normalizar_opcional(solicitante.segundo_apellido),
+            'CORREO': normalizar_opcional(solicitante.correo),
             'TELEFONO': telefono_validado,
             'ROL': solicitante.rol,
             'ESTADO': 'apto'
@@ -244,71 +192,24 @@ async def registrar_solicitante(
 
         # Manejar ficha y programa según el rol
         if solicitante.rol == RolEnum.APRENDIZ:
-            ficha_codigo = solicitante.ficha.strip().rstrip('.,;:!?').strip().upper()
-            programa_nombre = solicitante.programa.strip().rstrip('.,;:!?').strip().upper()
+            ficha_codigo = normalizar_texto(solicitante.ficha)
+            programa_nombre = normalizar_texto(solicitante.programa)
             
-            # Buscar o crear el programa
-            programa = db.query(Programas).filter_by(NOMBRE_PROGRAMA=programa_nombre).first()
-            if not programa:
-                # Generar un código autoincremental para el programa
-                last_program = db.query(Programas).order_by(Programas.CODPROGRAMA.desc()).first()
-                if last_program:
-                    # Extraer el número del último código y aumentarlo en 1
-                    try:
-                        last_num = int(last_program.CODPROGRAMA[4:])  # Tomar los dígitos después de 'PROG'
-                        new_num = last_num + 1
-                    except ValueError:
-                        new_num = 1
-                else:
-                    new_num = 1
-                
-                new_code = f"PROG{new_num:04d}"  # Formato: PROG0001, PROG0002, etc.
-                
-                programa = Programas(
-                    CODPROGRAMA=new_code,
-                    NOMBRE_PROGRAMA=programa_nombre
-                )
-                db.add(programa)
-                db.flush()
-            
-            # Buscar o crear la ficha
-            ficha = db.query(Ficha).filter_by(CODFICHA=ficha_codigo).first()
-            if not ficha:
-                ficha = Ficha(
-                    CODFICHA=ficha_codigo,
-                    CODPROGRAMA=programa.CODPROGRAMA
-                )
-                db.add(ficha)
-                db.flush()
-            else:
-                # Verificar si la ficha pertenece a un programa diferente
-                if ficha.CODPROGRAMA != programa.CODPROGRAMA:
-                    existing_programa = db.query(Programas).filter_by(CODPROGRAMA=ficha.CODPROGRAMA).first()
-                    programa_existente_nombre = existing_programa.NOMBRE_PROGRAMA if existing_programa else "programa desconocido"
-                    return JSONResponse(
-                        status_code=400,
-                        content={"detail": f"Este número de ficha ({ficha_codigo}) pertenece a otro programa: {programa_existente_nombre}"}
-                    )
+            error = _programa_y_ficha(db, ficha_codigo, programa_nombre)
+            if error:
+                return error
             
             solicitante_data['FICHA'] = ficha_codigo
         elif solicitante.programa:
             # Para otros roles, crear programa si no existe
-            programa_nombre = solicitante.programa.strip().rstrip('.,;:!?').strip().upper()
-            programa = db.query(Programas).filter_by(NOMBRE_PROGRAMA=programa_nombre).first()
-            if not programa:
-                programa = Programas(
-                    CODPROGRAMA=f"PROG{len(programa_nombre)[:4]}",  # Código genérico
-                    NOMBRE_PROGRAMA=programa_nombre
-                )
-                db.add(programa)
-                db.flush()
-            
-            solicitante_data['PROGRAMA'] = programa.CODPROGRAMA
+            programa_nombre = normalizar_texto(solicitante.programa)
+            solicitante_data['PROGRAMA'] = catalogo.obtener_o_crear_programa(db, programa_nombre)
 
         # Crear el nuevo solicitante
         nuevo_solicitante = Solicitante(**solicitante_data)
 
         db.add(nuevo_solicitante)
+        busqueda.indexar_al_confirmar(db, [solicitante_data])
         db.commit()
         
         return JSONResponse(
@@ -321,42 +222,26 @@ async def registrar_solicitante(
     finally:
         db.close()
 
+def _programa_y_ficha(db: Session, ficha_codigo: str, programa_nombre: str):
+    """
+    Busca o crea el programa y la ficha de un aprendiz usando el catálogo en caché.
+    Retorna un JSONResponse si la ficha pertenece a otro programa, o None.
+    """
+    try:
+        catalogo.asignar_ficha(db, ficha_codigo, programa_nombre)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"detail": str(e)})
+    return None
+
 @router.get("/obtener", response_model=List[SolicitanteResponse])
 def obtener_solicitantes(token: str = Depends(verify_jwt_token)):
     db = SessionLocal()
     try:
-        solicitantes = db.query(Solicitante).order_by(Solicitante.IDENTIFICACION.desc()).all()
-        if not solicitantes:
-            return []
-            
-        result = []
-        for s in solicitantes:
-            # Obtener información de ficha y programa
-            ficha_info = None
-            programa_info = None
-            
-            if s.ROL == 'aprendiz' and s.FICHA:
-                ficha_info = s.FICHA
-                if s.ficha and s.ficha.programa:
-                    programa_info = s.ficha.programa.NOMBRE_PROGRAMA
-            elif s.PROGRAMA and s.programa:
-                programa_info = s.programa.NOMBRE_PROGRAMA
-            
-            solicitante_dict = {
-                "identificacion": s.IDENTIFICACION,
-                "primer_nombre": s.PRIMER_NOMBRE,
-                "segundo_nombre": s.SEGUNDO_NOMBRE,
-                "primer_apellido": s.PRIMER_APELLIDO,
-                "segundo_apellido": s.SEGUNDO_APELLIDO,
-                "correo": s.CORREO,
-                "telefono": s.TELEFONO,
-                "rol": s.ROL,
-                "ficha": ficha_info,
-                "programa": programa_info
-            }
-            result.append(solicitante_dict)
-        
-        return result
+        filas = _consulta_listado(db).order_by(Solicitante.IDENTIFICACION.desc()).all()
+
+        # Los datos ya vienen validados de la base de datos: se serializan sin
+        # volver a validarlos contra SolicitanteResponse
+        return JSONResponse(content=[_serializar_solicitante(fila) for fila in filas])
     except Exception as e:
         # Verificar si es un error de columna desconocida
         if "Unknown column" in str(e):
@@ -374,8 +259,133 @@ def obtener_solicitantes(token: str = Depends(verify_jwt_token)):
     finally:
         db.close()
 
+@router.get("/listar", response_model=List[SolicitanteResponse])
+def listar_solicitantes(
+    cursor: Optional[str] = None,
+    limite: int = Query(100, ge=1, le=5000),
+    rol: Optional[RolEnum] = None,
+    estado: Optional[str] = Query(None, pattern="^(apto|no apto)$"),
+    ficha: Optional[str] = None,
+    programa: Optional[str] = None,
+    token: str = Depends(verify_jwt_token)
+):
+    """
+    Listar solicitantes por identificación descendente, paginado por cursor y con
+    filtros opcionales por rol, estado, ficha y nombre de programa.
+
+    Se devuelven los solicitantes con identificación menor que `cursor`; el cursor
+    de la siguiente página viaja en la cabecera X-Siguiente-Cursor (ausente en la
+    última página).
+    """
+    db = SessionLocal()
+    try:
+        query = _consulta_listado(db)
+        if rol:
+            query = query.filter(Solicitante.ROL == rol.value)
+        if estado:
+            query = query.filter(Solicitante.ESTADO == estado)
+        if ficha:
+            query = query.filter(Solicitante.ROL == 'aprendiz', Solicitante.FICHA == ficha.strip().upper())
+        if programa:
+            query = query.filter(_PROGRAMA_SOLICITANTE == programa.strip().upper())
+        if cursor is not None:
+            query = query.filter(Solicitante.IDENTIFICACION < cursor)
+
+        # Pedir un registro extra para saber si existe una página siguiente
+        filas = query.order_by(Solicitante.IDENTIFICACION.desc()).limit(limite + 1).all()
+
+        headers = {}
+        if len(filas) > limite:
+            filas = filas[:limite]
+            headers["X-Siguiente-Cursor"] = filas[-1].IDENTIFICACION
+
+        return JSONResponse(content=[_serializar_solicitante(fila) for fila in filas], headers=headers)
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"detail": f"Error al listar solicitantes: {str(e)}"})
+    finally:
+        db.close()
+
+@router.get("/buscar", response_model=List[SolicitanteResponse])
+def buscar_solicitantes(
+    q: str = Query(..., min_length=1),
+    limite: int = Query(20, ge=1, le=100),
+    token: str = Depends(verify_jwt_token)
+):
+    """
+    Buscar solicitantes por parte de la identificación o de los nombres y apellidos
+    (sin distinguir mayúsculas ni tildes), ordenados por relevancia. Usa el índice
+    en memoria de busqueda.py; solo se consulta la base de datos para traer las
+    filas encontradas.
+    """
+    db = SessionLocal()
+    try:
+        identificaciones = busqueda.buscar(q, limite)
+        if not identificaciones:
+            return JSONResponse(content=[])
+
+        filas = _consulta_listado(db).filter(Solicitante.IDENTIFICACION.in_(identificaciones)).all()
+        por_identificacion = {fila.IDENTIFICACION: fila for fila in filas}
+        return JSONResponse(content=[
+            _serializar_solicitante(por_identificacion[identificacion])
+            for identificacion in identificaciones
+            if identificacion in por_identificacion
+        ])
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"detail": f"Error al buscar solicitantes: {str(e)}"})
+    finally:
+        db.close()
+
+# Programa mostrado para cada solicitante: el de su ficha si es aprendiz, o el
+# asignado directamente para los demás roles
+_programa_ficha = Programas.__table__.alias("programa_ficha")
+_programa_directo = Programas.__table__.alias("programa_directo")
+_PROGRAMA_SOLICITANTE = case(
+    (and_(Solicitante.ROL == 'aprendiz', Solicitante.FICHA.isnot(None)), _programa_ficha.c.NOMBRE_PROGRAMA),
+    else_=_programa_directo.c.NOMBRE_PROGRAMA
+)
+
+def _consulta_listado(db: Session):
+    """
+    Consulta con solo las columnas del listado; ficha y programas se unen en la
+    misma consulta en lugar de cargarse por solicitante
+    """
+    return db.query(
+        Solicitante.IDENTIFICACION,
+        Solicitante.PRIMER_NOMBRE,
+        Solicitante.SEGUNDO_NOMBRE,
+        Solicitante.PRIMER_APELLIDO,
+        Solicitante.SEGUNDO_APELLIDO,
+        Solicitante.CORREO,
+        Solicitante.TELEFONO,
+        Solicitante.ROL,
+        Solicitante.ESTADO,
+        Solicitante.FICHA,
+        _PROGRAMA_SOLICITANTE.label("NOMBRE_PROGRAMA")
+    ).outerjoin(
+        Ficha, Ficha.CODFICHA == Solicitante.FICHA
+    ).outerjoin(
+        _programa_ficha, _programa_ficha.c.CODPROGRAMA == Ficha.CODPROGRAMA
+    ).outerjoin(
+        _programa_directo, _programa_directo.c.CODPROGRAMA == Solicitante.PROGRAMA
+    )
+
+def _serializar_solicitante(fila) -> dict:
+    return {
+        "identificacion": fila.IDENTIFICACION,
+        "primer_nombre": fila.PRIMER_NOMBRE,
+        "segundo_nombre": fila.SEGUNDO_NOMBRE,
+        "primer_apellido": fila.PRIMER_APELLIDO,
+        "segundo_apellido": fila.SEGUNDO_APELLIDO,
+        "correo": fila.CORREO,
+        "telefono": fila.TELEFONO,
+        "rol": fila.ROL,
+        "estado": fila.ESTADO,
+        "ficha": fila.FICHA if fila.ROL == 'aprendiz' else None,
+        "programa": fila.NOMBRE_PROGRAMA
+    }
+
 @router.put("/actualizar")
-async def actualizar_solicitante(
+def actualizar_solicitante(
     solicitante: UpdateSolicitante,
     token: str = Depends(verify_jwt_token)
 ):
@@ -390,7 +400,7 @@ async def actualizar_solicitante(
             )
 
         # Validar el teléfono
-        telefono_validado = validate_phone(solicitante.telefono)
+        telefono_validado = normalizar_telefono(solicitante.telefono)
         if telefono_validado is None:
             return JSONResponse(
                 status_code=400,
@@ -398,11 +408,11 @@ async def actualizar_solicitante(
             )
 
         # Actualizar los campos
-        existing.PRIMER_NOMBRE = solicitante.primer_nombre.strip().rstrip('.,;:!?').strip().upper()
-        existing.SEGUNDO_NOMBRE = solicitante.segundo_nombre.strip().rstrip('.,;:!?').strip().upper() if solicitante.segundo_nombre else None
-        existing.PRIMER_APELLIDO = solicitante.primer_apellido.strip().rstrip('.,;:!?').strip().upper()
-        existing.SEGUNDO_APELLIDO = solicitante.segundo_apellido.strip().rstrip('.,;:!?').strip().upper() if solicitante.segundo_apellido else None
-        existing.CORREO = solicitante.correo.strip().rstrip('.,;:!?').strip().upper() if solicitante.correo else None
+        existing.PRIMER_NOMBRE = normalizar_texto(solicitante.primer_nombre)
+        existing.SEGUNDO_NOMBRE = normalizar_opcional(solicitante.segundo_nombre)
+        existing.PRIMER_APELLIDO = normalizar_texto(solicitante.primer_apellido)
+        existing.SEGUNDO_APELLIDO = normalizar_opcional(solicitante.segundo_apellido)
+        existing.CORREO = normalizar_opcional(solicitante.correo)
         existing.TELEFONO = telefono_validado
         existing.ROL = solicitante.rol
 
@@ -414,50 +424,24 @@ async def actualizar_solicitante(
                     content={"detail": "Los campos 'ficha' y 'programa' son requeridos para aprendices"}
                 )
             
-            ficha_codigo = solicitante.ficha.strip().rstrip('.,;:!?').strip().upper()
-            programa_nombre = solicitante.programa.strip().rstrip('.,;:!?').strip().upper()
+            ficha_codigo = normalizar_texto(solicitante.ficha)
+            programa_nombre = normalizar_texto(solicitante.programa)
             
-            # Buscar o crear el programa
-            programa = db.query(Programas).filter_by(NOMBRE_PROGRAMA=programa_nombre).first()
-            if not programa:
-                last_program = db.query(Programas).order_by(Programas.CODPROGRAMA.desc()).first()
-                new_num = 1 if not last_program else int(last_program.CODPROGRAMA[4:]) + 1
-                new_code = f"PROG{new_num:04d}"
-                programa = Programas(CODPROGRAMA=new_code, NOMBRE_PROGRAMA=programa_nombre)
-                db.add(programa)
-                db.flush()
-            
-            # Buscar o crear la ficha
-            ficha = db.query(Ficha).filter_by(CODFICHA=ficha_codigo).first()
-            if not ficha:
-                ficha = Ficha(CODFICHA=ficha_codigo, CODPROGRAMA=programa.CODPROGRAMA)
-                db.add(ficha)
-                db.flush()
-            elif ficha.CODPROGRAMA != programa.CODPROGRAMA:
-                existing_programa = db.query(Programas).filter_by(CODPROGRAMA=ficha.CODPROGRAMA).first()
-                programa_existente_nombre = existing_programa.NOMBRE_PROGRAMA if existing_programa else "programa desconocido"
-                return JSONResponse(
-                    status_code=400,
-                    content={"detail": f"Este número de ficha ({ficha_codigo}) pertenece a otro programa: {programa_existente_nombre}"}
-                )
+            error = _programa_y_ficha(db, ficha_codigo, programa_nombre)
+            if error:
+                return error
             
             existing.FICHA = ficha_codigo
             existing.PROGRAMA = None
         elif solicitante.programa:
             # Para otros roles, crear programa si no existe
-            programa_nombre = solicitante.programa.strip().rstrip('.,;:!?').strip().upper()
-            programa = db.query(Programas).filter_by(NOMBRE_PROGRAMA=programa_nombre).first()
-            if not programa:
-                last_program = db.query(Programas).order_by(Programas.CODPROGRAMA.desc()).first()
-                new_num = 1 if not last_program else int(last_program.CODPROGRAMA[4:]) + 1
-                new_code = f"PROG{new_num:04d}"
-                programa = Programas(CODPROGRAMA=new_code, NOMBRE_PROGRAMA=programa_nombre)
-                db.add(programa)
-                db.flush()
-            
-            existing.PROGRAMA = programa.CODPROGRAMA
+            programa_nombre = normalizar_texto(solicitante.programa)
+            existing.PROGRAMA = catalogo.obtener_o_crear_programa(db, programa_nombre)
             existing.FICHA = None
 
+        busqueda.indexar_al_confirmar(db, [{
+            campo: getattr(existing, campo) for campo in busqueda.CAMPOS_INDEXADOS
+        }])
         db.commit()
         
         return JSONResponse(
@@ -470,8 +454,36 @@ async def actualizar_solicitante(
     finally:
         db.close()
 
+@router.post("/upsert-lote")
+def upsert_solicitantes(
+    request: UpsertSolicitantesLote,
+    token: str = Depends(verify_jwt_token)
+):
+    """
+    Sincronizar solicitantes por lotes: inserta los nuevos y en los existentes
+    escribe solo las columnas que cambiaron
+    """
+    db = SessionLocal()
+    try:
+        resultado = upsert_solicitantes_lote(db, [s.model_dump() for s in request.solicitantes])
+        db.commit()
+
+        return JSONResponse(
+            status_code=200,
+            content={
+                "detail": f"Se insertaron {resultado['insertados']} y se actualizaron {resultado['actualizados']} solicitantes",
+                "total_procesados": len(request.solicitantes),
+                **resultado
+            }
+        )
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error al sincronizar solicitantes: {str(e)}")
+    finally:
+        db.close()
+
 @router.delete("/eliminar")
-async def eliminar_solicitante(
+def eliminar_solicitante(
     request: EliminarSolicitante,
     token: str = Depends(verify_jwt_token)
 ):
@@ -487,6 +499,7 @@ async def eliminar_solicitante(
 
         # Eliminar el solicitante
         db.delete(solicitante)
+        busqueda.eliminar_al_confirmar(db, [solicitante.IDENTIFICACION])
         db.commit()
         
         return JSONResponse(
@@ -500,34 +513,20 @@ async def eliminar_solicitante(
         db.close()
 
 @router.delete("/eliminar-multiples")
-async def eliminar_multiples_solicitantes(
+def eliminar_multiples_solicitantes(
     request: EliminarMultiplesSolicitantes,
     token: str = Depends(verify_jwt_token)
 ):
     db = SessionLocal()
     try:
-        eliminados = 0
-        errores = []
-        
-        for identificacion in request.identificaciones:
-            try:
-                solicitante = db.query(Solicitante).filter_by(IDENTIFICACION=identificacion).first()
-                if solicitante:
-                    db.delete(solicitante)
-                    eliminados += 1
-                else:
-                    errores.append(f"No se encontró solicitante con identificación {identificacion}")
-            except Exception as e:
-                errores.append(f"Error al eliminar {identificacion}: {str(e)}")
-        
+        resultado = eliminar_solicitantes_lote(db, request.identificaciones)
         db.commit()
         
         return JSONResponse(
             status_code=200,
             content={
-                "detail": f"Se eliminaron {eliminados} solicitantes exitosamente",
-                "eliminados": eliminados,
-                "errores": errores
+                "detail": f"Se eliminaron {resultado['eliminados']} solicitantes exitosamente",
+                **resultado
             }
         )
     except Exception as e:
@@ -536,42 +535,6 @@ async def eliminar_multiples_solicitantes(
     finally:
         db.close()
 
-def validate_phone(phone):
-    """
-    Valida el número de teléfono:
-    - Debe empezar con 3
-    - Debe tener 10 dígitos
-    - Maneja números en notación científica
-    - Elimina el código de país (57) si está presente
-    - Maneja números con prefijo internacional (+57)
-    Retorna None si no cumple con los criterios
-    """
-    try:
-        # Convertir a string y limpiar
-        phone = str(phone).strip().replace('.', '').replace(' ', '')
-        
-        # Manejar notación científica
-        if 'E' in phone.upper():
-            phone = str(int(float(phone)))
-        
-        # Remover prefijo internacional
-        if phone.startswith('+57'):
-            phone = phone[3:]
-        elif phone.startswith('57'):
-            phone = phone[2:]
-            
-        # Si el número tiene más de 10 dígitos, tomar los últimos 10
-        if len(phone) > 10:
-            phone = phone[-10:]
-            
-        # Validar formato final
-        if len(phone) == 10 and phone.startswith('3') and phone.isdigit():
-            return phone
-            
-        return None
-    except:
-        return None
-
 def get_db():
     db = SessionLocal()
     try:
@@ -0,0 +1,173 @@
+from sqlalchemy import delete, exists, select
+from sqlalchemy.orm import Session
+from app.core.database.solicitante import Solicitante
+from app.core.database.upsert import sentencia_upsert
+from app.core.database.solicitud import Solicitud
+from app.core.database.sancion import Sancion
+from app.core.database.prestamos_activos import PrestamosActivos
+from app.api.solicitantes import busqueda, catalogo
+from app.api.solicitantes.normalizacion import normalizar_opcional, normalizar_telefono, normalizar_texto
+
+# Identificaciones por sentencia en las operaciones por lotes
+TAMANO_BLOQUE = 1000
+
+# Columnas que la sincronización por lotes compara y actualiza
+COLUMNAS_SINCRONIZADAS = [
+    'PRIMER_NOMBRE', 'SEGUNDO_NOMBRE', 'PRIMER_APELLIDO', 'SEGUNDO_APELLIDO',
+    'CORREO', 'TELEFONO', 'ROL', 'FICHA', 'PROGRAMA'
+]
+
+def _en_bloques(valores: list):
+    for inicio in range(0, len(valores), TAMANO_BLOQUE):
+        yield valores[inicio:inicio + TAMANO_BLOQUE]
+
+def eliminar_solicitantes_lote(db: Session, identificaciones: list) -> dict:
+    """
+    Elimina varios solicitantes con un DELETE ... IN por bloque, sin confirmar la transacción.
+
+    Antes de borrar cada bloque se consulta en una sola sentencia qué identificaciones
+    existen y cuáles tienen solicitudes o sanciones; esas no se eliminan y se reportan
+    en `errores` y `no_eliminados`, en el orden en que llegaron.
+    """
+    identificaciones = list(dict.fromkeys(identificaciones))
+    tiene_solicitudes = exists().where(Solicitud.IDENTIFICACION == Solicitante.IDENTIFICACION)
+    tiene_sanciones = exists().where(Sancion.IDENTIFICACION == Solicitante.IDENTIFICACION)
+
+    eliminadas = []
+    errores = []
+    no_eliminados = []
+    for bloque in _en_bloques(identificaciones):
+        dependencias = {
+            identificacion: (con_solicitudes, con_sanciones)
+            for identificacion, con_solicitudes, con_sanciones in db.execute(
+                select(Solicitante.IDENTIFICACION, tiene_solicitudes, tiene_sanciones)
+                .where(Solicitante.IDENTIFICACION.in_(bloque))
+            ).all()
+        }
+
+        eliminables = []
+        for identificacion in bloque:
+            if identificacion not in dependencias:
+                errores.append(f"No se encontró solicitante con identificación {identificacion}")
+                no_eliminados.append(identificacion)
+                continue
+            con_solicitudes, con_sanciones = dependencias[identificacion]
+            if con_solicitudes or con_sanciones:
+                registros = " y ".join(
+                    nombre for nombre, tiene in (("solicitudes", con_solicitudes), ("sanciones", con_sanciones)) if tiene
+                )
+                errores.append(f"No se puede eliminar {identificacion}: tiene {registros} registradas")
+                no_eliminados.append(identificacion)
+                continue
+            eliminables.append(identificacion)
+
+        if eliminables:
+            # Sin solicitudes el contador de préstamos activos es 0: se borra con el solicitante
+            db.execute(delete(PrestamosActivos).where(PrestamosActivos.IDENTIFICACION.in_(eliminables)))
+            db.execute(delete(Solicitante).where(Solicitante.IDENTIFICACION.in_(eliminables)))
+            eliminadas.extend(eliminables)
+
+    busqueda.eliminar_al_confirmar(db, eliminadas)
+    return {
+        "eliminados": len(eliminadas),
+        "errores": errores,
+        "no_eliminados": no_eliminados
+    }
+
+def upsert_solicitantes_lote(db: Session, registros: list) -> dict:
+    """
+    Inserta o actualiza varios solicitantes (dicts con los campos de UpdateSolicitante)
+    sin confirmar la transacción.
+
+    Cada registro se valida y normaliza como en /actualizar. Las filas actuales se
+    leen con una consulta IN por bloque y solo se escriben los registros nuevos o con
+    cambios: un upsert por lotes por cada combinación de columnas cambiadas, que
+    actualiza únicamente esas columnas. Los registros inválidos se reportan en
+    `errores` sin afectar al resto.
+    """
+    errores = []
+    filas = {}
+    asignaciones = {}
+    for registro in registros:
+        identificacion = normalizar_texto(registro['identificacion'])
+        try:
+            if identificacion in filas:
+                raise ValueError("La identificación está repetida en el lote")
+
+            telefono = normalizar_telefono(registro['telefono'])
+            if telefono is None:
+                raise ValueError("Número de teléfono inválido")
+
+            rol = registro['rol'].value if hasattr(registro['rol'], 'value') else registro['rol']
+            fila = {
+                'IDENTIFICACION': identificacion,
+                'PRIMER_NOMBRE': normalizar_texto(registro['primer_nombre']),
+                'SEGUNDO_NOMBRE': normalizar_opcional(registro.get('segundo_nombre')),
+                'PRIMER_APELLIDO': normalizar_texto(registro['primer_apellido']),
+                'SEGUNDO_APELLIDO': normalizar_opcional(registro.get('segundo_apellido')),
+                'CORREO': normalizar_opcional(registro.get('correo')),
+                'TELEFONO': telefono,
+                'ROL': rol
+            }
+
+            # Ficha y programa según el rol, como en /actualizar; para otros roles sin
+            # programa se conservan los valores actuales
+            if rol == 'aprendiz':
+                if not registro.get('ficha') or not registro.get('programa'):
+                    raise ValueError("Los campos 'ficha' y 'programa' son requeridos para aprendices")
+                ficha = normalizar_texto(registro['ficha'])
+                programa = normalizar_texto(registro['programa'])
+                if (ficha, programa) not in asignaciones:
+                    try:
+                        asignaciones[(ficha, programa)] = catalogo.asignar_ficha(db, ficha, programa)
+                    except ValueError as e:
+                        asignaciones[(ficha, programa)] = e
+                if isinstance(asignaciones[(ficha, programa)], ValueError):
+                    raise asignaciones[(ficha, programa)]
+                fila['FICHA'] = ficha
+                fila['PROGRAMA'] = None
+            elif registro.get('programa'):
+                fila['PROGRAMA'] = catalogo.obtener_o_crear_programa(db, normalizar_texto(registro['programa']))
+                fila['FICHA'] = None
+        except ValueError as e:
+            errores.append(f"{identificacion}: {str(e)}")
+            continue
+        filas[identificacion] = fila
+
+    actuales = {}
+    for bloque in _en_bloques(list(filas)):
+        for actual in db.execute(
+            select(Solicitante.IDENTIFICACION, Solicitante.ESTADO, *[getattr(Solicitante, c) for c in COLUMNAS_SINCRONIZADAS])
+            .where(Solicitante.IDENTIFICACION.in_(bloque))
+        ).mappings():
+            actuales[actual['IDENTIFICACION']] = dict(actual)
+
+    # Agrupar por columnas a escribir: cada grupo es un solo upsert por lotes
+    grupos = {}
+    insertados = actualizados = sin_cambios = 0
+    for identificacion, fila in filas.items():
+        actual = actuales.get(identificacion)
+        if actual is None:
+            columnas = tuple(COLUMNAS_SINCRONIZADAS)
+            completa = {'FICHA': None, 'PROGRAMA': None, **fila, 'ESTADO': 'apto'}
+            insertados += 1
+        else:
+            columnas = tuple(c for c in COLUMNAS_SINCRONIZADAS if c in fila and fila[c] != actual[c])
+            if not columnas:
+                sin_cambios += 1
+                continue
+            completa = {**actual, **fila}
+            actualizados += 1
+        grupos.setdefault(columnas, []).append(completa)
+
+    for columnas, grupo in grupos.items():
+        for bloque in _en_bloques(grupo):
+            db.execute(sentencia_upsert(db, Solicitante, list(columnas)), bloque)
+
+    busqueda.indexar_al_confirmar(db, [fila for grupo in grupos.values() for fila in grupo])
+    return {
+        "insertados": insertados,
+        "actualizados": actualizados,
+        "sin_cambios": sin_cambios,
+        "errores": errores
+    }
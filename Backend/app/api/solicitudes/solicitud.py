@@ -4,6 +4,8 @@ from sqlalchemy.orm import Session
 from app.core.database.db import SessionLocal
 from app.core.database.solicitud import Solicitud
 from app.core.database.producto_solicitud import ProductoSolicitud
+from app.api.prestamos.estado_productos import marcar_productos_disponibles
+from app.api.prestamos.contador_prestamos import registrar_cambio_estado
 from datetime import datetime
 from pydantic import BaseModel
 from typing import List, Optional
@@ -30,7 +32,7 @@ class SolicitudUpdate(BaseModel):
     ESTADO: str
 
 @router.post("/crear")
-async def crear_solicitud(solicitud: SolicitudCreate, db: Session = Depends(get_db)):
+def crear_solicitud(solicitud: SolicitudCreate, db: Session = Depends(get_db)):
     try:
         nueva_solicitud = Solicitud(
             IDENTIFICACION=solicitud.IDENTIFICACION,
@@ -48,7 +50,7 @@ async def crear_solicitud(solicitud: SolicitudCreate, db: Session = Depends(get_
         return JSONResponse(status_code=500, content={"detail": f"Error al crear solicitud: {str(e)}"})
 
 @router.post("/agregar-producto")
-async def agregar_producto_solicitud(producto_solicitud: ProductoSolicitudCreate, db: Session = Depends(get_db)):
+def agregar_producto_solicitud(producto_solicitud: ProductoSolicitudCreate, db: Session = Depends(get_db)):
     try:
         nuevo_producto_solicitud = ProductoSolicitud(
             PRODUCTO_ID=producto_solicitud.PRODUCTO_ID,
@@ -65,7 +67,7 @@ async def agregar_producto_solicitud(producto_solicitud: ProductoSolicitudCreate
         return JSONResponse(status_code=500, content={"detail": f"Error al agregar producto a solicitud: {str(e)}"})
 
 @router.get("/obtener")
-async def obtener_solicitudes(db: Session = Depends(get_db)):
+def obtener_solicitudes(db: Session = Depends(get_db)):
     try:
         solicitudes = db.query(Solicitud).all()
         # Si no hay solicitudes, devolver lista vacía en lugar de 404
@@ -89,7 +91,7 @@ async def obtener_solicitudes(db: Session = Depends(get_db)):
         return JSONResponse(status_code=500, content={"detail": f"Error al obtener solicitudes: {str(e)}"})
 
 @router.get("/buscar/{solicitud_id}")
-async def buscar_solicitud(solicitud_id: int, db: Session = Depends(get_db)):
+def buscar_solicitud(solicitud_id: int, db: Session = Depends(get_db)):
     solicitud = db.query(Solicitud).filter(Solicitud.IDSOLICITUD == solicitud_id).first()
     if not solicitud:
         return JSONResponse(status_code=404, content={"detail": "Solicitud no encontrada"})
@@ -102,12 +104,15 @@ async def buscar_solicitud(solicitud_id: int, db: Session = Depends(get_db)):
     }
 
 @router.put("/actualizar-estado/{solicitud_id}")
-async def actualizar_estado_solicitud(solicitud_id: int, solicitud: SolicitudUpdate, db: Session = Depends(get_db)):
+def actualizar_estado_solicitud(solicitud_id: int, solicitud: SolicitudUpdate, db: Session = Depends(get_db)):
     existing_solicitud = db.query(Solicitud).filter(Solicitud.IDSOLICITUD == solicitud_id).first()
     if not existing_solicitud:
         return JSONResponse(status_code=404, content={"detail": "Solicitud no encontrada"})
 
     try:
+        if solicitud.ESTADO == 'finalizado' and existing_solicitud.ESTADO != 'finalizado':
+            marcar_productos_disponibles(db, [solicitud_id])
+        registrar_cambio_estado(db, existing_solicitud, existing_solicitud.ESTADO, solicitud.ESTADO)
         existing_solicitud.ESTADO = solicitud.ESTADO
         db.commit()
         db.refresh(existing_solicitud)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Date, Enum, ForeignKey
+from sqlalchemy import Column, Integer, Date, Enum, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from .db import Base
 
@@ -8,9 +8,16 @@ class ConteoDiario(Base):
     idConteo = Column(Integer, primary_key=True, autoincrement=True)
     fecha = Column(Date, nullable=False)
     jornada = Column(Enum('mañana', 'tarde', name='jornada_enum'), nullable=False)
-    idProducto = Column(Integer, ForeignKey("GS_PRODUCTO.IDPRODUCTO"), nullable=False)
+    # Al eliminar el producto la fotografía se conserva sin él; el tipo se guarda en la fila
+    idProducto = Column(Integer, ForeignKey("GS_PRODUCTO.IDPRODUCTO", ondelete="SET NULL"), nullable=True)
+    idTipoProducto = Column(Integer)
     cantidadDisponible = Column(Integer, nullable=False)
 
+    __table_args__ = (
+        # Una fotografía por producto y jornada; también sirve a las consultas por rango de fechas
+        Index("idx_conteo_fecha_jornada_producto", "fecha", "jornada", "idProducto", unique=True),
+    )
+
     # Relationship
     producto = relationship("Producto")
 
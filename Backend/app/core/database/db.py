@@ -1,9 +1,10 @@
 from sqlalchemy import create_engine, event, text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 import mysql.connector
 from mysql.connector import Error
 import os
+import threading
 
 # Configuración de la base de datos MySQL
 MYSQL_USER = "root"
@@ -38,36 +39,78 @@ def ensure_database_exists():
         print(f"Error al verificar/crear la base de datos: {e}")
         return False
 
-# Asegurar que la base de datos existe antes de crear la URL de conexión
-ensure_database_exists()
-
 # URL de conexión a MySQL
 DATABASE_URL = f"mysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}"
 
-print(f"Conectando a MySQL: {MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}")
-
-# Configurar el engine para MySQL
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=3600,
-    pool_size=20,
-    max_overflow=10,
-    echo=False,
-    connect_args={
-        "charset": "utf8mb4",
-        "autocommit": False
-    }
-)
+# El engine se crea en el primer uso: importar este módulo no abre conexiones, así
+# los procesos del pool de validación (que vuelven a importar la aplicación) no
+# dependen de que MySQL esté disponible
+_engine = None
+_lock_engine = threading.Lock()
+
+def obtener_engine():
+    """Engine de MySQL del proceso; la primera llamada verifica la base de datos y lo crea"""
+    global _engine
+    if _engine is None:
+        with _lock_engine:
+            if _engine is None:
+                # Asegurar que la base de datos existe antes de conectarse a ella
+                ensure_database_exists()
+
+                print(f"Conectando a MySQL: {MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}")
+
+                # Configurar el engine para MySQL
+                engine = create_engine(
+                    DATABASE_URL,
+                    pool_pre_ping=True,
+                    pool_recycle=3600,
+                    pool_size=20,
+                    max_overflow=10,
+                    echo=False,
+                    connect_args={
+                        "charset": "utf8mb4",
+                        "autocommit": False
+                    }
+                )
+                event.listen(engine, "connect", set_mysql_settings)
+                _engine = engine
+    return _engine
+
+class _Sesion(Session):
+    """Sesión que toma el engine del proceso al ejecutar su primera consulta"""
+    def get_bind(self, *args, **kwargs):
+        if self.bind is None:
+            self.bind = obtener_engine()
+        return super().get_bind(*args, **kwargs)
 
 # Configurar la sesión
 SessionLocal = sessionmaker(
-    bind=engine,
+    class_=_Sesion,
     autocommit=False,
     autoflush=False,
     expire_on_commit=False
 )
 
+def al_confirmar(session, funcion):
+    """
+    Ejecuta `funcion()` cuando la transacción actual de `session` se confirme.
+    Si la transacción se revierte, se descarta sin ejecutarse.
+    """
+    session.info.setdefault("al_confirmar", []).append(funcion)
+
+@event.listens_for(SessionLocal, "after_commit")
+def _ejecutar_al_confirmar(session):
+    for funcion in session.info.pop("al_confirmar", []):
+        try:
+            funcion()
+        except Exception as e:
+            # Los datos ya están confirmados: un fallo aquí no debe afectar la respuesta
+            print(f"Error al ejecutar tarea posterior a la confirmación: {e}")
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _descartar_al_confirmar(session):
+    session.info.pop("al_confirmar", None)
+
 def get_session():
     """Obtener una nueva sesión de base de datos"""
     session = SessionLocal()
@@ -82,7 +125,6 @@ def get_session():
 # Crear la clase base para los modelos
 Base = declarative_base()
 
-@event.listens_for(engine, "connect")
 def set_mysql_settings(dbapi_connection, connection_record):
     """Configurar ajustes específicos de MySQL"""
     with dbapi_connection.cursor() as cursor:
@@ -93,7 +135,11 @@ def set_mysql_settings(dbapi_connection, connection_record):
 def init_db():
     try:
         # Crear todas las tablas si no existen
-        Base.metadata.create_all(bind=engine)
+        Base.metadata.create_all(bind=obtener_engine())
+        # create_all no agrega índices nuevos a tablas que ya existen
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=obtener_engine(), checkfirst=True)
         print("Base de datos inicializada correctamente")
         return True
     except Exception as e:
@@ -103,11 +149,11 @@ def init_db():
 def reset_db():
     try:
         # Eliminar todas las tablas
-        Base.metadata.drop_all(bind=engine)
+        Base.metadata.drop_all(bind=obtener_engine())
         print("Tablas eliminadas correctamente")
         
         # Crear nuevamente las tablas
-        Base.metadata.create_all(bind=engine)
+        Base.metadata.create_all(bind=obtener_engine())
         print("Tablas recreadas correctamente")
         return True
     except Exception as e:
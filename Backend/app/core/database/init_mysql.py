@@ -1,11 +1,11 @@
 from sqlalchemy import text
-from .db import engine
+from .db import obtener_engine
 
 def init_mysql_db():
     """Initialize MySQL database with all tables, triggers, views and indexes"""
     
     try:
-        with engine.connect() as connection:
+        with obtener_engine().connect() as connection:
             # Create tables
             connection.execute(text("""
                 -- 1. Tabla de tipos de productos
@@ -123,6 +123,13 @@ def init_mysql_db():
                     CONSTRAINT FK_SANCION_SOLICITANTE FOREIGN KEY (IDENTIFICACION) REFERENCES GS_SOLICITANTE(IDENTIFICACION),
                     CONSTRAINT FK_SANCION_PRESTAMO FOREIGN KEY (IDPRESTAMO) REFERENCES HS_PRESTAMO(IDPRESTAMO)
                 );
+
+                -- 12. Contador de préstamos activos por solicitante
+                CREATE TABLE IF NOT EXISTS GS_PRESTAMOS_ACTIVOS (
+                    IDENTIFICACION VARCHAR(30) PRIMARY KEY,
+                    CANTIDAD INT NOT NULL DEFAULT 0,
+                    CONSTRAINT FK_PRESTAMOS_ACTIVOS_SOLICITANTE FOREIGN KEY (IDENTIFICACION) REFERENCES GS_SOLICITANTE(IDENTIFICACION)
+                );
             """))
 
             # Create triggers - Drop and recreate to ensure they are updated
@@ -259,7 +266,14 @@ def init_mysql_db():
                 "CREATE INDEX IF NOT EXISTS idx_sancion_estado ON GS_SANCION(ESTADO)",
                 "CREATE INDEX IF NOT EXISTS idx_sancion_fecha_inicio ON GS_SANCION(FECHA_INICIO)",
                 "CREATE INDEX IF NOT EXISTS idx_sancion_fecha_fin ON GS_SANCION(FECHA_FIN)",
-                "CREATE INDEX IF NOT EXISTS idx_sancion_prestamo ON GS_SANCION(IDPRESTAMO)"
+                "CREATE INDEX IF NOT EXISTS idx_sancion_prestamo ON GS_SANCION(IDPRESTAMO)",
+                "CREATE INDEX IF NOT EXISTS idx_prestamo_solicitud_limite ON HS_PRESTAMO(IDSOLICITUD, FECHA_LIMITE)",
+                "CREATE INDEX IF NOT EXISTS idx_prestamo_registro_id ON HS_PRESTAMO(FECHA_REGISTRO, IDPRESTAMO)",
+                "CREATE INDEX IF NOT EXISTS idx_prestamo_limite_id ON HS_PRESTAMO(FECHA_LIMITE, IDPRESTAMO)",
+                "CREATE INDEX IF NOT EXISTS idx_solicitud_identificacion_estado ON GS_SOLICITUD(IDENTIFICACION, ESTADO)",
+                "CREATE INDEX IF NOT EXISTS idx_solicitud_estado_id ON GS_SOLICITUD(ESTADO, IDSOLICITUD)",
+                "CREATE INDEX IF NOT EXISTS idx_producto_tipo_estado ON GS_PRODUCTO(IDTIPOPRODUCTO, ESTADO)",
+                "CREATE UNIQUE INDEX IF NOT EXISTS idx_conteo_fecha_jornada_producto ON GS_CONTEO_DIARIO(fecha, jornada, idProducto)"
             ]
             
             for index_sql in indexes:
@@ -269,6 +283,23 @@ def init_mysql_db():
                     if "Duplicate key name" not in str(idx_error):
                         print(f"⚠️ Advertencia creando índice: {idx_error}")
 
+            # GS_CONTEO_DIARIO: las fotografías guardan el tipo y sobreviven al producto
+            migraciones = [
+                "ALTER TABLE GS_CONTEO_DIARIO ADD COLUMN idTipoProducto INT NULL",
+                "UPDATE GS_CONTEO_DIARIO c JOIN GS_PRODUCTO p ON p.IDPRODUCTO = c.idProducto SET c.idTipoProducto = p.IDTIPOPRODUCTO WHERE c.idTipoProducto IS NULL",
+                "ALTER TABLE GS_CONTEO_DIARIO MODIFY idProducto INT NULL",
+                "ALTER TABLE GS_CONTEO_DIARIO DROP FOREIGN KEY GS_CONTEO_DIARIO_ibfk_1",
+                "ALTER TABLE GS_CONTEO_DIARIO ADD CONSTRAINT fk_conteo_producto FOREIGN KEY (idProducto) REFERENCES GS_PRODUCTO(IDPRODUCTO) ON DELETE SET NULL"
+            ]
+
+            for migracion_sql in migraciones:
+                try:
+                    connection.execute(text(migracion_sql))
+                except Exception as migracion_error:
+                    # Ya aplicada (columna o restricción existente / eliminada)
+                    if not any(m in str(migracion_error) for m in ("Duplicate", "check that column/key exists", "Can't DROP")):
+                        print(f"⚠️ Advertencia migrando GS_CONTEO_DIARIO: {migracion_error}")
+
             connection.commit()
             print("✅ Base de datos MySQL inicializada correctamente")
             return True
@@ -280,7 +311,7 @@ def init_mysql_db():
 def create_default_data():
     """Create default data for the application"""
     try:
-        with engine.connect() as connection:
+        with obtener_engine().connect() as connection:
             default_types = [
                 "Equipo de cómputo",
                 "Cargador", 
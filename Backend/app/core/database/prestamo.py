@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Date, ForeignKey
+from sqlalchemy import Column, Integer, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from .db import Base
 
@@ -11,6 +11,14 @@ class Prestamo(Base):
     FECHA_LIMITE = Column(Date)
     FECHA_PROLONGACION = Column(Date)
 
+    # Índices para el listado paginado por IDPRESTAMO con filtros de fecha y para
+    # encontrar los préstamos vencidos partiendo de las solicitudes activas
+    __table_args__ = (
+        Index("idx_prestamo_solicitud_limite", "IDSOLICITUD", "FECHA_LIMITE"),
+        Index("idx_prestamo_registro_id", "FECHA_REGISTRO", "IDPRESTAMO"),
+        Index("idx_prestamo_limite_id", "FECHA_LIMITE", "IDPRESTAMO"),
+    )
+
     # Relationship
     solicitud = relationship("Solicitud", back_populates="prestamos")
 
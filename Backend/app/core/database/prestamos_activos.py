@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, ForeignKey
+from .db import Base
+
+class PrestamosActivos(Base):
+    """
+    Contador de préstamos activos por solicitante, mantenido en las mismas
+    transacciones que crean, devuelven o cambian de estado un préstamo
+    """
+    __tablename__ = "GS_PRESTAMOS_ACTIVOS"
+    
+    IDENTIFICACION = Column(String(30), ForeignKey("GS_SOLICITANTE.IDENTIFICACION"), primary_key=True)
+    CANTIDAD = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<PrestamosActivos(identificacion='{self.IDENTIFICACION}', cantidad={self.CANTIDAD})>"
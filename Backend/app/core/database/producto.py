@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from .db import Base
 
@@ -15,6 +15,10 @@ class Producto(Base):
     ESTADO = Column(String(20), nullable=False)
     OBSERVACIONES = Column(Text)
 
+    __table_args__ = (
+        Index("idx_producto_tipo_estado", "IDTIPOPRODUCTO", "ESTADO"),
+    )
+
     # Relationships
     tipo_producto = relationship("TipoProducto", back_populates="productos")
     productos_solicitud = relationship("ProductoSolicitud", back_populates="producto")
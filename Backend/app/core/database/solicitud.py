@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from app.core.database.db import Base
 
@@ -10,6 +10,12 @@ class Solicitud(Base):
     FECHA_REGISTRO = Column(DateTime, nullable=False)
     ESTADO = Column(Enum('pendiente', 'aprobado', 'rechazado', 'finalizado'), default='pendiente')
 
+    # Índices para filtrar préstamos por solicitante y estado
+    __table_args__ = (
+        Index("idx_solicitud_identificacion_estado", "IDENTIFICACION", "ESTADO"),
+        Index("idx_solicitud_estado_id", "ESTADO", "IDSOLICITUD"),
+    )
+
     # Relaciones
     solicitante = relationship("Solicitante", backref="solicitudes")
     prestamos = relationship("Prestamo", back_populates="solicitud")
@@ -0,0 +1,41 @@
+from sqlalchemy.orm import Session
+
+def sentencia_upsert(db: Session, modelo, columnas_actualizar: list, columnas_sumar: list = ()):
+    """
+    INSERT que, si la llave primaria ya existe, actualiza solo `columnas_actualizar`
+    con los valores de la fila enviada y suma a `columnas_sumar` el valor enviado
+    (o no hace nada si ambas listas están vacías).
+
+    MySQL usa INSERT ... ON DUPLICATE KEY UPDATE; SQLite y PostgreSQL usan
+    INSERT ... ON CONFLICT (llave primaria) DO UPDATE. Se ejecuta con
+    db.execute(sentencia, filas) para enviar todas las filas en un solo lote.
+    Con otro dialecto lanza ValueError.
+    """
+    dialecto = db.get_bind().dialect.name
+    tabla = modelo.__table__
+
+    if dialecto == 'mysql':
+        from sqlalchemy.dialects.mysql import insert as insert_mysql
+        sentencia = insert_mysql(tabla)
+        if not columnas_actualizar and not columnas_sumar:
+            return sentencia.prefix_with('IGNORE')
+        valores = {columna: sentencia.inserted[columna] for columna in columnas_actualizar}
+        valores.update({columna: tabla.c[columna] + sentencia.inserted[columna] for columna in columnas_sumar})
+        return sentencia.on_duplicate_key_update(valores)
+
+    if dialecto in ('sqlite', 'postgresql'):
+        if dialecto == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as insert_dialecto
+        else:
+            from sqlalchemy.dialects.postgresql import insert as insert_dialecto
+        sentencia = insert_dialecto(tabla)
+        llave = [columna.name for columna in tabla.primary_key.columns]
+        if not columnas_actualizar and not columnas_sumar:
+            return sentencia.on_conflict_do_nothing(index_elements=llave)
+        valores = {columna: sentencia.excluded[columna] for columna in columnas_actualizar}
+        valores.update({columna: tabla.c[columna] + sentencia.excluded[columna] for columna in columnas_sumar})
+        return sentencia.on_conflict_do_update(index_elements=llave, set_=valores)
+
+    raise ValueError(
+        f"sentencia_upsert no soporta el dialecto '{dialecto}' (soportados: mysql, sqlite y postgresql)"
+    )
@@ -0,0 +1,89 @@
+import shutil
+import tempfile
+from contextlib import contextmanager
+import pandas as pd
+from openpyxl import load_workbook
+
+# Filas por bloque al leer un Excel en modo streaming
+TAMANO_BLOQUE = 1000
+
+def _texto_celda(valor):
+    """
+    Convierte una celda al texto que produciría pd.read_excel(..., dtype=str)
+    """
+    if valor is None:
+        return None
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+def _bloques(filas, columnas: list, tamano_bloque: int):
+    bloque = []
+    vacias = []
+    fila_inicial = 2  # La fila 1 es el encabezado
+    for fila in filas:
+        valores = [_texto_celda(valor) for valor in fila[:len(columnas)]]
+        valores += [None] * (len(columnas) - len(valores))
+
+        # Las filas vacías solo se conservan si hay datos después (como pd.read_excel)
+        if all(valor is None for valor in valores):
+            vacias.append(valores)
+            continue
+        bloque.extend(vacias)
+        vacias = []
+        bloque.append(valores)
+
+        if len(bloque) >= tamano_bloque:
+            yield fila_inicial, pd.DataFrame(bloque, columns=columnas, dtype=object)
+            fila_inicial += len(bloque)
+            bloque = []
+
+    if bloque:
+        yield fila_inicial, pd.DataFrame(bloque, columns=columnas, dtype=object)
+
+def guardar_temporal(archivo) -> str:
+    """
+    Copia una subida a un archivo temporal en disco y retorna su ruta.
+    Quien llama debe eliminar el archivo cuando ya no lo necesite.
+    """
+    archivo.seek(0)
+    with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as temporal:
+        shutil.copyfileobj(archivo, temporal)
+        return temporal.name
+
+@contextmanager
+def leer_excel_por_bloques(origen, tamano_bloque: int = TAMANO_BLOQUE):
+    """
+    Lee la primera hoja de un Excel sin cargarlo completo en memoria.
+
+    `origen` es la ruta de un archivo en disco o el archivo de una subida; en este
+    último caso se copia primero a un archivo temporal. El libro se abre con openpyxl
+    en modo read_only y se entrega (columnas, bloques), donde `bloques` genera tuplas
+    (fila_inicial, DataFrame) de a lo sumo `tamano_bloque` filas con las celdas como
+    texto. `fila_inicial` es el número de fila de Excel de la primera fila del bloque.
+    """
+    if isinstance(origen, str):
+        with _abrir_libro(origen, tamano_bloque) as lectura:
+            yield lectura
+        return
+
+    with tempfile.TemporaryFile(suffix='.xlsx') as temporal:
+        origen.seek(0)
+        shutil.copyfileobj(origen, temporal)
+        temporal.seek(0)
+        with _abrir_libro(temporal, tamano_bloque) as lectura:
+            yield lectura
+
+@contextmanager
+def _abrir_libro(archivo, tamano_bloque: int):
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        encabezado = next(filas, ())
+        columnas = [
+            str(valor) if valor is not None else f"Unnamed: {indice}"
+            for indice, valor in enumerate(encabezado)
+        ]
+        yield columnas, _bloques(filas, columnas, tamano_bloque)
+    finally:
+        libro.close()
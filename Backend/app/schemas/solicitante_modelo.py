@@ -46,3 +46,6 @@ class UpdateSolicitante(BaseModel):
 
 class EliminarMultiplesSolicitantes(BaseModel):
     identificaciones: List[str]
+
+class UpsertSolicitantesLote(BaseModel):
+    solicitantes: List[UpdateSolicitante]
@@ -1,4 +1,5 @@
 # main.py
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import sys
@@ -18,6 +19,7 @@ from app.api.productos.producto_router import router as producto_router
 from app.api.productos.tipo_producto_router import router as tipo_producto_router
 from app.api.solicitudes.solicitud import router as solicitud_router
 from app.api.sanciones.sancion_router import router as sancion_router
+from app.api.importaciones.importacion_router import router as importacion_router
 
 # Importar configuración de base de datos
 from app.core.database.db import init_db, get_db
@@ -35,21 +37,75 @@ from app.core.database.producto_solicitud import ProductoSolicitud
 from app.core.database.sancion import Sancion
 from app.core.database.log_trazabilidad import LogTrazabilidad
 from app.core.database.conteo_diario import ConteoDiario
+from app.core.database.prestamos_activos import PrestamosActivos
 
-app = FastAPI(title=settings.PROJECT_NAME)
+from app.api.productos.tipo_producto import init_tipos_producto
+from app.api.prestamos.contador_prestamos import inicializar_prestamos_activos
+from app.api.solicitantes import busqueda
+from app.api.solicitantes.limpieza import cerrar_pool
+from app.api.productos import contadores as contadores_productos
+from app.api.productos.conteo_diario import iniciar_programador, detener_programador
 
-# Inicializar la base de datos
-init_db()
+def iniciar_aplicacion():
+    """
+    Inicialización al arrancar el servidor. No se hace al importar el módulo porque
+    los procesos del pool de validación (spawn) vuelven a importar main.py.
+    """
+    # Inicializar la base de datos
+    init_db()
 
-# Inicializar tipos de producto por defecto
-from app.api.productos.tipo_producto import init_tipos_producto
-db = next(get_db())
-try:
-    init_tipos_producto(db)
-except Exception as e:
-    print(f"Error al inicializar tipos de producto: {e}")
-finally:
-    db.close()
+    # Inicializar tipos de producto por defecto
+    db = next(get_db())
+    try:
+        init_tipos_producto(db)
+    except Exception as e:
+        print(f"Error al inicializar tipos de producto: {e}")
+    finally:
+        db.close()
+
+    # Llenar los contadores de préstamos activos si todavía no existen
+    db = next(get_db())
+    try:
+        inicializar_prestamos_activos(db)
+    except Exception as e:
+        db.rollback()
+        print(f"Error al inicializar préstamos activos: {e}")
+    finally:
+        db.close()
+
+    # Construir el índice de búsqueda de solicitantes
+    try:
+        busqueda.construir_indice()
+    except Exception as e:
+        print(f"Error al construir el índice de búsqueda de solicitantes: {e}")
+    busqueda.iniciar_refresco()
+
+    # Cargar los contadores de productos en memoria
+    try:
+        contadores_productos.recalcular()
+    except Exception as e:
+        print(f"Error al cargar los contadores de productos: {e}")
+    contadores_productos.iniciar_reconciliacion()
+
+    # Fotografías de disponibilidad de productos al inicio de cada jornada
+    iniciar_programador()
+
+def detener_aplicacion():
+    """
+    Liberación de recursos al apagar el servidor
+    """
+    busqueda.detener_refresco()
+    contadores_productos.detener_reconciliacion()
+    detener_programador()
+    cerrar_pool()
+
+@asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
+    iniciar_aplicacion()
+    yield
+    detener_aplicacion()
+
+app = FastAPI(title=settings.PROJECT_NAME, lifespan=ciclo_de_vida)
 
 # Configurar CORS
 app.add_middleware(
@@ -58,7 +114,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*", "Authorization", "Content-Type"],
-    expose_headers=["*", "Authorization"],
+    expose_headers=["*", "Authorization", "X-Siguiente-Cursor"],
 )
 
 # Rutas de la API
@@ -69,6 +125,7 @@ app.include_router(producto_router, prefix="/productos", tags=["Productos"])
 app.include_router(tipo_producto_router, prefix="/tipos-producto", tags=["Tipos de Producto"])
 app.include_router(solicitud_router, prefix="/solicitudes", tags=["Solicitudes"])
 app.include_router(sancion_router, prefix="/api", tags=["Sanciones"])
+app.include_router(importacion_router, prefix="/imports", tags=["Importaciones"])
 
 @app.get("/")
 async def root():
@@ -0,0 +1,62 @@
+"""
+Mide el tiempo de construcción del índice de búsqueda de solicitantes y la latencia
+de consultas típicas de autocompletado (prefijos de nombre, fragmentos de documento
+y nombre + apellido).
+
+Solo mide el índice en memoria (sin base de datos).
+Uso: python scripts/benchmark_busqueda.py [solicitantes]
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api.solicitantes.busqueda import IndiceSolicitantes
+
+NOMBRES = [
+    "JUAN", "CARLOS", "ANDRÉS", "MARÍA", "ANA", "LUISA", "JOSÉ", "DANIEL", "LAURA", "SOFÍA",
+    "CAMILO", "VALENTINA", "SANTIAGO", "PAULA", "DAVID", "NATALIA", "FELIPE", "CAMILA",
+    "SEBASTIÁN", "DIANA", "JORGE", "ANDREA", "MIGUEL", "CAROLINA", "ÁLVARO", "LUCÍA"
+]
+APELLIDOS = [
+    "GÓMEZ", "RODRÍGUEZ", "MARTÍNEZ", "GARCÍA", "LÓPEZ", "PÉREZ", "GONZÁLEZ", "SÁNCHEZ",
+    "RAMÍREZ", "TORRES", "DÍAZ", "VARGAS", "MORENO", "JIMÉNEZ", "ROJAS", "CASTRO", "ORTIZ",
+    "RUIZ", "SUÁREZ", "HERRERA", "MEDINA", "AGUILAR", "CASTILLO", "MUÑOZ", "OSORIO", "RÍOS"
+]
+
+CONSULTAS = ["a", "an", "ana", "mar", "maria gom", "gonz", "sebas ro", "1003", "10045", "ez", "rodri", "ruiz diana"]
+
+def generar(cantidad: int) -> list:
+    aleatorio = random.Random(42)
+    return [{
+        "IDENTIFICACION": str(1000000000 + i * 7),
+        "PRIMER_NOMBRE": aleatorio.choice(NOMBRES),
+        "SEGUNDO_NOMBRE": aleatorio.choice(NOMBRES) if aleatorio.random() < 0.6 else None,
+        "PRIMER_APELLIDO": aleatorio.choice(APELLIDOS),
+        "SEGUNDO_APELLIDO": aleatorio.choice(APELLIDOS)
+    } for i in range(cantidad)]
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    registros = generar(cantidad)
+
+    inicio = time.perf_counter()
+    indice = IndiceSolicitantes()
+    for registro in registros:
+        indice.agregar(registro)
+    print(f"Índice de {len(indice)} solicitantes construido en {time.perf_counter() - inicio:.2f} s")
+
+    print(f"{'consulta':>12} {'resultados':>11} {'mediana ms':>11} {'máx ms':>8}")
+    for consulta in CONSULTAS:
+        tiempos = []
+        for _ in range(20):
+            inicio = time.perf_counter()
+            resultados = indice.buscar(consulta, 20)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        print(f"{consulta:>12} {len(resultados):>11} {statistics.median(tiempos):>11.2f} {max(tiempos):>8.2f}")
+
+if __name__ == "__main__":
+    main()
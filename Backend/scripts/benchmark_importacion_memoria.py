@@ -0,0 +1,73 @@
+"""
+Compara el pico de memoria de la importación de solicitantes leyendo el Excel
+completo con pandas frente al modo streaming por bloques.
+
+Solo mide la lectura y la limpieza/validación por columnas (sin base de datos).
+Uso: python scripts/benchmark_importacion_memoria.py [filas ...]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from openpyxl import Workbook
+from app.core.excel import leer_excel_por_bloques
+from app.api.solicitantes.limpieza import COLUMNAS_REQUERIDAS, limpiar_filas
+
+def generar_excel(ruta: str, filas: int):
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet()
+    hoja.append(COLUMNAS_REQUERIDAS + ["Correo electrónico"])
+    for i in range(filas):
+        aprendiz = i % 3 != 0
+        hoja.append([
+            "JUAN CARLOS PEREZ GOMEZ",
+            10000000 + i,
+            3001234567 + i % 1000,
+            "aprendiz" if aprendiz else "instructor",
+            2500000 + i % 50 if aprendiz else None,
+            f"PROGRAMA {i % 50}" if aprendiz else None,
+            f"usuario{i}@correo.com"
+        ])
+    libro.save(ruta)
+
+def leer_completo(ruta: str):
+    with open(ruta, 'rb') as archivo:
+        df = pd.read_excel(archivo, dtype=str)
+    return len(limpiar_filas(df))
+
+def leer_streaming(ruta: str):
+    total = 0
+    with open(ruta, 'rb') as archivo:
+        with leer_excel_por_bloques(archivo) as (columnas, bloques):
+            for _, df in bloques:
+                total += len(limpiar_filas(df))
+    return total
+
+def medir(funcion, ruta: str):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    filas = funcion(ruta)
+    duracion = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return filas, pico / (1024 * 1024), duracion
+
+def main():
+    tamanos = [int(valor) for valor in sys.argv[1:]] or [5000, 20000, 50000]
+    print(f"{'filas':>8} {'modo':>10} {'pico MB':>10} {'segundos':>10}")
+    for filas in tamanos:
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, "solicitantes.xlsx")
+            generar_excel(ruta, filas)
+            for nombre, funcion in (("completo", leer_completo), ("streaming", leer_streaming)):
+                leidas, pico, duracion = medir(funcion, ruta)
+                assert leidas == filas, f"{nombre}: se leyeron {leidas} de {filas} filas"
+                print(f"{filas:>8} {nombre:>10} {pico:>10.1f} {duracion:>10.2f}")
+
+if __name__ == "__main__":
+    main()
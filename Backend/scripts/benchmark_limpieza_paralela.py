@@ -0,0 +1,54 @@
+"""
+Mide el rendimiento de la limpieza por columnas de la importación de solicitantes
+en un solo proceso y repartida en el pool de procesos con distinto número de procesos.
+
+No usa la base de datos. Uso: python scripts/benchmark_limpieza_paralela.py [filas]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from app.api.solicitantes import limpieza
+
+def generar_filas(filas: int) -> pd.DataFrame:
+    aprendiz = [i % 3 != 0 for i in range(filas)]
+    return pd.DataFrame({
+        "Nombre completo": [f"Juan Carlos Perez Gomez{'.' if i % 7 == 0 else ''}" for i in range(filas)],
+        "Número de documento": [str(10000000 + i) for i in range(filas)],
+        "Número de teléfono": [f"+57 300 {i % 1000:03d} {i % 10000:04d}" for i in range(filas)],
+        "Tipo de rol": ["Aprendiz" if a else "instructor" for a in aprendiz],
+        "Número de ficha": [str(2500000 + i % 50) if a else None for i, a in enumerate(aprendiz)],
+        "Programa de formación": [f"ADSO {i % 50}" if a else None for i, a in enumerate(aprendiz)],
+        "Correo electrónico": [f"usuario{i}@correo.com" for i in range(filas)],
+    }, dtype=object)
+
+def medir(funcion, df: pd.DataFrame):
+    inicio = time.perf_counter()
+    resultado = funcion(df)
+    return resultado, time.perf_counter() - inicio
+
+def main():
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    df = generar_filas(filas)
+    nucleos = os.cpu_count() or 1
+
+    referencia, duracion = medir(limpieza.limpiar_filas, df)
+    print(f"{filas} filas, {nucleos} núcleos")
+    print(f"{'procesos':>9} {'segundos':>10} {'filas/s':>12}")
+    print(f"{'serial':>9} {duracion:>10.2f} {filas / duracion:>12.0f}")
+
+    procesos = 2
+    while procesos <= max(nucleos, 2):
+        limpieza.MAX_PROCESOS_VALIDACION = procesos
+        limpieza.limpiar_filas_en_paralelo(df.iloc[:limpieza.FILAS_MINIMAS_POR_FRAGMENTO * procesos])  # arrancar los procesos
+        resultado, duracion = medir(limpieza.limpiar_filas_en_paralelo, df)
+        assert resultado.equals(referencia), "el resultado en paralelo no coincide con el serial"
+        print(f"{procesos:>9} {duracion:>10.2f} {filas / duracion:>12.0f}")
+        limpieza.cerrar_pool()
+        procesos *= 2
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Mide la normalización de columnas de solicitantes con las versiones sobre pd.Series
+de normalizacion.py (regla escalar celda por celda) frente a la misma regla escrita
+con métodos .str de pandas, y verifica que ambas den el mismo resultado.
+
+No usa la base de datos. Uso: python scripts/benchmark_normalizacion.py [filas]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from app.api.solicitantes import normalizacion
+
+NOMBRES = ["Juan", "Carlos", "Ana", "María", "Luis", "Sofía", "Andrés", "Laura", "José", "Camila"]
+APELLIDOS = ["Pérez", "Gómez", "López", "Díaz", "Rojas", "Torres", "Ruiz", "Castro", "Vargas", "Ortiz"]
+
+def generar(filas: int) -> pd.DataFrame:
+    """
+    Documentos, teléfonos y correos distintos en cada fila; nombres armados con
+    listas cortas (se repiten, como en una hoja real) y pocos programas
+    """
+    aleatorio = random.Random(42)
+    nombres = []
+    for i in range(filas):
+        partes = [aleatorio.choice(NOMBRES), aleatorio.choice(NOMBRES), aleatorio.choice(APELLIDOS), aleatorio.choice(APELLIDOS)]
+        nombres.append(" ".join(partes[i % 3:]) + ("." if i % 7 == 0 else "") if i % 50 else None)
+    return pd.DataFrame({
+        "documento": [f" {10000000 + i}." for i in range(filas)],
+        "telefono": [f"+57 300 {i % 1000:03d} {i // 1000 % 10000:04d}" if i % 20 else "3.001234567E9" for i in range(filas)],
+        "nombre": nombres,
+        "correo": [f" usuario{i}@correo.com;" if i % 4 else None for i in range(filas)],
+        "programa": [f"Análisis y desarrollo de software {i % 40}" if i % 3 else None for i in range(filas)],
+    }, dtype=object)
+
+def medir(funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return resultado, time.perf_counter() - inicio
+
+def comparar(nombre: str, por_celda, con_str, filas: int):
+    esperado, duracion_celda = medir(por_celda)
+    resultado, duracion_str = medir(con_str)
+    assert resultado.tolist() == esperado.tolist(), f"{nombre}: la versión .str no coincide"
+    print(f"{nombre:>10} {duracion_celda:>12.2f} {duracion_str:>8.2f} {filas / duracion_celda:>16.0f}")
+
+def limpiar_con_str(serie: pd.Series) -> pd.Series:
+    limpios = serie.fillna('').astype(str).str.strip().str.rstrip(normalizacion.PUNTUACION_FINAL).str.strip()
+    return limpios.astype(object)
+
+def normalizar_con_str(serie: pd.Series) -> pd.Series:
+    return limpiar_con_str(serie).str.upper().astype(object).where(serie.notna() & (serie != ''), None)
+
+def main():
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    df = generar(filas)
+
+    print(f"{filas} filas")
+    print(f"{'regla':>10} {'por celda s':>12} {'.str s':>8} {'filas/s celda':>16}")
+    comparar(
+        "documento",
+        lambda: normalizacion.limpiar_serie(df["documento"]),
+        lambda: limpiar_con_str(df["documento"]),
+        filas
+    )
+    comparar(
+        "correo",
+        lambda: normalizacion.normalizar_serie(df["correo"]),
+        lambda: normalizar_con_str(df["correo"]),
+        filas
+    )
+    comparar(
+        "programa",
+        lambda: normalizacion.normalizar_serie(df["programa"]),
+        lambda: normalizar_con_str(df["programa"]),
+        filas
+    )
+
+if __name__ == "__main__":
+    main()
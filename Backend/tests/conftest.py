@@ -0,0 +1,63 @@
+"""
+Fixtures compartidas: una base de datos SQLite en memoria con todas las tablas del
+modelo y un contador de las sentencias que se ejecutan sobre ella.
+"""
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database.db import Base
+# Registrar todos los modelos en Base.metadata
+from app.core.database import (  # noqa: F401
+    conteo_diario, ficha, log_trazabilidad, prestamo, prestamos_activos, producto,
+    producto_solicitud, programas, sancion, solicitante, solicitud, tipo_producto, usuario
+)
+
+class ContadorConsultas:
+    def __init__(self):
+        self.total = 0
+
+    def __call__(self, *args, **kwargs):
+        self.total += 1
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def sesiones(engine):
+    return sessionmaker(bind=engine, autocommit=False, autoflush=False, expire_on_commit=False)
+
+@pytest.fixture
+def db(sesiones):
+    sesion = sesiones()
+    yield sesion
+    sesion.close()
+
+@pytest.fixture
+def contar_consultas(engine):
+    """
+    Retorna una función que ejecuta `funcion()` y devuelve (consultas ejecutadas, resultado)
+    """
+    def contar(funcion):
+        contador = ContadorConsultas()
+        event.listen(engine, "before_cursor_execute", contador)
+        try:
+            resultado = funcion()
+        finally:
+            event.remove(engine, "before_cursor_execute", contador)
+        return contador.total, resultado
+    return contar
@@ -0,0 +1,105 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.prestamos import prestamo as prestamo_api
+from app.core.database.prestamo import Prestamo
+from app.core.database.producto import Producto
+from app.core.database.producto_solicitud import ProductoSolicitud
+from app.core.database.solicitante import Solicitante
+from app.core.database.solicitud import Solicitud
+from app.core.database.tipo_producto import TipoProducto
+
+PRODUCTOS_POR_PRESTAMO = 2
+
+@pytest.fixture
+def cliente(sesiones):
+    app = FastAPI()
+    app.include_router(prestamo_api.router, prefix="/prestamo")
+
+    def get_db():
+        db = sesiones()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[prestamo_api.get_db] = get_db
+    return TestClient(app)
+
+def crear_prestamos(db, cantidad: int):
+    """
+    Crea `cantidad` préstamos, cada uno con su solicitante, solicitud y productos
+    """
+    tipo = db.query(TipoProducto).filter(TipoProducto.NOMBRE_TIPO_PRODUCTO == "mouse").first()
+    if tipo is None:
+        tipo = TipoProducto(NOMBRE_TIPO_PRODUCTO="mouse")
+        db.add(tipo)
+        db.flush()
+    inicio = db.query(Prestamo).count()
+    for i in range(inicio, inicio + cantidad):
+        identificacion = f"{1000 + i}"
+        db.add(Solicitante(
+            IDENTIFICACION=identificacion, PRIMER_NOMBRE="ANA", PRIMER_APELLIDO="GOMEZ",
+            ROL="instructor", ESTADO="apto"
+        ))
+        solicitud = Solicitud(IDENTIFICACION=identificacion, FECHA_REGISTRO=datetime.now(), ESTADO="aprobado")
+        db.add(solicitud)
+        db.flush()
+        for j in range(PRODUCTOS_POR_PRESTAMO):
+            producto = Producto(
+                CODIGO_INTERNO=f"P{i}-{j}", NOMBRE="Mouse", IDTIPOPRODUCTO=tipo.IDTIPOPRODUCTO, ESTADO="Prestado"
+            )
+            db.add(producto)
+            db.flush()
+            db.add(ProductoSolicitud(PRODUCTO_ID=producto.IDPRODUCTO, SOLICITUD_ID=solicitud.IDSOLICITUD))
+        db.add(Prestamo(
+            IDSOLICITUD=solicitud.IDSOLICITUD,
+            FECHA_REGISTRO=date.today(),
+            FECHA_LIMITE=date.today() + timedelta(days=3)
+        ))
+    db.commit()
+
+@pytest.mark.parametrize("cantidad", [1, 25])
+def test_listado_carga_relaciones_con_consultas_fijas(db, cliente, contar_consultas, cantidad):
+    crear_prestamos(db, cantidad)
+
+    consultas, respuesta = contar_consultas(lambda: cliente.get("/prestamo/obtener", params={"limite": 100}))
+
+    assert respuesta.status_code == 200
+    prestamos = respuesta.json()
+    assert len(prestamos) == cantidad
+    assert all(len(p["solicitud"]["productos_solicitud"]) == PRODUCTOS_POR_PRESTAMO for p in prestamos)
+    # Préstamos, solicitudes, productos de cada solicitud y productos: sin importar cuántos haya
+    assert consultas == 4
+
+def test_listado_no_crece_con_la_cantidad_de_prestamos(db, cliente, contar_consultas):
+    crear_prestamos(db, 1)
+    con_uno, _ = contar_consultas(lambda: cliente.get("/prestamo/obtener", params={"limite": 100}))
+    crear_prestamos(db, 40)
+    con_muchos, respuesta = contar_consultas(lambda: cliente.get("/prestamo/obtener", params={"limite": 100}))
+
+    assert len(respuesta.json()) == 41
+    assert con_muchos == con_uno
+
+def test_listado_pagina_por_defecto_y_completo_solo_con_todos(db, cliente):
+    crear_prestamos(db, 101)
+
+    pagina = cliente.get("/prestamo/obtener")
+    completo = cliente.get("/prestamo/obtener", params={"todos": True})
+
+    assert len(pagina.json()) == 100
+    assert "X-Siguiente-Cursor" in pagina.headers
+    assert len(completo.json()) == 101
+    assert "X-Siguiente-Cursor" not in completo.headers
+
+def test_listado_completo_tiene_un_maximo(db, cliente, monkeypatch):
+    monkeypatch.setattr(prestamo_api, "MAXIMO_TODOS", 30)
+    crear_prestamos(db, 31)
+
+    completo = cliente.get("/prestamo/obtener", params={"todos": True})
+
+    assert len(completo.json()) == 30
+    assert completo.headers["X-Siguiente-Cursor"] == str(completo.json()[-1]["IDPRESTAMO"])
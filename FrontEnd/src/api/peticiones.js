@@ -1,6 +1,8 @@
 import apiClient from './axiosConfig';
 
 const API_BASE_URL = "http://localhost:8000";
+// Préstamos por página del listado de circulación
+const PRESTAMOS_POR_PAGINA = 100;
 
 // Función auxiliar para obtener el token
 const getAuthHeaders = (isMultipart = false) => {
@@ -704,10 +706,51 @@ export async function crearPrestamo(prestamoData) {
   }
 }
 
-export async function fetchPrestamos() {
+export async function checkoutPrestamo(checkoutData) {
+  try {
+    console.log('Datos del checkout a enviar:', checkoutData);
+    const response = await fetch(
+      `${API_BASE_URL}/prestamo/checkout`,
+      {
+        method: "POST",
+        headers: getAuthHeaders(),
+        body: JSON.stringify(checkoutData),
+        credentials: 'include'
+      }
+    );
+
+    const data = await response.json();
+    console.log('Respuesta del servidor:', data);
+
+    if (!response.ok) {
+      if (response.status === 401) {
+        window.location.href = '/login';
+        throw new Error('Sesión expirada o inválida');
+      }
+      throw new Error(data.detail || "Error al registrar el préstamo");
+    }
+
+    return data;
+  } catch (error) {
+    console.error("Error detallado:", {
+      message: error.message,
+      stack: error.stack,
+      name: error.name
+    });
+    throw error;
+  }
+}
+
+// Obtiene una página de préstamos (del más reciente al más antiguo). `cursor` es el
+// valor de X-Siguiente-Cursor de la página anterior; siguienteCursor es null en la última.
+export async function fetchPrestamos(cursor = null) {
   try {
     console.log('Intentando obtener préstamos...');
-    const response = await fetch(`${API_BASE_URL}/prestamo/obtener`, {
+    const parametros = new URLSearchParams({ limite: PRESTAMOS_POR_PAGINA });
+    if (cursor !== null) {
+      parametros.set('cursor', cursor);
+    }
+    const response = await fetch(`${API_BASE_URL}/prestamo/obtener?${parametros}`, {
       method: 'GET',
       headers: getAuthHeaders(),
       credentials: 'include'
@@ -723,7 +766,10 @@ export async function fetchPrestamos() {
     }
 
     const data = await response.json();
-    return Array.isArray(data) ? data : [];
+    return {
+      prestamos: Array.isArray(data) ? data : [],
+      siguienteCursor: response.headers.get('X-Siguiente-Cursor')
+    };
   } catch (error) {
     console.error("Error detallado:", {
       message: error.message,
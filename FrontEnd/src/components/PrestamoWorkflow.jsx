@@ -3,7 +3,7 @@ import SelectorSolicitantes from './SelectorSolicitantes';
 import SelectorProductos from './SelectorProductos';
 import SelectedItemsChips from './SelectedItemsChips';
 import AlertMessage from './AlertMessage';
-import { crearSolicitud, agregarProductoASolicitud, crearPrestamo } from '../api/peticiones';
+import { checkoutPrestamo } from '../api/peticiones';
 
 const PrestamoWorkflow = ({
     solicitantes,
@@ -43,31 +43,13 @@ const PrestamoWorkflow = ({
         try {
             setLoading(true);
 
-            // Paso 1: Crear la solicitud
-            const solicitudData = {
+            // Registrar solicitud, productos y préstamo en una sola transacción
+            await checkoutPrestamo({
                 IDENTIFICACION: solicitanteSeleccionado.identificacion,
-                FECHA_REGISTRO: new Date().toISOString().split('T')[0],
-                ESTADO: 'pendiente'
-            };
-
-            const solicitudCreada = await crearSolicitud(solicitudData);
-
-            // Paso 2: Agregar productos a la solicitud
-            await Promise.all(productosSeleccionados.map(producto =>
-                agregarProductoASolicitud({
-                    PRODUCTO_ID: producto.IDPRODUCTO,
-                    SOLICITUD_ID: solicitudCreada.IDSOLICITUD || solicitudCreada.id
-                })
-            ));
-
-            // Paso 3: Crear el préstamo
-            const prestamoData = {
-                IDSOLICITUD: solicitudCreada.IDSOLICITUD || solicitudCreada.id,
+                PRODUCTOS: productosSeleccionados.map(producto => producto.IDPRODUCTO),
                 FECHA_REGISTRO: new Date().toISOString().split('T')[0],
                 FECHA_LIMITE: fechaLimite
-            };
-
-            await crearPrestamo(prestamoData);
+            });
 
             // Limpiar y notificar éxito
             handleClearCart();
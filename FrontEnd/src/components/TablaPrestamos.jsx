@@ -3,7 +3,7 @@ import '../styles/components/TablaPrestamos.css';
 import '../styles/global-inputs.css';
 import ProlongarPrestamoModal from './ProlongarPrestamoModal';
 
-const TablaPrestamos = ({ prestamos, solicitantes, productos, onDevolver, onProlongar }) => {
+const TablaPrestamos = ({ prestamos, solicitantes, productos, onDevolver, onProlongar, hayMas, cargandoMas, onCargarMas }) => {
   const [prestamoParaProlongar, setPrestamoParaProlongar] = useState(null);
   const [filtroSolicitante, setFiltroSolicitante] = useState('');
   const [filtroEstado, setFiltroEstado] = useState('');
@@ -248,6 +248,19 @@ const TablaPrestamos = ({ prestamos, solicitantes, productos, onDevolver, onProl
         </tbody>
       </table>
 
+      {/* Los préstamos se cargan por páginas: los filtros aplican a los ya cargados */}
+      {hayMas && onCargarMas && (
+        <div className="cargar-mas-prestamos">
+          <button
+            className="btn-clear"
+            onClick={onCargarMas}
+            disabled={cargandoMas}
+          >
+            {cargandoMas ? 'Cargando...' : 'Cargar más préstamos'}
+          </button>
+        </div>
+      )}
+
       {/* Modal de prolongación */}
       <ProlongarPrestamoModal
         show={!!prestamoParaProlongar}
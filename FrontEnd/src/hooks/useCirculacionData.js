@@ -10,6 +10,8 @@ export const useCirculacionData = () => {
     });
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
+    const [siguienteCursor, setSiguienteCursor] = useState(null);
+    const [cargandoMas, setCargandoMas] = useState(false);
 
     const cargarDatos = async () => {
         try {
@@ -21,8 +23,9 @@ export const useCirculacionData = () => {
                 fetchTiposProducto()
             ]);
 
+            setSiguienteCursor(prestamosData.siguienteCursor);
             setData({
-                prestamos: prestamosData,
+                prestamos: prestamosData.prestamos,
                 solicitantes: solicitantesData,
                 productos: productosData,
                 tiposProducto: tiposData
@@ -36,6 +39,25 @@ export const useCirculacionData = () => {
         }
     };
 
+    // Agrega la siguiente página de préstamos a las ya cargadas
+    const cargarMasPrestamos = async () => {
+        if (!siguienteCursor || cargandoMas) return;
+        try {
+            setCargandoMas(true);
+            const pagina = await fetchPrestamos(siguienteCursor);
+            setSiguienteCursor(pagina.siguienteCursor);
+            setData(actual => ({
+                ...actual,
+                prestamos: [...actual.prestamos, ...pagina.prestamos]
+            }));
+        } catch (error) {
+            console.error('Error al cargar más préstamos:', error);
+            setError('Error al cargar más préstamos');
+        } finally {
+            setCargandoMas(false);
+        }
+    };
+
     useEffect(() => {
         cargarDatos();
     }, []);
@@ -45,6 +67,9 @@ export const useCirculacionData = () => {
         loading,
         error,
         recargarDatos: cargarDatos,
+        hayMasPrestamos: siguienteCursor !== null,
+        cargandoMas,
+        cargarMasPrestamos,
         setError
     };
 };
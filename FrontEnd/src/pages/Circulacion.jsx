@@ -20,6 +20,9 @@ const Circulacion = () => {
     loading,
     error,
     recargarDatos,
+    hayMasPrestamos,
+    cargandoMas,
+    cargarMasPrestamos,
     setError
   } = useCirculacionData();
 
@@ -96,6 +99,9 @@ const Circulacion = () => {
             productos={productos}
             onDevolver={handleDevolver}
             onProlongar={handleProlongar}
+            hayMas={hayMasPrestamos}
+            cargandoMas={cargandoMas}
+            onCargarMas={cargarMasPrestamos}
           />
         )}
       </main>
@@ -4,7 +4,7 @@ import TablaPrestamos from '../components/TablaPrestamos';
 import SelectorSolicitantes from '../components/SelectorSolicitantes';
 import SelectorProductos from '../components/SelectorProductos';
 import CarritoPrestamos from '../components/CarritoPrestamos';
-import { fetchPrestamos, fetchSolicitantes, fetchProductos, fetchTiposProducto, crearPrestamo } from '../api/peticiones';
+import { fetchPrestamos, fetchSolicitantes, fetchProductos, fetchTiposProducto, checkoutPrestamo } from '../api/peticiones';
 import '../styles/pages/inicio.css';
 import '../styles/pages/Circulacion.css';
 
@@ -16,6 +16,8 @@ const CirculacionNueva = () => {
   const [tiposProducto, setTiposProducto] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [siguienteCursor, setSiguienteCursor] = useState(null);
+  const [cargandoMas, setCargandoMas] = useState(false);
 
   // Estados para el proceso de préstamo
   const [solicitanteSeleccionado, setSolicitanteSeleccionado] = useState(null);
@@ -36,7 +38,8 @@ const CirculacionNueva = () => {
         fetchProductos(),
         fetchTiposProducto()
       ]);
-      setPrestamos(prestamosData);
+      setPrestamos(prestamosData.prestamos);
+      setSiguienteCursor(prestamosData.siguienteCursor);
       setSolicitantes(solicitantesData);
       setProductos(productosData);
       setTiposProducto(tiposData);
@@ -49,6 +52,22 @@ const CirculacionNueva = () => {
     }
   };
 
+  // Agrega la siguiente página de préstamos a las ya cargadas
+  const cargarMasPrestamos = async () => {
+    if (!siguienteCursor || cargandoMas) return;
+    try {
+      setCargandoMas(true);
+      const pagina = await fetchPrestamos(siguienteCursor);
+      setSiguienteCursor(pagina.siguienteCursor);
+      setPrestamos(actuales => [...actuales, ...pagina.prestamos]);
+    } catch (error) {
+      console.error('Error al cargar más préstamos:', error);
+      setError('Error al cargar más préstamos');
+    } finally {
+      setCargandoMas(false);
+    }
+  };
+
   const handleAddToCart = (producto) => {
     if (!productosSeleccionados.some(p => p.IDPRODUCTO === producto.IDPRODUCTO)) {
       setProductosSeleccionados([...productosSeleccionados, producto]);
@@ -74,14 +93,12 @@ const CirculacionNueva = () => {
 
     try {
       setLoading(true);
-      // Crear préstamos para cada producto seleccionado
-      await Promise.all(productosSeleccionados.map(producto => 
-        crearPrestamo({
-          IDENTIFICACION_SOLICITANTE: solicitanteSeleccionado.identificacion,
-          IDPRODUCTO: producto.IDPRODUCTO,
-          FECHA_LIMITE: fechaLimite
-        })
-      ));
+      // Registrar un solo préstamo con todos los productos seleccionados
+      await checkoutPrestamo({
+        IDENTIFICACION: solicitanteSeleccionado.identificacion,
+        PRODUCTOS: productosSeleccionados.map(producto => producto.IDPRODUCTO),
+        FECHA_LIMITE: fechaLimite
+      });
 
       // Limpiar selecciones y recargar datos
       handleClearCart();
@@ -174,6 +191,9 @@ const CirculacionNueva = () => {
             solicitantes={solicitantes}
             productos={productos}
             onDevolver={handleDevolver}
+            hayMas={siguienteCursor !== null}
+            cargandoMas={cargandoMas}
+            onCargarMas={cargarMasPrestamos}
           />
         )}
       </main>